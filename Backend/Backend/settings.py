@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tracker.middleware.OutboxMiddleware',
+    'tracker.middleware.QueryBudgetMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -82,6 +84,29 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # IMMEDIATE takes the write lock at BEGIN, so concurrent XP awards queue
+        # on the busy timeout instead of failing with "database is locked"
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # file based so the concurrency tests get real locking between threads
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+
+# Cache
+# Holds the per-user dashboard snapshots (tracker/utils/snapshot.py). locmem is per
+# process, so deployments with several workers should switch to the file based
+# backend (or a shared cache) for invalidation to reach every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'kangaroutine',
     }
 }
 
@@ -106,8 +131,74 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'tracker.authentication.ProfileJWTAuthentication',  # JWTAuthentication that also loads the profile
     ),
+    'DEFAULT_PAGINATION_CLASS': 'tracker.pagination.TrackerCursorPagination',
+}
+
+# Per-endpoint SQL query instrumentation, see tracker/middleware.py
+# BUDGETS are max queries per "METHOD url-name", enforced by the tests. Authentication costs one query,
+# the user row with the profile joined in (tracker/authentication.py)
+# completion budgets exclude the outbox side effects, those run after the response, and include the XPEvent insert
+# and are sized for a completion that crosses a level, the locked slow path in UserProfile.add_xp
+QUERY_BUDGET = {
+    "HEADERS": DEBUG,
+    "REPORT_DIR": BASE_DIR / "query_reports",
+    "FLUSH_EVERY": 100,
+    "BUDGETS": {
+        "GET habit-list": 2,
+        "GET task-list": 3,
+        "POST task-complete": 14,
+        "GET focussession-list": 2,
+        "POST focussession-list": 12,
+        "POST complete-habit": 14,
+        "POST complete-habits": 14,
+        "GET dashboard": 1,
+        "GET dashboard-snapshot": 6,
+        "GET sync": 8,
+        "GET admin-table": 2,
+        "GET export": 1,  # the rows are read while streaming, after the view returns
+        "GET leaderboard": 2,
+        "GET progress": 2,
+        "GET my-achievements": 2,
+        "GET async-dashboard": 1,
+        "GET async-leaderboard": 2,
+        "GET async-progress": 2,
+        "GET async-habits": 2,
+        "GET async-tasks": 3,
+        "GET events": 1,  # only the auth lookup, events are pushed after the view returns
+    },
+}
+
+# Reminder dispatch, see tracker/utils/reminders.py and the dispatch_reminders command
+# BACKEND is a dotted path, FileBackend takes OPTIONS {"path": ...}
+REMINDERS = {
+    "BACKEND": "tracker.utils.reminders.LogBackend",
+    "OPTIONS": {},
+    "BATCH_SIZE": 1000,
+    "LEASE_SECONDS": 60,
+}
+
+# Live events for GET /api/events/, see tracker/utils/events.py
+# the in-memory broker only fans out within one process, run a single ASGI worker or plug in a shared BACKEND
+EVENTS = {
+    "BACKEND": "tracker.utils.events.InMemoryBroker",
+    "OPTIONS": {},
+    "QUEUE_SIZE": 100,
+    "HEARTBEAT_SECONDS": 15,
+    "LEADERBOARD_INTERVAL": 1.0,
+}
+
+# Completion side effects (metrics, rollups, achievements) go through an outbox. DRAIN_INLINE applies
+# a request's own events in the web process after its response has been sent (OutboxMiddleware),
+# drain_outbox picks up whatever that missed. Turning it off leaves everything to drain_outbox, which
+# needs a shared EVENTS backend and cache, it refuses to run against the in-memory ones
+OUTBOX = {
+    "BATCH_SIZE": 500,
+    "LEASE_SECONDS": 60,
+    "DRAIN_INLINE": True,
+    "RETENTION_DAYS": 7,
+    "MAX_ATTEMPTS": 5,
 }
 
 from datetime import timedelta
@@ -6,6 +6,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 
 from accounts.serializers import RegisterSerializer
 from tracker.models import UserProfile
+from tracker.utils.snapshot import invalidate_snapshot
 
 
 class RegisterView(APIView):
@@ -64,6 +65,8 @@ class CompleteProfileView(APIView):
         if primary_theme:
             profile.primary_theme = primary_theme
 
-        profile.save()
+        #only the fields edited here, so concurrent XP awards aren't overwritten
+        profile.save(update_fields=["motivation", "primary_theme"])
+        invalidate_snapshot(user.id)
 
         return Response({"success": True})
@@ -0,0 +1,122 @@
+#async twins of the read-heavy GET views, served natively when the app runs under ASGI
+#(Backend/asgi.py). They build the same querysets as views.py and only differ in how the
+#rows are fetched, so a query change in views.py applies to both. Under WSGI Django runs
+#them through async_to_sync, which works but gives none of the concurrency.
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .authentication import ProfileJWTAuthentication, loaded_profile
+from .models import Habit, Task
+from .serializers import HabitSerializer, TaskSerializer
+from .utils.events import LEADERBOARD_GROUP, astream_events, stream_events, user_group
+from .utils.leaderboard import leaderboard_data, leaderboard_rows
+from .views import _dashboard_payload, _progress_from_rows, _progress_params, _progress_rows
+
+ASYNC_PAGE_SIZE = 50
+ASYNC_MAX_PAGE_SIZE = 500
+
+_jwt = ProfileJWTAuthentication()
+
+async def authenticate(request):
+    #same checks as the DRF authentication class, the token is validated in-process and
+    #the user and profile are read in one query. Returns (user, error response)
+    header = _jwt.get_header(request)
+    raw_token = _jwt.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None, JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    try:
+        validated = _jwt.get_validated_token(raw_token)
+        user = await sync_to_async(_jwt.get_user)(validated)
+    except (InvalidToken, TokenError, AuthenticationFailed) as exc:
+        detail = exc.detail if hasattr(exc, "detail") else str(exc)
+        return None, JsonResponse({"detail": detail}, status=401)
+    return user, None
+
+def _page_params(params):
+    #keyset paging on id, ?after=<last id seen>&page_size=n. Returns (after, size, error)
+    try:
+        after = int(params.get("after", 0))
+        size = int(params.get("page_size", ASYNC_PAGE_SIZE))
+    except ValueError:
+        return None, None, "after and page_size must be numbers"
+    return after, max(1, min(size, ASYNC_MAX_PAGE_SIZE)), None
+
+async def _keyset_page(queryset, serializer_class, params):
+    after, size, error = _page_params(params)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+
+    #one extra row tells us whether there is a next page without a COUNT
+    rows = [obj async for obj in queryset.filter(id__gt=after).order_by("id")[:size + 1]]
+    more = len(rows) > size
+    rows = rows[:size]
+    return JsonResponse({
+        "next_after": rows[-1].id if more else None,
+        "results": serializer_class(rows, many=True).data,
+    })
+
+@require_GET
+async def dashboard_data(request):
+    user, error = await authenticate(request)
+    if error:
+        return error
+    profile = loaded_profile(user)
+    if profile is None:
+        return JsonResponse({"error": "Profile not found"}, status=404)
+    return JsonResponse(_dashboard_payload(profile))
+
+@require_GET
+async def leaderboard_view(request):
+    _, error = await authenticate(request)
+    if error:
+        return error
+    rows = leaderboard_rows(request.GET.get("type", "xp"))
+    if rows is None:
+        return JsonResponse({"error": "Invalid leaderboard type"}, status=400)
+    return JsonResponse(leaderboard_data([row async for row in rows]), safe=False)
+
+@require_GET
+async def user_progress(request):
+    user, error = await authenticate(request)
+    if error:
+        return error
+    days, granularity, message = _progress_params(request.GET)
+    if message:
+        return JsonResponse({"error": message}, status=400)
+    rows = [row async for row in _progress_rows(user, days)]
+    return JsonResponse(_progress_from_rows(rows, days, granularity), safe=False)
+
+@require_GET
+async def habit_list(request):
+    user, error = await authenticate(request)
+    if error:
+        return error
+    return await _keyset_page(Habit.objects.filter(user=user), HabitSerializer, request.GET)
+
+@require_GET
+async def task_list(request):
+    user, error = await authenticate(request)
+    if error:
+        return error
+    queryset = Task.objects.filter(user=user).prefetch_related("subtasks")
+    return await _keyset_page(queryset, TaskSerializer, request.GET)
+
+@require_GET
+async def event_stream(request):
+    #server-sent events: the user's xp_awarded, level_up, streak and achievement_unlocked events
+    #plus top 10 leaderboard diffs, replacing the dashboard/leaderboard polling
+    user, error = await authenticate(request)
+    if error:
+        return error
+
+    groups = [user_group(user.id), LEADERBOARD_GROUP]
+    #under WSGI the stream has to block a worker thread, under ASGI it just waits on the loop
+    content = astream_events(groups) if isinstance(request, ASGIRequest) else stream_events(groups)
+    response = StreamingHttpResponse(content, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # keep nginx from buffering the stream
+    return response
@@ -0,0 +1,43 @@
+from django.contrib.auth.models import User
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+def loaded_profile(user):
+    #the UserProfile ProfileJWTAuthentication loaded with user, None when the user has none
+    return User.userprofile.related.get_cached_value(user, None)
+
+
+class ProfileJWTAuthentication(JWTAuthentication):
+    #JWTAuthentication that joins the user's profile into its one user query, so views don't
+    #query it again. The profile, or None when there isn't one, is attached as request.profile
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            request.profile = loaded_profile(result[0])
+        return result
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = User.objects.select_related("userprofile").get(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+        #the reverse one-to-one is only cached when the row exists, cache the miss too
+        if loaded_profile(user) is None:
+            User.userprofile.related.set_cached_value(user, None)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,154 @@
+import json
+import queue
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tracker.models import Task
+from tracker.utils.querybudget import query_stats
+from tracker.utils.synthetic import seed_population
+
+#(report name, method, path template), {task_id} and {board} are filled per request
+ENDPOINTS = [
+    ("habits", "get", "/api/habits/"),
+    ("tasks", "get", "/api/tasks/"),
+    ("task-complete", "post", "/api/tasks/{task_id}/complete/"),
+    ("leaderboard", "get", "/api/leaderboard/?type={board}"),
+    ("progress", "get", "/api/progress/"),
+    ("achievements", "get", "/api/progress/achievements/"),
+    ("dashboard", "get", "/api/dashboard/"),
+]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a synthetic population into a throwaway test database and drives the main "
+        "tracker endpoints through the Django test client, printing latency percentiles "
+        "and queries per request as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--habits", type=int, default=5, help="Habits per user")
+        parser.add_argument("--tasks", type=int, default=10, help="Tasks per user")
+        parser.add_argument("--subtasks", type=int, default=3, help="Subtasks per task")
+        parser.add_argument("--days", type=int, default=365, help="Days of DailyMetrics per user")
+        parser.add_argument("--sessions", type=int, default=50, help="Focus sessions per user")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--endpoints", nargs="*", help="Only run these endpoints (report names)")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Also write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def run(self, options):
+        started = time.perf_counter()
+        users = seed_population(
+            users=options["users"], habits_per_user=options["habits"], tasks_per_user=options["tasks"],
+            subtasks_per_task=options["subtasks"], days=options["days"],
+            sessions_per_user=options["sessions"], seed=options["seed"],
+        )
+        seed_seconds = time.perf_counter() - started
+
+        tokens = {user.id: str(AccessToken.for_user(user)) for user in users}
+        open_tasks = list(Task.objects.filter(is_completed=False).values_list("user_id", "id"))
+        rng = random.Random(options["seed"])
+        rng.shuffle(open_tasks)
+
+        endpoints = {}
+        for name, method, template in ENDPOINTS:
+            if options["endpoints"] and name not in options["endpoints"]:
+                continue
+
+            jobs = queue.Queue()
+            for _ in range(options["requests"]):
+                if name == "task-complete" and open_tasks:
+                    user_id, task_id = open_tasks.pop()
+                else:
+                    user_id, task_id = rng.choice(users).id, 0
+                jobs.put((user_id, template.format(task_id=task_id, board=rng.choice(["xp", "focus", "streak"]))))
+
+            endpoints[name] = self.drive(method, jobs, tokens, options["concurrency"])
+
+        return {
+            "config": {key: options[key] for key in (
+                "users", "habits", "tasks", "subtasks", "days", "sessions", "requests", "concurrency", "seed")},
+            "seed_seconds": round(seed_seconds, 3),
+            "endpoints": endpoints,
+        }
+
+    def drive(self, method, jobs, tokens, concurrency):
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            client = APIClient()
+            try:
+                while True:
+                    try:
+                        user_id, path = jobs.get_nowait()
+                    except queue.Empty:
+                        return
+                    client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens[user_id]}")
+                    t0 = time.perf_counter()
+                    response = getattr(client, method)(path)
+                    elapsed = (time.perf_counter() - t0) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        if response.status_code >= 400:
+                            errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        query_stats.reset()
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - started
+
+        #query counts come from QueryBudgetMiddleware's in-process registry
+        stats = query_stats.snapshot().values()
+        recorded = sum(s["requests"] for s in stats) or 1
+        latencies.sort()
+        return {
+            "requests": len(latencies),
+            "errors": len(errors),
+            "rps": round(len(latencies) / wall, 1) if wall else None,
+            "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "queries_per_request": round(sum(s["queries"] for s in stats) / recorded, 2),
+            "max_queries": max((s["max_queries"] for s in stats), default=0),
+        }
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import queue
+import random
+import threading
+import time
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tracker.management.commands.bench_api import percentile
+from tracker.utils.querybudget import query_stats
+from tracker.utils.synthetic import seed_population
+
+#(report name, WSGI path, ASGI path), {board} is filled per request
+ENDPOINTS = [
+    ("dashboard", "/api/dashboard/", "/api/async/dashboard/"),
+    ("leaderboard", "/api/leaderboard/?type={board}", "/api/async/leaderboard/?type={board}"),
+    ("progress", "/api/progress/?days=30", "/api/async/progress/?days=30"),
+    ("habits", "/api/habits/", "/api/async/habits/"),
+    ("tasks", "/api/tasks/", "/api/async/tasks/"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a synthetic population into a throwaway test database and drives the read "
+        "endpoints twice: the sync views through the WSGI handler from a thread pool, and "
+        "their async twins through the ASGI handler from one event loop. Prints requests "
+        "per second and latency percentiles per side as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--days", type=int, default=90, help="Days of DailyMetrics per user")
+        parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint and side")
+        parser.add_argument("--concurrency", type=int, default=32,
+                            help="WSGI worker threads, and in-flight requests on the ASGI side")
+        parser.add_argument("--db-latency-ms", type=float, default=0.0,
+                            help="Sleep this long around every query, to stand in for a networked database")
+        parser.add_argument("--endpoints", nargs="*", help="Only run these endpoints (report names)")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Also write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def run(self, options):
+        users = seed_population(
+            users=options["users"], habits_per_user=5, tasks_per_user=10, subtasks_per_task=3,
+            days=options["days"], sessions_per_user=0, seed=options["seed"],
+        )
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+
+        latency = options["db_latency_ms"] / 1000
+        def slow_queries(sender, connection, **kwargs):
+            #every request opens a fresh connection (CONN_MAX_AGE=0), so each one gets the delay
+            def wrapper(execute, sql, params, many, context):
+                time.sleep(latency)
+                return execute(sql, params, many, context)
+            connection.execute_wrappers.append(wrapper)
+        if latency:
+            connection_created.connect(slow_queries)
+
+        rng = random.Random(options["seed"])
+        endpoints = {}
+        try:
+            for name, wsgi_path, asgi_path in ENDPOINTS:
+                if options["endpoints"] and name not in options["endpoints"]:
+                    continue
+                jobs = [(rng.choice(tokens), rng.choice(["xp", "focus", "streak"]))
+                        for _ in range(options["requests"])]
+                wsgi = self.drive_wsgi(wsgi_path, jobs, options["concurrency"])
+                asgi = self.drive_asgi(asgi_path, jobs, options["concurrency"])
+                endpoints[name] = {
+                    "wsgi": wsgi,
+                    "asgi": asgi,
+                    "asgi_speedup": round(asgi["rps"] / wsgi["rps"], 2) if wsgi["rps"] and asgi["rps"] else None,
+                }
+        finally:
+            connection_created.disconnect(slow_queries)
+
+        return {
+            "config": {key: options[key] for key in (
+                "users", "days", "requests", "concurrency", "db_latency_ms", "seed")},
+            "endpoints": endpoints,
+        }
+
+    def drive_wsgi(self, path, jobs, concurrency):
+        pending = queue.Queue()
+        for job in jobs:
+            pending.put(job)
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            client = Client()
+            try:
+                while True:
+                    try:
+                        token, board = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    t0 = time.perf_counter()
+                    response = client.get(path.format(board=board), headers={"Authorization": f"Bearer {token}"})
+                    elapsed = (time.perf_counter() - t0) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        if response.status_code >= 400:
+                            errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        query_stats.reset()
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return self.summary(latencies, errors, time.perf_counter() - started)
+
+    def drive_asgi(self, path, jobs, concurrency):
+        latencies = []
+        errors = []
+        #uvicorn isn't a dependency, so the ASGI side plays the server itself: each request is a
+        #scope/receive/send call into Django's ASGIHandler on one event loop, the same entry point
+        #(and per-request ThreadSensitiveContext) a real ASGI server uses
+        app = ASGIHandler()
+
+        async def request(token, board):
+            target = path.format(board=board)
+            route, _, query = target.partition("?")
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+                "method": "GET", "scheme": "http", "root_path": "",
+                "path": route, "raw_path": route.encode(), "query_string": query.encode(),
+                "headers": [(b"host", b"testserver"), (b"authorization", f"Bearer {token}".encode())],
+                "client": ("127.0.0.1", 0), "server": ("testserver", 80),
+            }
+            body_sent = asyncio.Event()
+            status = []
+
+            async def receive():
+                if not body_sent.is_set():
+                    body_sent.set()
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await asyncio.Event().wait()  # the client never disconnects
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    status.append(message["status"])
+
+            await app(scope, receive, send)
+            return status[0]
+
+        async def main():
+            gate = asyncio.Semaphore(concurrency)
+
+            async def one(token, board):
+                async with gate:
+                    t0 = time.perf_counter()
+                    status = await request(token, board)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                    if status >= 400:
+                        errors.append(status)
+
+            await asyncio.gather(*(one(token, board) for token, board in jobs))
+
+        query_stats.reset()
+        started = time.perf_counter()
+        asyncio.run(main())
+        return self.summary(latencies, errors, time.perf_counter() - started)
+
+    def summary(self, latencies, errors, wall):
+        #query counts come from QueryBudgetMiddleware's in-process registry
+        stats = query_stats.snapshot().values()
+        recorded = sum(s["requests"] for s in stats) or 1
+        latencies.sort()
+        return {
+            "requests": len(latencies),
+            "errors": len(errors),
+            "rps": round(len(latencies) / wall, 1) if wall else None,
+            "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "queries_per_request": round(sum(s["queries"] for s in stats) / recorded, 2),
+        }
@@ -0,0 +1,45 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracker.utils.levels import level_for_xp
+
+
+def loop_level_for_xp(total_xp):
+    #the level-by-level walk add_xp and xp_progress used before the lookup table
+    level, current, needed = 1, total_xp, 100
+    while current >= needed:
+        current -= needed
+        level += 1
+        needed = int(needed * 1.25)
+    return level, current, needed
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the level curve lookup against the old per-level loop"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lookups", type=int, default=50_000)
+        parser.add_argument("--max-xp", type=int, default=10 ** 12, help="Upper bound for the random totals")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        totals = [rng.randint(0, options["max_xp"]) for _ in range(options["lookups"])]
+
+        timings = {}
+        for name, fn in (("loop", loop_level_for_xp), ("table", level_for_xp)):
+            started = time.perf_counter()
+            for total in totals:
+                fn(total)
+            timings[name] = time.perf_counter() - started
+
+        mismatches = sum(1 for total in totals if loop_level_for_xp(total) != level_for_xp(total))
+
+        for name, elapsed in timings.items():
+            self.stdout.write(
+                f"{name:>5}: {elapsed * 1000:8.1f} ms total, "
+                f"{elapsed / len(totals) * 1e9:7.0f} ns per lookup"
+            )
+        self.stdout.write(f"speedup x{timings['loop'] / timings['table']:.1f}, {mismatches} mismatches")
@@ -0,0 +1,121 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from tracker.models import Habit, Reminder, Task
+from tracker.utils.reminders import FileBackend, dispatch_due
+from tracker.utils.synthetic import seed_population
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds due reminders into a throwaway test database and drains them with several "
+        "dispatch workers through the file backend, printing throughput and duplicate "
+        "deliveries as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reminders", type=int, default=100_000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Also write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def run(self, options):
+        started = time.perf_counter()
+        self.seed(options)
+        seed_seconds = time.perf_counter() - started
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, f"worker{i}.ndjson") for i in range(options["workers"])]
+
+            def worker(path):
+                try:
+                    dispatch_due(backend=FileBackend(path), batch_size=options["batch_size"])
+                finally:
+                    connection.close()
+
+            started = time.perf_counter()
+            threads = [threading.Thread(target=worker, args=(path,)) for path in paths]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            wall = time.perf_counter() - started
+
+            delivered = Counter()
+            per_worker = []
+            for path in paths:
+                ids = []
+                if os.path.exists(path):
+                    with open(path) as fh:
+                        ids = [json.loads(line)["id"] for line in fh]
+                delivered.update(ids)
+                per_worker.append(len(ids))
+
+        total = sum(delivered.values())
+        return {
+            "config": {key: options[key] for key in ("reminders", "users", "workers", "batch_size", "seed")},
+            "seed_seconds": round(seed_seconds, 3),
+            "dispatch_seconds": round(wall, 3),
+            "delivered": total,
+            "per_worker": per_worker,
+            "duplicates": total - len(delivered),
+            "missing": options["reminders"] - len(delivered),
+            "reminders_per_minute": round(total / wall * 60) if wall else None,
+            "still_due": Reminder.objects.filter(
+                reminders_enabled=True, scheduled_time__lte=timezone.now()).count(),
+        }
+
+    def seed(self, options):
+        #a third each of daily habit nudges, deadline reminders and one-off custom reminders,
+        #all due somewhere in the last hour
+        seed_population(users=options["users"], habits_per_user=1, tasks_per_user=1,
+                        subtasks_per_task=0, days=1, sessions_per_user=0, seed=options["seed"])
+        now = timezone.now()
+        Task.objects.update(deadline=now + timedelta(hours=2))
+        habits = dict(Habit.objects.values_list("user_id", "id"))
+        tasks = dict(Task.objects.values_list("user_id", "id"))
+        user_ids = list(habits)
+
+        rng = random.Random(options["seed"])
+        rows = []
+        for i in range(options["reminders"]):
+            user_id = rng.choice(user_ids)
+            preset = ("daily_habit", "task_deadline", "")[i % 3]
+            rows.append(Reminder(
+                user_id=user_id,
+                habit_id=habits[user_id] if preset == "daily_habit" else None,
+                task_id=tasks[user_id] if preset == "task_deadline" else None,
+                reminder_type="custom" if not preset else "preset",
+                preset=preset,
+                lead_hours=2 if preset == "task_deadline" else 0,
+                scheduled_time=now - timedelta(seconds=rng.randint(1, 3600)),
+            ))
+        Reminder.objects.bulk_create(rows, batch_size=5000)
@@ -0,0 +1,110 @@
+import json
+import random
+import resource
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from tracker.models import XPEvent
+from tracker.utils.ledger import rebuild_from_ledger
+from tracker.utils.synthetic import seed_population
+
+SOURCES = ("task", "habit", "focus_session", "achievement")
+INSERT_CHUNK = 100_000
+
+
+def maxrss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # KB on linux
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds XPEvent rows into a throwaway test database and times rebuild_xp over them: a cold "
+        "rebuild where every profile and daily row has to be written, then a --check pass over the "
+        "rebuilt tables. Prints events/sec and peak memory as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=10_000_000)
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--days", type=int, default=365, help="Events are spread over this many past days")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Also write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def run(self, options):
+        started = time.perf_counter()
+        self.seed(options)
+        seed_seconds = time.perf_counter() - started
+        rss_before = maxrss_mb()
+
+        events = XPEvent.objects.count()
+        passes = {}
+        for name, check in (("rebuild", False), ("check", True)):
+            started = time.perf_counter()
+            counts = rebuild_from_ledger(check=check)
+            elapsed = time.perf_counter() - started
+            passes[name] = {
+                "seconds": round(elapsed, 3),
+                "events_per_second": round(events / elapsed) if elapsed else None,
+                "counts": counts,
+            }
+
+        return {
+            "config": {key: options[key] for key in ("events", "users", "days", "seed")},
+            "vendor": connection.vendor,
+            "seed_seconds": round(seed_seconds, 3),
+            "events": events,
+            **passes,
+            #ru_maxrss is a high-water mark, so the rebuild's own footprint is the growth past seeding
+            "maxrss_mb_before_rebuild": rss_before,
+            "maxrss_mb_after_rebuild": maxrss_mb(),
+        }
+
+    def seed(self, options):
+        #bare users and zeroed profiles, so the cold rebuild writes every profile, day and week
+        users = seed_population(users=options["users"], habits_per_user=0, tasks_per_user=0,
+                                subtasks_per_task=0, days=0, sessions_per_user=0, seed=options["seed"])
+        user_ids = [user.id for user in users]
+
+        rng = random.Random(options["seed"])
+        now = timezone.now()
+        adapt = connection.ops.adapt_datetimefield_value
+        table = connection.ops.quote_name(XPEvent._meta.db_table)
+        sql = (
+            f"INSERT INTO {table} (user_id, source_type, source_id, base_xp, theme_bonus, created_at) "
+            f"VALUES (%s, %s, %s, %s, %s, %s)"
+        )
+        remaining = options["events"]
+        with connection.cursor() as cursor:
+            while remaining:
+                chunk = min(remaining, INSERT_CHUNK)
+                rows = []
+                for _ in range(chunk):
+                    base_xp = rng.choice((10, 20, 30, 25, 50))
+                    rows.append((
+                        rng.choice(user_ids), rng.choice(SOURCES), rng.randint(1, 1_000_000),
+                        base_xp, base_xp // 2 if rng.random() < 0.3 else 0,
+                        adapt(now - timedelta(seconds=rng.randint(0, options["days"] * 86400))),
+                    ))
+                with transaction.atomic():
+                    cursor.executemany(sql, rows)
+                remaining -= chunk
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracker.utils.reminders import dispatch_due, reminder_config
+
+
+class Command(BaseCommand):
+    help = (
+        "Delivers due reminders through the configured REMINDERS backend. Runs as a long-lived "
+        "worker polling every --interval seconds, or drains the queue once with --once. "
+        "Several workers can run side by side, each batch is claimed by exactly one of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the due queue and exit")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--batch-size", type=int, help="Reminders claimed per batch, default from settings")
+
+    def handle(self, *args, **options):
+        config = reminder_config()
+        batch_size = options["batch_size"] or config["BATCH_SIZE"]
+
+        if options["once"]:
+            sent = dispatch_due(batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(f"Dispatched {sent} reminders"))
+            return
+
+        self.stdout.write(f"Reminder worker started, backend {config['BACKEND']}")
+        try:
+            while True:
+                sent = dispatch_due(batch_size=batch_size)
+                if sent:
+                    self.stdout.write(f"Dispatched {sent} reminders")
+                else:
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Reminder worker stopped")
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.utils.outbox import drain, outbox_config, process_local_backends, prune_processed
+
+
+class Command(BaseCommand):
+    help = (
+        "Applies pending completion side effects (daily metrics, weekly rollups, lifetime counters, "
+        "achievements) from the outbox. Runs as a long-lived worker polling every --interval seconds, "
+        "or drains once with --once. Several drainers can run side by side. With OUTBOX['DRAIN_INLINE'] "
+        "the web processes apply their own events and this is only a backstop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the pending events and exit")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to sleep when nothing is pending")
+        parser.add_argument("--batch-size", type=int, help="Events claimed per batch, default from settings")
+        parser.add_argument("--prune", action="store_true",
+                            help="Also delete processed events older than OUTBOX['RETENTION_DAYS']")
+
+    def handle(self, *args, **options):
+        config = outbox_config()
+        local = process_local_backends()
+        if local and not config["DRAIN_INLINE"]:
+            raise CommandError(
+                f"{' and '.join(local)} only reach this process, so the achievement and leaderboard events "
+                "and snapshot invalidations of the events drained here would never reach a client. "
+                "Configure shared backends or turn OUTBOX['DRAIN_INLINE'] back on"
+            )
+        if local:
+            self.stderr.write(self.style.WARNING(
+                f"{' and '.join(local)} only reach this process, live events of what this backstop drains are not sent"
+            ))
+
+        batch_size = options["batch_size"] or config["BATCH_SIZE"]
+        if options["prune"]:
+            self.stdout.write(f"Pruned {prune_processed()} processed events")
+
+        if options["once"]:
+            applied = drain(batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(f"Applied {applied} outbox events"))
+            return
+
+        self.stdout.write("Outbox drainer started")
+        try:
+            while True:
+                applied = drain(batch_size=batch_size)
+                if applied:
+                    self.stdout.write(f"Applied {applied} outbox events")
+                else:
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Outbox drainer stopped")
@@ -0,0 +1,92 @@
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.utils.export import (
+    EXPORT_FORMATS, EXPORT_TABLES, checkpoint_from_line, export_stream,
+)
+
+
+def trim_to_last_line(path):
+    #drops a partly written trailing line left by an interrupted run and
+    #returns the last complete line, reading backwards so huge files are fine
+    with open(path, "rb+") as fh:
+        fh.seek(0, os.SEEK_END)
+        pos = fh.tell()
+        block = b""
+        while pos > 0:
+            step = min(64 * 1024, pos)
+            pos -= step
+            fh.seek(pos)
+            block = fh.read(step) + block
+            end = block.rfind(b"\n")
+            if end != -1 and block.rfind(b"\n", 0, end) != -1:
+                break
+
+        end = block.rfind(b"\n")
+        if end == -1:
+            fh.truncate(0)
+            return None
+        fh.truncate(pos + end + 1)
+        return block[block.rfind(b"\n", 0, end) + 1:end].decode()
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams DailyMetrics, FocusSession, Habit and Task history as NDJSON or CSV "
+        "in id order with constant memory. --resume continues an interrupted --output file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+        parser.add_argument(
+            "--table",
+            choices=list(EXPORT_TABLES),
+            help="Export one table (required for csv), default is every table",
+        )
+        parser.add_argument("--user", action="append", help="Username to export, repeatable, default is all users")
+        parser.add_argument("--output", help="File to write, default is stdout")
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Append to an ndjson --output after the last complete row it already holds",
+        )
+
+    def handle(self, *args, **options):
+        fmt = options["format"]
+        tables = [options["table"]] if options["table"] else list(EXPORT_TABLES)
+        if fmt == "csv" and len(tables) != 1:
+            raise CommandError("csv exports one table at a time, pass --table")
+
+        user_ids = None
+        if options["user"]:
+            user_ids = list(User.objects.filter(username__in=options["user"]).values_list("id", flat=True))
+            if len(user_ids) != len(set(options["user"])):
+                raise CommandError("unknown username in --user")
+
+        output = options["output"]
+        checkpoint = None
+        mode = "w"
+        if options["resume"]:
+            if not output or fmt != "ndjson":
+                raise CommandError("--resume needs an ndjson --output file")
+            if os.path.exists(output):
+                mode = "a"
+                last_line = trim_to_last_line(output)
+                if last_line is not None:
+                    checkpoint = checkpoint_from_line(last_line)
+                    if checkpoint[0] not in tables:
+                        raise CommandError(f"{output} was not written with the same --table")
+
+        stream = export_stream(tables, fmt, user_ids=user_ids, checkpoint=checkpoint)
+        if not output:
+            for chunk in stream:
+                self.stdout.write(chunk, ending="")
+            return
+
+        with open(output, mode, newline="") as fh:
+            for chunk in stream:
+                fh.write(chunk)
+        where = f"after {checkpoint[0]} #{checkpoint[1]}" if checkpoint else "from the start"
+        self.stderr.write(f"Exported {', '.join(tables)} to {output} {where}")
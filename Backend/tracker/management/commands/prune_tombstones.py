@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from tracker.utils.sync import TOMBSTONE_RETENTION, prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes delta sync tombstones older than the retention window. Clients holding an "
+        "older sync token get a full reset instead. Schedule it daily next to rollover_habits."
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {deleted} tombstones older than {TOMBSTONE_RETENTION.days} days"
+        ))
@@ -0,0 +1,41 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.utils.querybudget import budget_config, merge_reports
+
+
+class Command(BaseCommand):
+    help = "Prints per-endpoint query counts and timings collected by QueryBudgetMiddleware, slowest first"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--json", action="store_true", help="Print the merged report as JSON")
+        parser.add_argument("--reset", action="store_true", help="Delete the collected stats afterwards")
+
+    def handle(self, *args, **options):
+        report_dir = budget_config().get("REPORT_DIR")
+        if not report_dir:
+            raise CommandError("QUERY_BUDGET['REPORT_DIR'] is not set")
+
+        files = sorted(Path(report_dir).glob("query_stats_*.json"))
+        rows = merge_reports(json.loads(f.read_text()) for f in files)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(dict(rows), indent=2))
+        else:
+            self.stdout.write(
+                f"{'endpoint':<34}{'reqs':>7}{'avg q':>8}{'max q':>7}{'budget':>8}"
+                f"{'over':>6}{'avg db ms':>11}{'avg ms':>9}{'max ms':>9}"
+            )
+            for name, s in rows:
+                n = s["requests"]
+                self.stdout.write(
+                    f"{name:<34}{n:>7}{s['queries'] / n:>8.1f}{s['max_queries']:>7}"
+                    f"{s['budget'] if s['budget'] is not None else '-':>8}{s['over_budget']:>6}"
+                    f"{s['db_ms'] / n:>11.2f}{s['wall_ms'] / n:>9.2f}{s['max_wall_ms']:>9.2f}"
+                )
+
+        if options["reset"]:
+            for f in files:
+                f.unlink()
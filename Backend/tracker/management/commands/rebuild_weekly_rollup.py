@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncWeek
+
+from tracker.models import DailyMetrics, WeeklyRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the WeeklyRollup leaderboard table from DailyMetrics"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report rows that differ from DailyMetrics, don't write anything",
+        )
+
+    def handle(self, *args, **options):
+        #one grouped scan of DailyMetrics gives the expected totals per (user, ISO week)
+        expected = {
+            (row["user_id"], row["week"]): (row["xp"] or 0, row["focus"] or 0)
+            for row in (
+                DailyMetrics.objects
+                .annotate(week=TruncWeek("metric_date"))
+                .values("user_id", "week")
+                .annotate(xp=Sum("xp_earned"), focus=Sum("total_study_minutes"))
+                .order_by()
+            )
+        }
+        current = {
+            (row["user_id"], row["week_start"]): (row["xp_earned"], row["focus_minutes"])
+            for row in WeeklyRollup.objects.values("user_id", "week_start", "xp_earned", "focus_minutes")
+        }
+
+        drift = [
+            key for key in expected.keys() | current.keys()
+            if expected.get(key, (0, 0)) != current.get(key, (0, 0))
+        ]
+
+        if options["check"]:
+            for user_id, week in sorted(drift):
+                self.stdout.write(
+                    f"user {user_id} week {week}: "
+                    f"rollup={current.get((user_id, week), (0, 0))} "
+                    f"daily_metrics={expected.get((user_id, week), (0, 0))}"
+                )
+            self.stdout.write(f"{len(drift)} of {len(expected)} weekly rows drifted")
+            return
+
+        with transaction.atomic():
+            WeeklyRollup.objects.all().delete()
+            WeeklyRollup.objects.bulk_create(
+                [
+                    WeeklyRollup(user_id=user_id, week_start=week, xp_earned=xp, focus_minutes=focus)
+                    for (user_id, week), (xp, focus) in expected.items()
+                ],
+                batch_size=1000,
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(expected)} weekly rows ({len(drift)} had drifted)"
+        ))
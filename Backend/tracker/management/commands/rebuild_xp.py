@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from tracker.utils.ledger import rebuild_from_ledger
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds profile XP and levels, DailyMetrics.xp_earned and WeeklyRollup.xp_earned from the "
+        "XPEvent ledger in one streaming pass. Pause the completion endpoints while it runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report how many rows drifted from the ledger, don't write anything",
+        )
+        parser.add_argument("--user", type=int, action="append", dest="users",
+                            help="Only rebuild this user id, can be repeated")
+
+    def handle(self, *args, **options):
+        counts = rebuild_from_ledger(
+            user_ids=options["users"],
+            check=options["check"],
+            report=lambda counts: self.stdout.write(f"{counts['profiles']} profiles folded"),
+        )
+        summary = (
+            f"{counts['profiles_drifted']} of {counts['profiles']} profiles, "
+            f"{counts['daily_updated']} daily rows (+{counts['daily_created']} missing) and "
+            f"{counts['weekly_updated']} weekly rows (+{counts['weekly_created']} missing) "
+        )
+        if options["check"]:
+            self.stdout.write(summary + "drifted from the ledger")
+        else:
+            self.stdout.write(self.style.SUCCESS(summary + "rebuilt from the ledger"))
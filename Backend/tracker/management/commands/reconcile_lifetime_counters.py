@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from tracker.models import DailyMetrics, FocusSession, UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the UserProfile lifetime counters and reports drift. Focus minutes, task and "
+        "habit completions come from DailyMetrics, session counts from FocusSession."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report profiles whose counters drifted, don't write anything",
+        )
+
+    def handle(self, *args, **options):
+        fields = UserProfile.LIFETIME_FIELDS
+        expected = {}
+        for row in (
+            DailyMetrics.objects
+            .values("user_id")
+            .annotate(
+                minutes=Sum("total_study_minutes"),
+                tasks=Sum("total_tasks_completed"),
+                habits=Sum("habits_completed"),
+            )
+            .order_by()
+        ):
+            expected[row["user_id"]] = {
+                "lifetime_focus_minutes": row["minutes"] or 0,
+                "lifetime_tasks_completed": row["tasks"] or 0,
+                "lifetime_habits_completed": row["habits"] or 0,
+            }
+        for row in FocusSession.objects.values("user_id").annotate(sessions=Sum("sessions_completed")).order_by():
+            expected.setdefault(row["user_id"], {})["lifetime_focus_sessions"] = row["sessions"] or 0
+
+        drifted = []
+        checked = 0
+        for profile in UserProfile.objects.only("user_id", *fields).iterator(chunk_size=2000):
+            checked += 1
+            totals = expected.get(profile.user_id, {})
+            changes = {
+                field: (getattr(profile, field), totals.get(field, 0))
+                for field in fields
+                if getattr(profile, field) != totals.get(field, 0)
+            }
+            if not changes:
+                continue
+            if options["check"]:
+                self.stdout.write(
+                    f"user {profile.user_id}: "
+                    + ", ".join(f"{field} {was} → {should}" for field, (was, should) in changes.items())
+                )
+            for field, (_, should) in changes.items():
+                setattr(profile, field, should)
+            drifted.append(profile)
+
+        if options["check"]:
+            self.stdout.write(f"{len(drifted)} of {checked} profiles drifted")
+            return
+
+        with transaction.atomic():
+            UserProfile.objects.bulk_update(drifted, fields, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled lifetime counters: {len(drifted)} of {checked} profiles corrected"
+        ))
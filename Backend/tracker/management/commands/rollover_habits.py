@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from tracker.utils.rollover import run_daily_rollover
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the daily habit rollover for all users: unticks habits completed "
+        "before today and zeroes streaks that lapsed. Schedule it just after midnight."
+    )
+
+    def handle(self, *args, **options):
+        result = run_daily_rollover()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Habit rollover done in {result['elapsed_ms']} ms: "
+            f"{result['streaks_reset']} streaks reset, "
+            f"{result['completions_cleared']} completions cleared, "
+            f"{result['profiles_synced']} profiles synced"
+        ))
@@ -0,0 +1,108 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connection
+
+from .utils import outbox
+from .utils.querybudget import QueryCounter, budget_config, budget_for, endpoint_for, query_stats
+
+logger = logging.getLogger(__name__)
+
+
+def _attach(counter):
+    connection.execute_wrappers.append(counter)
+
+def _detach(counter):
+    connection.execute_wrappers.remove(counter)
+
+
+class QueryBudgetMiddleware:
+    #records query count, DB time and wall time per method + resolved URL name
+    #async capable so the async views in async_views.py aren't pushed back onto a thread
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        return self.finish(request, response, counter, started)
+
+    async def __acall__(self, request):
+        #the async ORM runs queries on the request's thread-sensitive executor thread, which has
+        #its own connection, so the counter is attached there rather than on the event loop's
+        counter = QueryCounter()
+        started = time.perf_counter()
+        await sync_to_async(_attach)(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_detach)(counter)
+        return self.finish(request, response, counter, started)
+
+    def finish(self, request, response, counter, started):
+        wall_ms = (time.perf_counter() - started) * 1000
+        endpoint = endpoint_for(request.method, getattr(request, "resolver_match", None))
+        if endpoint is None:
+            return response
+
+        query_stats.record(endpoint, counter.count, counter.db_ms, wall_ms)
+
+        budget = budget_for(endpoint)
+        if budget is not None and counter.count > budget:
+            logger.warning("%s issued %d queries, budget is %d", endpoint, counter.count, budget)
+
+        if budget_config().get("HEADERS"):
+            response["X-Query-Count"] = str(counter.count)
+            response["X-DB-Time-Ms"] = f"{counter.db_ms:.2f}"
+            response["X-Wall-Time-Ms"] = f"{wall_ms:.2f}"
+
+        return response
+
+
+class OutboxMiddleware:
+    #applies the outbox events a request committed once its response has been sent, in this
+    #process, which holds the live event subscribers and the snapshot cache. Only used with
+    #OUTBOX["DRAIN_INLINE"], see utils/outbox.py
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        pending, token = outbox.begin_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            outbox.end_request(token)
+        return self.finish(response, pending)
+
+    async def __acall__(self, request):
+        pending, token = outbox.begin_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            outbox.end_request(token)
+        return self.finish(response, pending)
+
+    def finish(self, response, pending):
+        if pending:
+            #run by response.close(), which the server calls after the body has gone out
+            response._resource_closers.append(lambda: outbox.drain_after_response(pending))
+        return response
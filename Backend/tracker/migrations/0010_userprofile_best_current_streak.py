@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_best_current_streak(apps, schema_editor):
+    Habit = apps.get_model('tracker', 'Habit')
+    UserProfile = apps.get_model('tracker', 'UserProfile')
+    best = (
+        Habit.objects
+        .filter(user_id=OuterRef('user_id'))
+        .order_by()
+        .values('user_id')
+        .annotate(best=Max('current_streak'))
+        .values('best')
+    )
+    UserProfile.objects.update(best_current_streak=Coalesce(Subquery(best), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_remove_userprofile_weekly_focus_minutes_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='best_current_streak',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_best_current_streak, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncWeek
+
+
+def backfill_weekly_rollup(apps, schema_editor):
+    #same grouped scan as the rebuild_weekly_rollup command, so the boards aren't empty after deploy
+    DailyMetrics = apps.get_model('tracker', 'DailyMetrics')
+    WeeklyRollup = apps.get_model('tracker', 'WeeklyRollup')
+    rows = (
+        DailyMetrics.objects
+        .annotate(week=TruncWeek('metric_date'))
+        .values('user_id', 'week')
+        .annotate(xp=Sum('xp_earned'), focus=Sum('total_study_minutes'))
+        .order_by()
+    )
+    WeeklyRollup.objects.bulk_create(
+        [
+            WeeklyRollup(user_id=row['user_id'], week_start=row['week'],
+                         xp_earned=row['xp'] or 0, focus_minutes=row['focus'] or 0)
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0010_userprofile_best_current_streak'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('xp_earned', models.IntegerField(default=0)),
+                ('focus_minutes', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['week_start', '-xp_earned'], name='tracker_wee_week_st_ef33d1_idx'), models.Index(fields=['week_start', '-focus_minutes'], name='tracker_wee_week_st_a9005e_idx')],
+                'unique_together': {('user', 'week_start')},
+            },
+        ),
+        migrations.RunPython(backfill_weekly_rollup, migrations.RunPython.noop),
+    ]
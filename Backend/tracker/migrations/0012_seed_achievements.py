@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:20
+
+from django.db import migrations
+
+STANDARD_ACHIEVEMENTS = [
+    {"name": "Novice Explorer", "desc": "Reach Level 2", "xp": 50, "icon": "🌟"},
+    {"name": "Adept", "desc": "Reach Level 5", "xp": 100, "icon": "⭐"},
+    {"name": "XP Hoarder", "desc": "Accumulate 1000 Total XP", "xp": 200, "icon": "💰"},
+    {"name": "Streak Starter", "desc": "Achieve a 3-day habit streak", "xp": 50, "icon": "🔥"},
+    {"name": "Consistency Key", "desc": "Achieve a 7-day habit streak", "xp": 150, "icon": "📅"},
+    {"name": "Focus Initiate", "desc": "Log 60 minutes of focus time", "xp": 50, "icon": "🧠"},
+    {"name": "Deep Worker", "desc": "Log 300 minutes of focus time", "xp": 150, "icon": "🧘"},
+]
+
+
+def seed_achievements(apps, schema_editor):
+    Achievement = apps.get_model('tracker', 'Achievement')
+    for ach_data in STANDARD_ACHIEVEMENTS:
+        Achievement.objects.get_or_create(
+            achievement_name=ach_data["name"],
+            defaults={
+                "description": ach_data["desc"],
+                "xp_reward": ach_data["xp"],
+                "icon_url": ach_data["icon"],
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_weeklyrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_achievements, migrations.RunPython.noop),
+    ]
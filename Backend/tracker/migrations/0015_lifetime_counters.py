@@ -0,0 +1,59 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_lifetime_counters(apps, schema_editor):
+    DailyMetrics = apps.get_model('tracker', 'DailyMetrics')
+    FocusSession = apps.get_model('tracker', 'FocusSession')
+    UserProfile = apps.get_model('tracker', 'UserProfile')
+
+    def total(model, expression):
+        return Coalesce(Subquery(
+            model.objects
+            .filter(user_id=OuterRef('user_id'))
+            .order_by()
+            .values('user_id')
+            .annotate(total=Sum(expression))
+            .values('total')
+        ), 0)
+
+    UserProfile.objects.update(
+        lifetime_focus_minutes=total(DailyMetrics, 'total_study_minutes'),
+        lifetime_focus_sessions=total(FocusSession, 'sessions_completed'),
+        lifetime_tasks_completed=total(DailyMetrics, 'total_tasks_completed'),
+        lifetime_habits_completed=total(DailyMetrics, 'habits_completed'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0014_delta_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='lifetime_focus_minutes',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='lifetime_focus_sessions',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='lifetime_habits_completed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='lifetime_tasks_completed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_lifetime_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0015_lifetime_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminder',
+            name='claim_token',
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reminder',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reminder',
+            name='last_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reminder',
+            name='lead_hours',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reminder',
+            name='preset',
+            field=models.CharField(blank=True, choices=[('', 'Custom'), ('daily_habit', 'Daily habit nudge'), ('task_deadline', 'Task deadline')], default='', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(fields=['reminders_enabled', 'scheduled_time'], name='tracker_rem_reminde_24e099_idx'),
+        ),
+    ]
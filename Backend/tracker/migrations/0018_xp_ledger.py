@@ -0,0 +1,72 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:20
+
+from datetime import datetime, time, timezone as dt_timezone
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_opening_balances(apps, schema_editor):
+    #one "legacy" event per existing DailyMetrics XP day, plus a "legacy_balance" event for profile XP
+    #that isn't in any day (achievement rewards), so a rebuild from the ledger reproduces today's numbers
+    DailyMetrics = apps.get_model('tracker', 'DailyMetrics')
+    UserProfile = apps.get_model('tracker', 'UserProfile')
+    XPEvent = apps.get_model('tracker', 'XPEvent')
+
+    batch = []
+    def flush():
+        XPEvent.objects.bulk_create(batch)
+        batch.clear()
+
+    daily_totals = {}
+    for user_id, metric_date, xp in (
+        DailyMetrics.objects.exclude(xp_earned=0)
+        .order_by('user_id', 'metric_date')
+        .values_list('user_id', 'metric_date', 'xp_earned')
+        .iterator(chunk_size=5000)
+    ):
+        daily_totals[user_id] = daily_totals.get(user_id, 0) + xp
+        batch.append(XPEvent(
+            user_id=user_id, source_type='legacy', base_xp=xp,
+            created_at=datetime.combine(metric_date, time(), tzinfo=dt_timezone.utc),
+        ))
+        if len(batch) >= 5000:
+            flush()
+
+    now = django.utils.timezone.now()
+    for user_id, total_xp in UserProfile.objects.order_by('user_id').values_list('user_id', 'total_xp').iterator(chunk_size=5000):
+        balance = total_xp - daily_totals.get(user_id, 0)
+        if balance:
+            batch.append(XPEvent(user_id=user_id, source_type='legacy_balance', base_xp=balance, created_at=now))
+            if len(batch) >= 5000:
+                flush()
+    flush()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0017_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XPEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('task', 'Task'), ('habit', 'Habit'), ('focus_session', 'Focus session'), ('achievement', 'Achievement reward'), ('legacy', 'Daily XP from before the ledger'), ('legacy_balance', 'Profile XP from before the ledger not in any day'), ('other', 'Other')], max_length=20)),
+                ('source_id', models.BigIntegerField(blank=True, null=True)),
+                ('base_xp', models.IntegerField()),
+                ('theme_bonus', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'id'], name='tracker_xpe_user_id_b31103_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_opening_balances, migrations.RunPython.noop),
+    ]
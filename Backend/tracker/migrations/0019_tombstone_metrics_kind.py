@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0018_xp_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tombstone',
+            name='kind',
+            field=models.CharField(choices=[('habit', 'Habit'), ('task', 'Task'), ('subtask', 'SubTask'), ('focus_session', 'FocusSession'), ('metrics', 'DailyMetrics')], max_length=20),
+        ),
+    ]
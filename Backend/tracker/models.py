@@ -1,7 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .utils.events import leaderboard_changed, publish_streak
+from .utils.levels import level_for_xp
+
 class UserProfile(models.Model):
     THEME_CHOICES = [
         ("studies", "Studies"),
@@ -25,19 +30,56 @@ class UserProfile(models.Model):
     xp_enabled = models.BooleanField(default=True)
     streaks_enabled = models.BooleanField(default=True)
     leaderboards_enabled = models.BooleanField(default=True)
+    best_current_streak = models.IntegerField(default=0, db_index=True)  # max habit current_streak, feeds the streak leaderboard
+    #lifetime counters, incremented next to the DailyMetrics upsert, see reconcile_lifetime_counters
+    lifetime_focus_minutes = models.IntegerField(default=0)
+    lifetime_focus_sessions = models.IntegerField(default=0)
+    lifetime_tasks_completed = models.IntegerField(default=0)
+    lifetime_habits_completed = models.IntegerField(default=0)
     date_created = models.DateTimeField(auto_now_add=True)
 
+    XP_FIELDS = ["total_xp", "current_level_xp", "level", "xp_for_next_level"]
+    LIFETIME_FIELDS = [
+        "lifetime_focus_minutes", "lifetime_focus_sessions",
+        "lifetime_tasks_completed", "lifetime_habits_completed",
+    ]
+
     #xp system
+    #increments are applied in the database so concurrent awards can't overwrite each other
     def add_xp(self, xp):
         if not self.xp_enabled:
             return
-        self.total_xp += xp
-        self.current_level_xp += xp
-        while self.current_level_xp >= self.xp_for_next_level:
-            self.current_level_xp -= self.xp_for_next_level
-            self.level += 1
-            self.xp_for_next_level = int(self.xp_for_next_level * 1.25)
-        self.save()
+        with transaction.atomic():
+            #fast path: no level boundary crossed, a plain F() increment is enough
+            updated = UserProfile.objects.filter(
+                pk=self.pk,
+                current_level_xp__lt=F("xp_for_next_level") - xp,
+            ).update(
+                total_xp=F("total_xp") + xp,
+                current_level_xp=F("current_level_xp") + xp,
+            )
+            if not updated:
+                self._add_xp_with_level_up(xp)
+            self.refresh_from_db(fields=self.XP_FIELDS)
+
+    def _add_xp_with_level_up(self, xp):
+        #slow path: lock the row and look the new level up on the level curve
+        #the UPDATE is also guarded on the total we read, so on backends without
+        #SELECT ... FOR UPDATE (SQLite) a concurrent award makes us retry rather than lose XP
+        while True:
+            seen_total = (
+                UserProfile.objects.select_for_update()
+                .values_list("total_xp", flat=True)
+                .get(pk=self.pk)
+            )
+            level, current_level_xp, xp_for_next_level = level_for_xp(seen_total + xp)
+            if UserProfile.objects.filter(pk=self.pk, total_xp=seen_total).update(
+                total_xp=seen_total + xp,
+                current_level_xp=current_level_xp,
+                level=level,
+                xp_for_next_level=xp_for_next_level,
+            ):
+                return
 
     def __str__(self):
         return self.user.first_name
@@ -47,7 +89,7 @@ class Habit(models.Model):
     THEME_CHOICES = [("studies", "Studies"),("exercise", "Exercise"),("sleep", "Sleep"),("nutrition", "Nutrition"),
     ]
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="habits")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="habits", db_index=False)  # covered by the composite indexes
     habit_title = models.CharField(max_length=100)
     habit_notes = models.TextField(blank=True)
     habit_theme = models.CharField(max_length=50,choices=THEME_CHOICES,default="studies")
@@ -58,11 +100,28 @@ class Habit(models.Model):
     last_completed_date = models.DateField(null=True, blank=True)
     current_streak = models.IntegerField(default=0)
     longest_streak = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)  # delta sync, set by hand on bulk/queryset updates
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "is_completed"]),
+            models.Index(fields=["habit_frequency", "last_completed_date"]),  # daily rollover
+            models.Index(fields=["user", "updated_at"]),
+        ]
 
     def update_streak(self):
-        today = timezone.now().date()
-        if self.last_completed_date == today:
+        if not self.advance_streak():
             return  # already counted today
+        self.save()
+        sync_best_streak([self.user_id])
+        publish_streak(self)
+
+    def advance_streak(self, today=None):
+        #in-memory part of update_streak, returns False if already counted today
+        #the bulk completion endpoint calls this and saves everything with bulk_update
+        today = today or timezone.now().date()
+        if self.last_completed_date == today:
+            return False
 
         yesterday = today - timezone.timedelta(days=1)
 
@@ -75,7 +134,7 @@ class Habit(models.Model):
             self.longest_streak = self.current_streak
 
         self.last_completed_date = today
-        self.save()
+        return True
 
     def should_reset(self):
         if self.habit_frequency == "daily":
@@ -87,8 +146,25 @@ class Habit(models.Model):
         return self.habit_title
 
 
+def sync_best_streak(user_ids):
+    #recomputes UserProfile.best_current_streak for the given users in one UPDATE
+    best = (
+        Habit.objects
+        .filter(user_id=OuterRef("user_id"))
+        .order_by()
+        .values("user_id")
+        .annotate(best=Max("current_streak"))
+        .values("best")
+    )
+    updated = UserProfile.objects.filter(user_id__in=user_ids).update(
+        best_current_streak=Coalesce(Subquery(best), 0)
+    )
+    leaderboard_changed()
+    return updated
+
+
 class Task(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="tasks")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="tasks", db_index=False)  # covered by the composite indexes
     task_title = models.CharField(max_length=100)
     task_notes = models.TextField(blank=True)
     task_difficulty = models.CharField(max_length=50)
@@ -98,6 +174,14 @@ class Task(models.Model):
     deadline = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     task_theme = models.CharField(max_length=50, choices=Habit.THEME_CHOICES, default="studies")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "is_completed"]),
+            models.Index(fields=["user", "created_at"]),
+            models.Index(fields=["user", "updated_at"]),
+        ]
 
     def is_overdue(self):
         if self.deadline:
@@ -118,17 +202,25 @@ class SubTask(models.Model):
     )
     description = models.CharField(max_length=255)
     is_completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.description
 
 
 class FocusSession(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)  # covered by (user, created_at)
     duration_minutes = models.IntegerField()
     sessions_completed = models.IntegerField(default=1)
     xp_earned = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"]),
+            models.Index(fields=["user", "updated_at"]),
+        ]
 
 #backend - tracker/models.py
     def __str__(self):
@@ -144,27 +236,148 @@ class DailyMetrics(models.Model):
     xp_earned = models.IntegerField(default=0)
     weekly_xp = models.IntegerField(default=0)
     weekly_focus_minutes = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)  # also bumped by the upsert in utils/metrics.py
 
     class Meta:
-        unique_together = ("user", "metric_date")
+        unique_together = ("user", "metric_date")  # also serves the per-user date range reads
+        indexes = [
+            models.Index(fields=["metric_date"]),  # cross-user date filters
+            models.Index(fields=["user", "updated_at"]),
+        ]
 
     def __str__(self):
         return f"{self.user.first_name} - {self.metric_date}"
 
 
+class WeeklyRollup(models.Model):
+    #per-user totals for one ISO week, maintained alongside DailyMetrics for the leaderboards
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    week_start = models.DateField()  # monday of the ISO week
+    xp_earned = models.IntegerField(default=0)
+    focus_minutes = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "week_start")
+        indexes = [
+            models.Index(fields=["week_start", "-xp_earned"]),
+            models.Index(fields=["week_start", "-focus_minutes"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user.first_name} - week of {self.week_start}"
+
+
+class Tombstone(models.Model):
+    #record of a deleted tracker row so delta sync clients can drop it too
+    KIND_CHOICES = [
+        ("habit", "Habit"), ("task", "Task"), ("subtask", "SubTask"), ("focus_session", "FocusSession"),
+        ("metrics", "DailyMetrics"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)  # covered by (user, deleted_at)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "deleted_at"]),
+            models.Index(fields=["deleted_at"]),  # pruning
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted"
+
+
 class Reminder(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     habit = models.ForeignKey(Habit, null=True, blank=True, on_delete=models.SET_NULL)
     task = models.ForeignKey(Task, null=True, blank=True, on_delete=models.SET_NULL)
 
+    PRESET_CHOICES = [
+        ("", "Custom"),  # fires once at scheduled_time
+        ("daily_habit", "Daily habit nudge"),  # fires every day at the scheduled time of day
+        ("task_deadline", "Task deadline"),  # fires once, lead_hours before task.deadline
+    ]
+
     reminder_type = models.CharField(max_length=50)  # preset / custom
-    scheduled_time = models.DateTimeField()
+    scheduled_time = models.DateTimeField()  # next fire time
     reminders_enabled = models.BooleanField(default=True)
+    preset = models.CharField(max_length=20, choices=PRESET_CHOICES, blank=True, default="")
+    lead_hours = models.IntegerField(default=0)
+    #dispatch bookkeeping, see tracker/utils/reminders.py
+    claim_token = models.UUIDField(null=True, blank=True, db_index=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    last_sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["reminders_enabled", "scheduled_time"]),  # due queue
+        ]
 
     def __str__(self):
         return f"Reminder for {self.user.first_name}"
 
 
+class XPEvent(models.Model):
+    #append-only XP ledger, one row per XP change. UserProfile XP/level, DailyMetrics.xp_earned and
+    #WeeklyRollup.xp_earned are folds over it and can be rebuilt with the rebuild_xp command
+    SOURCE_CHOICES = [
+        ("task", "Task"),
+        ("habit", "Habit"),
+        ("focus_session", "Focus session"),
+        ("achievement", "Achievement reward"),
+        ("legacy", "Daily XP from before the ledger"),  # one per DailyMetrics row, migration 0018
+        ("legacy_balance", "Profile XP from before the ledger not in any day"),
+        ("other", "Other"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)  # covered by (user, id)
+    source_type = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    source_id = models.BigIntegerField(null=True, blank=True)
+    base_xp = models.IntegerField()
+    theme_bonus = models.IntegerField(default=0)  # awarded XP is base_xp + theme_bonus
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "id"]),  # per-user history, and the order rebuild_xp reads in
+        ]
+
+    def __str__(self):
+        return f"{self.base_xp + self.theme_bonus} XP from {self.source_type} for user {self.user_id}"
+
+
+class OutboxEvent(models.Model):
+    #side effects of a completion (metrics, rollups, achievements), written in the same transaction
+    #as the completion and applied later in batches by the drain_outbox command, see tracker/utils/outbox.py
+    KIND_CHOICES = [
+        ("task_completed", "Task completed"),
+        ("habit_completed", "Habit completed"),
+        ("focus_logged", "Focus session logged"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict)  # metric deltas, see outbox.enqueue
+    created_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)  # failed applies
+    last_error = models.TextField(blank=True)
+    claim_token = models.UUIDField(null=True, blank=True, db_index=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            #the pending queue, stays as small as the backlog however much history is kept
+            models.Index(fields=["id"], condition=Q(processed_at__isnull=True), name="outbox_pending_idx"),
+            models.Index(fields=["processed_at"]),  # pruning
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for user {self.user_id}"
+
+
 class Achievement(models.Model):
     achievement_name = models.CharField(max_length=100)
     description = models.TextField()
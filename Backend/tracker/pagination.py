@@ -0,0 +1,28 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+
+
+class TrackerCursorPagination(CursorPagination):
+    #keyset pagination for every tracker list endpoint
+    #views set cursor_ordering (default newest id first) and optionally since_lookup
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = ("-id",)
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(getattr(view, "cursor_ordering", self.ordering))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        #?since=<value of the first ordering field> only returns rows past that point,
+        #so clients can fetch just what is new since their last sync
+        since = request.query_params.get("since")
+        if since:
+            field = self.get_ordering(request, queryset, view)[0].lstrip("-")
+            lookup = getattr(view, "since_lookup", f"{field}__gt")
+            try:
+                queryset = queryset.filter(**{lookup: since})
+            except (DjangoValidationError, ValueError):
+                raise ValidationError({"since": f"Invalid value for {field}."})
+        return super().paginate_queryset(queryset, request, view)
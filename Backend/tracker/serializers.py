@@ -1,9 +1,13 @@
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from .models import (
     Habit, Task, FocusSession, DailyMetrics,
     Reminder, Achievement, UserAchievement,
     SocialPod, UserPod, SubTask
 )
+from .utils.reminders import deadline_fire_time
+from .utils.sync import record_deletions
 
 class HabitSerializer(serializers.ModelSerializer):
     class Meta:
@@ -22,8 +26,17 @@ class SubTaskSerializer(serializers.ModelSerializer):
         model = SubTask
         fields = ["id", "description", "is_completed"]
 
+class SyncSubTaskSerializer(SubTaskSerializer):
+    #delta sync sends changed subtasks on their own, so they carry their task id
+    class Meta(SubTaskSerializer.Meta):
+        fields = ["id", "task", "description", "is_completed"]
+
+class NestedSubTaskSerializer(SubTaskSerializer):
+    #id is writable here so a task update can say which existing subtask an item is
+    id = serializers.IntegerField(required=False)
+
 class TaskSerializer(serializers.ModelSerializer):
-    subtasks = SubTaskSerializer(many=True, required=False)
+    subtasks = NestedSubTaskSerializer(many=True, required=False)
 
     class Meta:
         model = Task
@@ -42,13 +55,76 @@ class TaskSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         subtasks_data = validated_data.pop("subtasks", [])
-        task = Task.objects.create(**validated_data)  # user is added by perform_create
 
-        for subtask_data in subtasks_data:
-            SubTask.objects.create(task=task, **subtask_data)
+        with transaction.atomic():
+            task = Task.objects.create(**validated_data)  # user is added by perform_create
+            SubTask.objects.bulk_create([
+                SubTask(
+                    task=task,
+                    description=subtask_data["description"],
+                    is_completed=subtask_data.get("is_completed", False),
+                )
+                for subtask_data in subtasks_data
+            ])
 
         return task
 
+    def update(self, instance, validated_data):
+        subtasks_data = validated_data.pop("subtasks", None)
+
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if subtasks_data is not None:
+                self.sync_subtasks(instance, subtasks_data)
+
+        return instance
+
+    def sync_subtasks(self, task, subtasks_data):
+        #the incoming list is the full checklist: items with an id update that subtask,
+        #items without one are new, and existing subtasks left out are deleted
+        #at most one bulk_create, one bulk_update and one delete whatever the list size
+        existing = {subtask.id: subtask for subtask in task.subtasks.all()}
+        to_create = []
+        to_update = []
+        kept = set()
+
+        for item in subtasks_data:
+            subtask_id = item.get("id")
+            if subtask_id is None:
+                if "description" not in item:
+                    raise serializers.ValidationError({"subtasks": "New subtasks need a description."})
+                to_create.append(SubTask(
+                    task=task,
+                    description=item["description"],
+                    is_completed=item.get("is_completed", False),
+                ))
+                continue
+
+            subtask = existing.get(subtask_id)
+            if subtask is None:
+                raise serializers.ValidationError({"subtasks": f"Subtask {subtask_id} is not part of this task."})
+            kept.add(subtask_id)
+
+            changed = False
+            for field in ("description", "is_completed"):
+                if field in item and getattr(subtask, field) != item[field]:
+                    setattr(subtask, field, item[field])
+                    changed = True
+            if changed:
+                to_update.append(subtask)
+
+        removed = existing.keys() - kept
+        if removed:
+            SubTask.objects.filter(task=task, id__in=removed).delete()
+            record_deletions(task.user_id, "subtask", removed)
+        if to_update:
+            now = timezone.now()
+            for subtask in to_update:
+                subtask.updated_at = now  # bulk_update skips auto_now
+            SubTask.objects.bulk_update(to_update, ["description", "is_completed", "updated_at"])
+        if to_create:
+            SubTask.objects.bulk_create(to_create)
+
 class FocusSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = FocusSession
@@ -56,14 +132,40 @@ class FocusSessionSerializer(serializers.ModelSerializer):
         read_only_fields = ("user", "xp_earned", "created_at")
 
 class DailyMetricsSerializer(serializers.ModelSerializer):
+    #rows always belong to the requesting user, hidden so unique_together is still validated
+    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+
     class Meta:
         model = DailyMetrics
         fields = '__all__'
 
 class ReminderSerializer(serializers.ModelSerializer):
+    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+
     class Meta:
         model = Reminder
         fields = '__all__'
+        read_only_fields = ("claim_token", "claimed_until", "last_sent_at")
+        extra_kwargs = {"scheduled_time": {"required": False}}  # derived for task_deadline
+
+    def validate(self, attrs):
+        #a reminder can only point at the user's own habit or task
+        user = self.context["request"].user
+        for field in ("habit", "task"):
+            target = attrs.get(field)
+            if target is not None and target.user_id != user.id:
+                raise serializers.ValidationError({field: "Not found."})
+
+        preset = attrs.get("preset", getattr(self.instance, "preset", ""))
+        if preset == "task_deadline":
+            task = attrs.get("task", getattr(self.instance, "task", None))
+            if task is None or task.deadline is None:
+                raise serializers.ValidationError({"task": "Deadline reminders need a task with a deadline."})
+            lead_hours = attrs.get("lead_hours", getattr(self.instance, "lead_hours", 0))
+            attrs["scheduled_time"] = deadline_fire_time(task.deadline, lead_hours)
+        elif "scheduled_time" not in attrs and self.instance is None:
+            raise serializers.ValidationError({"scheduled_time": "This field is required."})
+        return attrs
 
 
 class AchievementSerializer(serializers.ModelSerializer):
@@ -73,6 +175,8 @@ class AchievementSerializer(serializers.ModelSerializer):
 
 
 class UserAchievementSerializer(serializers.ModelSerializer):
+    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+
     class Meta:
         model = UserAchievement
         fields = '__all__'
@@ -85,6 +189,8 @@ class SocialPodSerializer(serializers.ModelSerializer):
 
 
 class UserPodSerializer(serializers.ModelSerializer):
+    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+
     class Meta:
         model = UserPod
         fields = '__all__'
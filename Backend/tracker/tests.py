@@ -1,11 +1,72 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from unittest import mock, skipUnless
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
 from django.contrib.auth.models import User
+from django.test import AsyncClient
 from rest_framework.test import APITestCase, APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 from datetime import date, timedelta
+from io import StringIO
+from django.core.management import CommandError, call_command
 from tracker.models import (
-    UserProfile, Habit, DailyMetrics, Achievement, UserAchievement
+    UserProfile, Habit, Task, DailyMetrics, Achievement, UserAchievement,
+    WeeklyRollup, FocusSession, SubTask, Tombstone, Reminder, OutboxEvent,
+    SocialPod, UserPod, XPEvent,
 )
+from tracker.utils.metrics import update_daily_metrics, update_daily_xp, week_start_for
+from tracker.utils.rollover import run_daily_rollover
+from tracker.utils.snapshot import get_snapshot, set_snapshot
+from tracker.utils.xp import award_xp
+from tracker.utils.querybudget import budget_for, endpoint_for, query_stats
+from tracker.utils.reminders import claim_batch, dispatch_due
+from tracker.utils.outbox import drain
+from tracker.utils.ledger import rebuild_from_ledger
+from tracker.utils.events import LEADERBOARD_GROUP, InMemoryBroker, LeaderboardNotifier, get_broker, user_group
+from tracker.utils.synthetic import seed_population
+from tracker.management.commands.bench_api import percentile
+from tracker.utils.levels import LEVEL_THRESHOLDS, level_for_xp
+from tracker.management.commands.bench_levels import loop_level_for_xp
+
+#stats are still collected while testing, only the per-process report files are switched off
+_no_query_reports = override_settings(QUERY_BUDGET={**settings.QUERY_BUDGET, "REPORT_DIR": None})
+
+def setUpModule():
+    _no_query_reports.enable()
+
+def tearDownModule():
+    _no_query_reports.disable()
+
+
+class QueryBudgetTestMixin:
+    #for APITestCase: request an endpoint and fail if it issues more queries than its budget
+    def assertWithinQueryBudget(self, method, path, *args, **kwargs):
+        endpoint = endpoint_for(method.upper(), resolve(path.split("?")[0]))
+        budget = budget_for(endpoint)
+        self.assertIsNotNone(budget, f"no query budget configured for {endpoint!r}")
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(path, *args, **kwargs)
+
+        self.assertLessEqual(
+            len(ctx.captured_queries), budget,
+            f"{endpoint} issued {len(ctx.captured_queries)} queries, budget is {budget}:\n"
+            + "\n".join(q["sql"] for q in ctx.captured_queries)
+        )
+        return response
 
 
 # ── XP & LEVEL UP SYSTEM ──────────────────────────────────────────────────────
@@ -159,4 +220,1495 @@ class MascotLogicTest(TestCase):
 
     def test_no_level_up_shows_theme_mascot(self):
         mascot, _ = self.get_mascot(1, 1, 25)
-        self.assertEqual(mascot, "ThemeMascot")
\ No newline at end of file
+        self.assertEqual(mascot, "ThemeMascot")
+
+# ── STREAK LEADERBOARD ────────────────────────────────────────────────────────
+
+class StreakLeaderboardTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="board_user", password="pass", first_name="Board")
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.habit = Habit.objects.create(
+            user=self.user, habit_title="Read",
+            habit_difficulty="easy", habit_frequency="daily", xp_reward=10
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_update_streak_syncs_best_current_streak(self):
+        self.habit.last_completed_date = date.today() - timedelta(days=1)
+        self.habit.current_streak = 4
+        self.habit.save()
+        self.habit.update_streak()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.best_current_streak, 5)
+
+    def test_deleting_a_habit_drops_its_streak(self):
+        self.habit.current_streak = 6
+        self.habit.save()
+        self.habit.update_streak()
+        self.client.delete(f"/api/habits/{self.habit.id}/")
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.best_current_streak, 0)
+
+    def test_streak_board_is_single_query(self):
+        for i in range(5):
+            other = User.objects.create_user(username=f"other{i}", password="pass")
+            UserProfile.objects.create(user=other, best_current_streak=i)
+        self.habit.update_streak()
+
+        # one query authenticates the JWT user, one reads the board
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/leaderboard/?type=streak")
+        self.assertEqual(response.data[0]["value"], 4)
+        self.assertEqual(len(response.data), 6)
+
+
+# ── WEEKLY LEADERBOARD ROLLUP ─────────────────────────────────────────────────
+
+class WeeklyRollupTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="week_user", password="pass", first_name="Week")
+        self.profile = UserProfile.objects.create(user=self.user)
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_update_daily_xp_feeds_rollup(self):
+        update_daily_xp(self.user, xp=30)
+        update_daily_xp(self.user, xp=20)
+        rollup = WeeklyRollup.objects.get(user=self.user, week_start=week_start_for(date.today()))
+        self.assertEqual(rollup.xp_earned, 50)
+
+    def test_focus_session_feeds_focus_board(self):
+        self.client.post("/api/focus-sessions/", {"duration_minutes": 25, "sessions_completed": 2})
+        drain()  # side effects are applied by the outbox drainer
+        response = self.client.get("/api/leaderboard/?type=focus")
+        self.assertEqual(response.data[0]["value"], 50)
+
+    def test_rebuild_command_repairs_drift(self):
+        today = date.today()
+        DailyMetrics.objects.create(user=self.user, metric_date=today, xp_earned=40, total_study_minutes=15)
+        WeeklyRollup.objects.create(user=self.user, week_start=week_start_for(today), xp_earned=999)
+
+        out = StringIO()
+        call_command("rebuild_weekly_rollup", "--check", stdout=out)
+        self.assertIn("1 of 1 weekly rows drifted", out.getvalue())
+
+        call_command("rebuild_weekly_rollup", stdout=StringIO())
+        rollup = WeeklyRollup.objects.get(user=self.user)
+        self.assertEqual((rollup.xp_earned, rollup.focus_minutes), (40, 15))
+
+    def test_migration_backfills_from_daily_metrics(self):
+        from django.apps import apps
+        from importlib import import_module
+        backfill = import_module("tracker.migrations.0011_weeklyrollup").backfill_weekly_rollup
+
+        monday = week_start_for(date.today())
+        for days_ago, xp, minutes in ((0, 40, 15), (1, 10, 5), (7, 25, 0)):
+            DailyMetrics.objects.create(user=self.user, metric_date=monday + timedelta(days=1 - days_ago),
+                                        xp_earned=xp, total_study_minutes=minutes)
+
+        backfill(apps, None)
+        self.assertEqual(
+            set(WeeklyRollup.objects.values_list("week_start", "xp_earned", "focus_minutes")),
+            {(monday, 50, 20), (monday - timedelta(days=7), 25, 0)},
+        )
+
+
+# ── DAILY HABIT ROLLOVER ──────────────────────────────────────────────────────
+
+class HabitRolloverTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="roll_user", password="pass")
+        self.profile = UserProfile.objects.create(user=self.user, best_current_streak=6)
+        today = date.today()
+        self.lapsed = Habit.objects.create(
+            user=self.user, habit_title="Gym", habit_difficulty="easy", habit_frequency="daily",
+            is_completed=True, current_streak=6, last_completed_date=today - timedelta(days=3))
+        self.yesterday = Habit.objects.create(
+            user=self.user, habit_title="Read", habit_difficulty="easy", habit_frequency="daily",
+            is_completed=True, current_streak=2, last_completed_date=today - timedelta(days=1))
+
+    def test_rollover_resets_lapsed_and_unticks(self):
+        result = run_daily_rollover()
+        self.assertEqual(result["streaks_reset"], 1)
+        self.assertEqual(result["completions_cleared"], 2)
+
+        self.lapsed.refresh_from_db()
+        self.yesterday.refresh_from_db()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.lapsed.current_streak, 0)
+        self.assertEqual(self.yesterday.current_streak, 2)
+        self.assertFalse(self.yesterday.is_completed)
+        self.assertEqual(self.profile.best_current_streak, 2)
+
+    def test_rollover_invalidates_cached_dashboards(self):
+        set_snapshot(self.user.id, {"habits": "stale"})
+        run_daily_rollover()
+        self.assertIsNone(get_snapshot(self.user.id))
+
+    def test_second_run_touches_nothing(self):
+        run_daily_rollover()
+        result = run_daily_rollover()
+        self.assertEqual(result["streaks_reset"] + result["completions_cleared"], 0)
+
+
+# ── PROGRESS HISTORY ──────────────────────────────────────────────────────────
+
+class UserProgressTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="progress_user", password="pass")
+        UserProfile.objects.create(user=self.user)
+        today = date.today()
+        DailyMetrics.objects.bulk_create([
+            DailyMetrics(user=self.user, metric_date=today - timedelta(days=i), xp_earned=10)
+            for i in range(100)
+        ])
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_default_window_has_rolling_weekly_xp(self):
+        response = self.client.get("/api/progress/")
+        self.assertEqual(len(response.data), 7)
+        self.assertEqual(response.data[0]["weekly_xp"], 70)
+
+    def test_query_count_does_not_grow_with_range(self):
+        # one query authenticates the JWT user, one fetches the window
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/progress/?days=90")
+        self.assertEqual(len(response.data), 90)
+
+    def test_month_granularity_buckets(self):
+        response = self.client.get("/api/progress/?days=90&granularity=month")
+        self.assertEqual(sum(point["daily_xp"] for point in response.data), 900)
+
+    def test_invalid_granularity_rejected(self):
+        response = self.client.get("/api/progress/?granularity=year")
+        self.assertEqual(response.status_code, 400)
+
+
+# ── ACHIEVEMENT RULES ─────────────────────────────────────────────────────────
+
+class AchievementRulesTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="rules_user", password="pass")
+        self.profile = UserProfile.objects.create(user=self.user)
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def unlocked_names(self):
+        return set(UserAchievement.objects.filter(user=self.user)
+                   .values_list("achievement__achievement_name", flat=True))
+
+    def test_level_up_unlocks_on_xp_event(self):
+        award_xp(self.user, base_xp=100)
+        self.assertIn("Novice Explorer", self.unlocked_names())
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.total_xp, 150)  # 100 + 50 reward
+
+    def test_streak_rule_unlocks_on_habit_completion(self):
+        habit = Habit.objects.create(
+            user=self.user, habit_title="Run", habit_difficulty="easy", habit_frequency="daily",
+            xp_reward=10, current_streak=2, last_completed_date=date.today() - timedelta(days=1))
+        self.client.post(f"/api/habits/{habit.id}/complete/")
+        drain()  # side effects are applied by the outbox drainer
+        self.assertIn("Streak Starter", self.unlocked_names())
+
+    def test_focus_rule_unlocks_on_session(self):
+        self.client.post("/api/focus-sessions/", {"duration_minutes": 30, "sessions_completed": 2})
+        drain()  # side effects are applied by the outbox drainer
+        self.assertIn("Focus Initiate", self.unlocked_names())
+
+    def test_get_is_read_only(self):
+        award_xp(self.user, base_xp=100)
+        # auth (user and profile in one query) and the achievements join
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/progress/achievements/")
+        unlocked = [a["name"] for a in response.data["achievements"] if a["unlocked"]]
+        self.assertEqual(unlocked, ["Novice Explorer"])
+
+    def test_newly_unlocked_since_previous_check(self):
+        checked_at = self.client.get("/api/progress/achievements/").data["checked_at"]
+        award_xp(self.user, base_xp=100)
+        response = self.client.get("/api/progress/achievements/", {"since": checked_at})
+        self.assertEqual(response.data["newly_unlocked"], ["Novice Explorer"])
+
+    def test_naive_since_is_read_as_local_time(self):
+        award_xp(self.user, base_xp=100)
+        response = self.client.get("/api/progress/achievements/", {"since": "2025-01-01T00:00:00"})
+        self.assertEqual(response.data["newly_unlocked"], ["Novice Explorer"])
+
+    def test_invalid_since_rejected(self):
+        for since in ("2025-13-40T00:00:00", "last tuesday"):
+            response = self.client.get("/api/progress/achievements/", {"since": since})
+            self.assertEqual(response.status_code, 400)
+
+
+# ── CONCURRENT XP AWARDS ──────────────────────────────────────────────────────
+
+class ConcurrentXPTest(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="race_user", password="pass")
+        self.profile = UserProfile.objects.create(user=self.user)
+
+    def test_parallel_awards_do_not_lose_xp(self):
+        threads_count, awards_per_thread, xp = 8, 25, 7
+
+        def worker():
+            try:
+                profile = UserProfile.objects.get(pk=self.profile.pk)
+                for _ in range(awards_per_thread):
+                    profile.add_xp(xp)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        total = threads_count * awards_per_thread * xp
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.total_xp, total)
+
+        # level fields must match a single sequential award of the same total
+        level, current, needed = 1, total, 100
+        while current >= needed:
+            current -= needed
+            level += 1
+            needed = int(needed * 1.25)
+        self.assertEqual(
+            (self.profile.level, self.profile.current_level_xp, self.profile.xp_for_next_level),
+            (level, current, needed)
+        )
+
+    @override_settings(OUTBOX={"DRAIN_INLINE": False})  # achievement rewards would add XP of their own
+    def test_parallel_completions_do_not_lose_xp(self):
+        #each thread loads the profile through award_xp and then awards, via the real endpoints,
+        #so level-ups race on the select_for_update path too
+        self.profile.primary_theme = "exercise"
+        self.profile.save()
+        threads_count, tasks_per_thread, sessions_per_thread = 6, 5, 3
+        task_ids = [
+            [Task.objects.create(user=self.user, task_title=f"Task {t}-{i}", task_difficulty="medium",
+                                 task_theme="studies", xp_reward=20).id for i in range(tasks_per_thread)]
+            for t in range(threads_count)
+        ]
+        token = RefreshToken.for_user(self.user).access_token
+        errors = []
+
+        def worker(ids):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            try:
+                for task_id in ids:
+                    if client.post(f"/api/tasks/{task_id}/complete/").status_code != 200:
+                        errors.append(task_id)
+                for _ in range(sessions_per_thread):
+                    if client.post("/api/focus-sessions/", {"duration_minutes": 10}).status_code != 201:
+                        errors.append("focus")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(ids,)) for ids in task_ids]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        total = threads_count * (tasks_per_thread * 20 + sessions_per_thread * 10)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.total_xp, total)
+        self.assertEqual(
+            (self.profile.level, self.profile.current_level_xp, self.profile.xp_for_next_level),
+            level_for_xp(total),
+        )
+        self.assertEqual(sum(XPEvent.objects.filter(user=self.user).values_list("base_xp", flat=True)), total)
+
+
+# ── LEVEL CURVE ───────────────────────────────────────────────────────────────
+
+class LevelCurveTest(TestCase):
+
+    def test_table_matches_loop_on_random_totals(self):
+        rng = random.Random(1234)
+        for _ in range(2000):
+            total = rng.randint(0, 10 ** rng.randint(1, 15))
+            self.assertEqual(level_for_xp(total), loop_level_for_xp(total), total)
+
+    def test_table_matches_loop_on_boundaries(self):
+        for threshold in LEVEL_THRESHOLDS[:60]:
+            for total in (threshold - 1, threshold, threshold + 1):
+                if total >= 0:
+                    self.assertEqual(level_for_xp(total), loop_level_for_xp(total), total)
+
+    def test_bulk_award_matches_incremental_awards(self):
+        user = User.objects.create_user(username="bulk_xp_user", password="pass")
+        bulk = UserProfile.objects.create(user=user)
+        bulk.add_xp(5_000_000)
+        self.assertEqual(
+            (bulk.level, bulk.current_level_xp, bulk.xp_for_next_level),
+            loop_level_for_xp(5_000_000)
+        )
+
+
+# ── DAILY METRICS UPSERT ──────────────────────────────────────────────────────
+
+class DailyMetricsUpsertTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="upsert_user", password="pass")
+        UserProfile.objects.create(user=self.user)
+
+    def test_increments_accumulate_on_one_row(self):
+        update_daily_metrics(self.user, xp=10, focus_minutes=25)
+        update_daily_metrics(self.user, xp=5, tasks_completed=1, habits_completed=2)
+        metric = DailyMetrics.objects.get(user=self.user, metric_date=date.today())
+        self.assertEqual(
+            (metric.xp_earned, metric.total_study_minutes, metric.total_tasks_completed, metric.habits_completed),
+            (15, 25, 1, 2)
+        )
+        rollup = WeeklyRollup.objects.get(user=self.user)
+        self.assertEqual((rollup.xp_earned, rollup.focus_minutes), (15, 25))
+
+    def test_one_statement_per_table(self):
+        update_daily_metrics(self.user, xp=10)
+        with CaptureQueriesContext(connection) as ctx:
+            update_daily_metrics(self.user, xp=10)
+        writes = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(writes), 2)
+        self.assertEqual(len(ctx.captured_queries) - len(writes), 2)  # savepoint + release
+
+    def test_task_completion_counts_task(self):
+        task = Task.objects.create(user=self.user, task_title="Essay", task_difficulty="easy", xp_reward=10)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.post(f"/api/tasks/{task.id}/complete/")
+        drain()  # side effects are applied by the outbox drainer
+        metric = DailyMetrics.objects.get(user=self.user)
+        self.assertEqual((metric.total_tasks_completed, metric.xp_earned), (1, 15))  # studies theme bonus
+
+
+# ── QUERY BUDGETS ─────────────────────────────────────────────────────────────
+
+class QueryBudgetTest(QueryBudgetTestMixin, APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="budget_user", password="pass")
+        UserProfile.objects.create(user=self.user)
+        for i in range(5):
+            Habit.objects.create(user=self.user, habit_title=f"Habit {i}", habit_difficulty="easy",
+                                 habit_frequency="daily", xp_reward=10)
+            task = Task.objects.create(user=self.user, task_title=f"Task {i}", task_difficulty="easy", xp_reward=10)
+            task.subtasks.create(description="step")
+            DailyMetrics.objects.create(user=self.user, metric_date=date.today() - timedelta(days=i), xp_earned=5)
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_read_endpoints_within_budget(self):
+        for path in ("/api/habits/", "/api/tasks/", "/api/focus-sessions/", "/api/dashboard/",
+                     "/api/leaderboard/?type=streak", "/api/leaderboard/?type=xp",
+                     "/api/progress/?days=365", "/api/progress/achievements/", "/api/sync/"):
+            self.assertWithinQueryBudget("get", path)
+
+    def test_completions_within_budget(self):
+        habit = Habit.objects.filter(user=self.user).first()
+        task = Task.objects.filter(user=self.user).first()
+        self.assertWithinQueryBudget("post", f"/api/habits/{habit.id}/complete/")
+        self.assertWithinQueryBudget("post", f"/api/tasks/{task.id}/complete/")
+        self.assertWithinQueryBudget("post", "/api/focus-sessions/", {"duration_minutes": 25})
+
+    def one_xp_short_of_level_up(self):
+        profile = UserProfile.objects.get(user=self.user)
+        total = profile.total_xp + profile.xp_for_next_level - profile.current_level_xp - 1
+        profile.total_xp = total
+        profile.level, profile.current_level_xp, profile.xp_for_next_level = level_for_xp(total)
+        profile.save()
+
+    def test_level_up_completions_within_budget(self):
+        #crossing a level takes the select_for_update path in add_xp, the budgets are for this worst case
+        habits = list(Habit.objects.filter(user=self.user))
+        task = Task.objects.filter(user=self.user).first()
+        for method, path, data in (
+            ("post", f"/api/habits/{habits[0].id}/complete/", None),
+            ("post", f"/api/tasks/{task.id}/complete/", None),
+            ("post", "/api/focus-sessions/", {"duration_minutes": 25}),
+        ):
+            self.one_xp_short_of_level_up()
+            self.assertWithinQueryBudget(method, path, data)
+        self.one_xp_short_of_level_up()
+        response = self.assertWithinQueryBudget(
+            "post", "/api/habits/complete/", {"habit_ids": [h.id for h in habits[1:]]}, format="json")
+        self.assertTrue(response.data["leveled_up"])
+
+    def test_middleware_records_stats(self):
+        query_stats.reset()
+        self.client.get("/api/habits/")
+        self.assertEqual(query_stats.snapshot()["GET habit-list"]["max_queries"], 2)
+
+
+# ── BENCHMARK HARNESS ─────────────────────────────────────────────────────────
+
+class BenchmarkHarnessTest(TestCase):
+
+    def test_seed_population_is_consistent(self):
+        users = seed_population(users=3, habits_per_user=2, tasks_per_user=2, subtasks_per_task=2,
+                                days=10, sessions_per_user=1)
+        self.assertEqual(len(users), 3)
+        self.assertEqual(DailyMetrics.objects.filter(user__in=users).count(), 30)
+        profile = UserProfile.objects.get(user=users[0])
+        metrics_xp = sum(DailyMetrics.objects.filter(user=users[0]).values_list("xp_earned", flat=True))
+        self.assertEqual(profile.total_xp, metrics_xp)
+        self.assertEqual(sum(WeeklyRollup.objects.filter(user=users[0]).values_list("xp_earned", flat=True)), metrics_xp)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual((percentile(values, 50), percentile(values, 99)), (51, 99))
+
+
+# ── HOT QUERY INDEXES ─────────────────────────────────────────────────────────
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite specific")
+class HotQueryIndexTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="index_user", password="pass")
+
+    def index_name(self, model, fields):
+        return next(index.name for index in model._meta.indexes if index.fields == fields)
+
+    def assertUsesIndex(self, queryset, index_name=None):
+        plan = queryset.explain()
+        self.assertRegex(plan, r"SEARCH \w+ USING (COVERING )?INDEX", plan)
+        self.assertNotIn("TEMP B-TREE", plan)  # ordering comes from the index too
+        if index_name:
+            self.assertIn(index_name, plan)
+
+    def test_leaderboard_date_filter(self):
+        today = date.today()
+        self.assertUsesIndex(
+            DailyMetrics.objects.filter(metric_date__gte=today - timedelta(days=6)),
+            self.index_name(DailyMetrics, ["metric_date"]))
+
+    def test_progress_range(self):
+        plan = DailyMetrics.objects.filter(user=self.user, metric_date__gte=date.today()).explain()
+        self.assertIn("USING INDEX", plan)
+
+    def test_open_tasks(self):
+        # Django renders the boolean as NOT "is_completed", which SQLite can only
+        # use as a filter on the user prefix, so any user-leading index will do
+        self.assertUsesIndex(Task.objects.filter(user=self.user, is_completed=False))
+
+    def test_recent_tasks_and_sessions(self):
+        self.assertUsesIndex(
+            Task.objects.filter(user=self.user).order_by("-created_at"),
+            self.index_name(Task, ["user", "created_at"]))
+        self.assertUsesIndex(
+            FocusSession.objects.filter(user=self.user).order_by("-created_at"),
+            self.index_name(FocusSession, ["user", "created_at"]))
+
+    def test_habit_filters(self):
+        # same bare boolean as test_open_tasks, only the user prefix is searchable
+        self.assertUsesIndex(Habit.objects.filter(user=self.user, is_completed=True))
+        self.assertUsesIndex(
+            Habit.objects.filter(habit_frequency="daily", last_completed_date__lt=date.today()),
+            self.index_name(Habit, ["habit_frequency", "last_completed_date"]))
+
+
+# ── DASHBOARD SNAPSHOT ────────────────────────────────────────────────────────
+
+class DashboardSnapshotTest(QueryBudgetTestMixin, APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="snap_user", password="pass", first_name="Snap")
+        UserProfile.objects.create(user=self.user)
+        self.habit = Habit.objects.create(user=self.user, habit_title="Stretch", habit_difficulty="easy",
+                                          habit_frequency="daily", xp_reward=10)
+        task = Task.objects.create(user=self.user, task_title="Essay", task_difficulty="easy", xp_reward=10)
+        task.subtasks.create(description="outline")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_snapshot_payload(self):
+        data = self.assertWithinQueryBudget("get", "/api/dashboard/snapshot/").data
+        self.assertEqual(data["dashboard"]["first_name"], "Snap")
+        self.assertEqual(len(data["habits"]), 1)
+        self.assertEqual(data["tasks"][0]["subtasks"][0]["description"], "outline")
+        self.assertEqual(len(data["achievements"]), Achievement.objects.count())
+
+    def test_warm_snapshot_only_authenticates(self):
+        self.client.get("/api/dashboard/snapshot/")
+        with self.assertNumQueries(1):  # the JWT user and profile lookup
+            self.client.get("/api/dashboard/snapshot/")
+
+    def test_habit_completion_invalidates(self):
+        self.client.get("/api/dashboard/snapshot/")
+        self.client.post(f"/api/habits/{self.habit.id}/complete/")
+        data = self.client.get("/api/dashboard/snapshot/").data
+        self.assertTrue(data["habits"][0]["is_completed"])
+        self.assertEqual(data["dashboard"]["total_xp"], 15)  # studies theme bonus
+
+
+# ── BULK HABIT COMPLETION ─────────────────────────────────────────────────────
+
+class BulkHabitCompletionTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="bulk_user", password="pass")
+        UserProfile.objects.create(user=self.user, primary_theme="sleep")
+        self.habits = [
+            Habit.objects.create(user=self.user, habit_title=f"Habit {i}", habit_difficulty="easy",
+                                 habit_frequency="daily", xp_reward=20, habit_theme="exercise")
+            for i in range(6)
+        ]
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def complete(self, habits):
+        return self.client.post("/api/habits/complete/", {"habit_ids": [h.id for h in habits]}, format="json")
+
+    def test_completes_all_and_awards_once(self):
+        response = self.complete(self.habits[:5])
+        drain()  # side effects are applied by the outbox drainer
+        self.assertEqual(response.data["xp_awarded"], 100)
+        self.assertEqual(response.data["level"], 2)
+        self.assertTrue(all(r["current_streak"] == 1 for r in response.data["results"]))
+        metric = DailyMetrics.objects.get(user=self.user)
+        self.assertEqual((metric.habits_completed, metric.xp_earned), (5, 100))
+
+    def test_already_completed_habits_award_nothing(self):
+        self.complete(self.habits[:2])
+        response = self.complete(self.habits[:3])
+        self.assertEqual([r["xp_awarded"] for r in response.data["results"]], [0, 0, 20])
+
+    def test_query_count_independent_of_habit_count(self):
+        Habit.objects.filter(user=self.user).update(xp_reward=2)  # stay below the level-up/achievement paths
+        with CaptureQueriesContext(connection) as one:
+            self.complete(self.habits[:1])
+        with CaptureQueriesContext(connection) as five:
+            self.complete(self.habits[1:6])
+        self.assertEqual(len(one.captured_queries), len(five.captured_queries))
+
+    def test_rejects_bad_payload(self):
+        for habit_ids in ("1,2", [True], [self.habits[0].id, False]):
+            response = self.client.post("/api/habits/complete/", {"habit_ids": habit_ids}, format="json")
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Habit.objects.filter(is_completed=True).exists())
+
+
+# ── NESTED SUBTASK WRITES ─────────────────────────────────────────────────────
+
+class NestedSubtaskWriteTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="checklist_user", password="pass")
+        UserProfile.objects.create(user=self.user)
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def create_task(self, n):
+        return self.client.post("/api/tasks/", {
+            "task_title": "Checklist", "task_difficulty": "easy",
+            "subtasks": [{"description": f"item {i}"} for i in range(n)],
+        }, format="json")
+
+    def test_nested_create_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as small:
+            self.create_task(2)
+        with CaptureQueriesContext(connection) as large:
+            response = self.create_task(50)
+        self.assertEqual(len(response.data["subtasks"]), 50)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_update_diffs_checklist(self):
+        task = self.create_task(3).data
+        first, second, third = task["subtasks"]
+        response = self.client.patch(f"/api/tasks/{task['id']}/", {"subtasks": [
+            {"id": first["id"], "is_completed": True},
+            {"id": second["id"]},
+            {"description": "new item"},
+        ]}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        subtasks = {s["description"]: s for s in response.data["subtasks"]}
+        self.assertEqual(set(subtasks), {"item 0", "item 1", "new item"})
+        self.assertTrue(subtasks["item 0"]["is_completed"])
+        self.assertFalse(SubTask.objects.filter(id=third["id"]).exists())
+
+    def test_update_query_count_is_constant(self):
+        counts = []
+        for n in (5, 50):
+            task = self.create_task(n).data
+            payload = [{"id": s["id"], "is_completed": True} for s in task["subtasks"][1:]]
+            payload.append({"description": "extra"})
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.patch(f"/api/tasks/{task['id']}/", {"subtasks": payload}, format="json")
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_foreign_subtask_id_rejected(self):
+        other = self.create_task(1).data
+        task = self.create_task(1).data
+        response = self.client.patch(f"/api/tasks/{task['id']}/", {"subtasks": [
+            {"id": other["subtasks"][0]["id"], "description": "stolen"},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(SubTask.objects.get(id=other["subtasks"][0]["id"]).description, "item 0")
+
+
+# ── CURSOR PAGINATION ─────────────────────────────────────────────────────────
+
+class CursorPaginationTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="pager", password="pass")
+        UserProfile.objects.create(user=self.user)
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        FocusSession.objects.bulk_create([
+            FocusSession(user=self.user, duration_minutes=i + 1) for i in range(7)
+        ])
+
+    def test_pages_walk_every_session_newest_first(self):
+        seen = []
+        url = "/api/focus-sessions/?page_size=3"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), 3)
+            seen += [s["id"] for s in response.data["results"]]
+            url = response.data["next"]
+        ids = list(FocusSession.objects.filter(user=self.user).values_list("id", flat=True))
+        self.assertEqual(seen, sorted(ids, reverse=True))
+
+    def test_since_only_returns_newer_rows(self):
+        Task.objects.create(user=self.user, task_title="old", task_difficulty="easy")
+        cutoff = Task.objects.get(task_title="old").created_at
+        Task.objects.create(user=self.user, task_title="new", task_difficulty="easy")
+        Task.objects.filter(task_title="new").update(created_at=cutoff + timedelta(seconds=5))
+
+        response = self.client.get("/api/tasks/", {"since": cutoff.isoformat()})
+        self.assertEqual([t["task_title"] for t in response.data["results"]], ["new"])
+
+    def test_invalid_since_is_rejected(self):
+        response = self.client.get("/api/tasks/", {"since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+
+# ── DELTA SYNC ────────────────────────────────────────────────────────────────
+
+class DeltaSyncTest(QueryBudgetTestMixin, APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="sync_user", password="pass")
+        UserProfile.objects.create(user=self.user)
+        self.habits = [
+            Habit.objects.create(user=self.user, habit_title=f"Habit {i}", habit_difficulty="easy",
+                                 habit_frequency="daily", xp_reward=2)
+            for i in range(3)
+        ]
+        self.task = Task.objects.create(user=self.user, task_title="Task", task_difficulty="easy")
+        self.subtask = self.task.subtasks.create(description="step")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def age_everything(self):
+        #pretend every row was last written an hour ago and return a token from after that
+        hour_ago = timezone.now() - timedelta(hours=1)
+        for model in (Habit, Task, SubTask, FocusSession, DailyMetrics):
+            model.objects.update(updated_at=hour_ago)
+        return (hour_ago + timedelta(minutes=30)).isoformat()
+
+    def test_first_sync_is_a_full_reset(self):
+        response = self.assertWithinQueryBudget("get", "/api/sync/")
+        self.assertTrue(response.data["reset"])
+        self.assertEqual(len(response.data["habits"]), 3)
+        self.assertEqual(response.data["subtasks"][0]["task"], self.task.id)
+        self.assertIsNotNone(response.data["token"])
+
+    def test_only_changes_and_deletions_are_sent(self):
+        since = self.age_everything()
+        self.client.patch(f"/api/habits/{self.habits[0].id}/", {"habit_title": "Renamed"}, format="json")
+        self.client.delete(f"/api/tasks/{self.task.id}/")
+
+        response = self.assertWithinQueryBudget("get", "/api/sync/", {"since": since})
+        self.assertFalse(response.data["reset"])
+        self.assertEqual([h["habit_title"] for h in response.data["habits"]], ["Renamed"])
+        self.assertEqual(response.data["tasks"], [])
+        self.assertEqual(response.data["deleted"]["task"], [self.task.id])
+        self.assertEqual(response.data["deleted"]["subtask"], [self.subtask.id])
+
+    def test_bulk_and_upsert_writes_move_updated_at(self):
+        since = self.age_everything()
+        self.client.post("/api/habits/complete/", {"habit_ids": [self.habits[1].id]}, format="json")
+        drain()  # side effects are applied by the outbox drainer
+
+        response = self.client.get("/api/sync/", {"since": since})
+        self.assertEqual([h["id"] for h in response.data["habits"]], [self.habits[1].id])
+        self.assertEqual(len(response.data["metrics"]), 1)
+
+    def test_metrics_delete_leaves_a_tombstone(self):
+        metrics = DailyMetrics.objects.create(user=self.user, metric_date=timezone.localdate())
+        since = self.age_everything()
+        self.client.delete(f"/api/daily-metrics/{metrics.id}/")
+
+        response = self.client.get("/api/sync/", {"since": since})
+        self.assertEqual(response.data["deleted"]["metrics"], [metrics.id])
+
+    def test_reset_caps_history_newest_first(self):
+        today = timezone.localdate()
+        for days_ago in range(3):
+            DailyMetrics.objects.create(user=self.user, metric_date=today - timedelta(days=days_ago))
+        with mock.patch("tracker.views.RESET_HISTORY_LIMIT", 2):
+            response = self.client.get("/api/sync/")
+        self.assertEqual([m["metric_date"] for m in response.data["metrics"]],
+                         [str(today), str(today - timedelta(days=1))])
+        self.assertEqual(response.data["more_history"], {"focus_sessions": False, "metrics": True})
+
+    def test_old_token_forces_reset(self):
+        since = (timezone.now() - timedelta(days=90)).isoformat()
+        response = self.client.get("/api/sync/", {"since": since})
+        self.assertTrue(response.data["reset"])
+        self.assertEqual(len(response.data["habits"]), 3)
+
+    def test_invalid_token_rejected(self):
+        response = self.client.get("/api/sync/", {"since": "last tuesday"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_prune_keeps_recent_tombstones(self):
+        Tombstone.objects.create(user=self.user, kind="habit", object_id=1,
+                                 deleted_at=timezone.now() - timedelta(days=60))
+        Tombstone.objects.create(user=self.user, kind="habit", object_id=2)
+        call_command("prune_tombstones", stdout=StringIO())
+        self.assertEqual(list(Tombstone.objects.values_list("object_id", flat=True)), [2])
+
+
+# ── SCOPED VIEWSETS ───────────────────────────────────────────────────────────
+
+class ScopedViewSetTest(QueryBudgetTestMixin, APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="scoped_user", password="pass")
+        self.other = User.objects.create_user(username="other_user", password="pass")
+        pod = SocialPod.objects.create(pod_name="Readers", pod_category="studies")
+        achievement = Achievement.objects.create(achievement_name="Scoped", description="x")
+        for user in (self.user, self.other):
+            UserProfile.objects.create(user=user)
+            habit = Habit.objects.create(user=user, habit_title="Read", habit_difficulty="easy",
+                                         habit_frequency="daily")
+            task = Task.objects.create(user=user, task_title="Task", task_difficulty="easy")
+            task.subtasks.create(description="step")
+            DailyMetrics.objects.create(user=user, metric_date=date.today())
+            Reminder.objects.create(user=user, habit=habit, reminder_type="preset",
+                                    scheduled_time=timezone.now())
+            UserAchievement.objects.create(user=user, achievement=achievement)
+            UserPod.objects.create(user=user, pod=pod)
+        self.other_habit = Habit.objects.get(user=self.other)
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_lists_only_show_own_rows(self):
+        own = {
+            "daily-metrics": DailyMetrics.objects.get(user=self.user).id,
+            "reminders": Reminder.objects.get(user=self.user).id,
+            "user-achievements": UserAchievement.objects.get(user=self.user).id,
+            "user-pods": UserPod.objects.get(user=self.user).id,
+            "subtasks": SubTask.objects.get(task__user=self.user).id,
+        }
+        for prefix, row_id in own.items():
+            response = self.client.get(f"/api/{prefix}/")
+            self.assertEqual([r["id"] for r in response.data["results"]], [row_id], prefix)
+
+    def test_other_users_rows_are_not_found(self):
+        subtask = SubTask.objects.get(task__user=self.other)
+        self.assertEqual(self.client.get(f"/api/subtasks/{subtask.id}/").status_code, 404)
+        self.assertEqual(self.client.post(f"/api/subtasks/{subtask.id}/toggle/").status_code, 404)
+        metrics = DailyMetrics.objects.get(user=self.other)
+        self.assertEqual(self.client.delete(f"/api/daily-metrics/{metrics.id}/").status_code, 404)
+
+    def test_reminder_cannot_target_another_users_habit(self):
+        response = self.client.post("/api/reminders/", {
+            "habit": self.other_habit.id, "reminder_type": "custom",
+            "scheduled_time": timezone.now().isoformat(),
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_table_is_staff_only_and_paginated(self):
+        self.assertEqual(self.client.get("/api/admin/tables/reminders/").status_code, 403)
+
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        response = self.assertWithinQueryBudget("get", "/api/admin/tables/reminders/?page_size=1")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["user_id"], self.user.id)
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.data["results"][0]["user_id"], self.other.id)
+        self.assertEqual(self.client.get("/api/admin/tables/auth_user/").status_code, 404)
+
+
+# ── HISTORY EXPORT ────────────────────────────────────────────────────────────
+
+class HistoryExportTest(QueryBudgetTestMixin, APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="export_user", password="pass")
+        self.other = User.objects.create_user(username="export_other", password="pass")
+        for user in (self.user, self.other):
+            UserProfile.objects.create(user=user)
+            Habit.objects.create(user=user, habit_title="Read,\nthen sleep", habit_difficulty="easy",
+                                 habit_frequency="daily")
+            Task.objects.create(user=user, task_title="Task", task_difficulty="easy")
+            FocusSession.objects.create(user=user, duration_minutes=25)
+            for i in range(3):
+                DailyMetrics.objects.create(user=user, metric_date=date.today() - timedelta(days=i))
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def read_lines(self, response):
+        return b"".join(response.streaming_content).decode().splitlines()
+
+    def test_ndjson_streams_only_own_history(self):
+        response = self.assertWithinQueryBudget("get", "/api/export/")
+        self.assertTrue(response.streaming)
+        records = [json.loads(line) for line in self.read_lines(response)]
+        self.assertEqual(
+            [r["table"] for r in records],
+            ["daily_metrics"] * 3 + ["focus_sessions", "habits", "tasks"],
+        )
+        self.assertEqual({r["user_id"] for r in records}, {self.user.id})
+
+    def test_csv_single_table_with_header(self):
+        response = self.client.get("/api/export/", {"type": "csv", "table": "habits"})
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:2], ["id", "user_id"])
+        self.assertEqual(rows[1][2], "Read,\nthen sleep")
+        self.assertEqual(self.client.get("/api/export/", {"type": "csv"}).status_code, 400)
+
+    def test_after_resumes_past_checkpoint(self):
+        second = DailyMetrics.objects.filter(user=self.user).order_by("id")[1]
+        response = self.client.get("/api/export/", {"after": f"daily_metrics:{second.id}"})
+        records = [json.loads(line) for line in self.read_lines(response)]
+        self.assertEqual(records[0]["table"], "daily_metrics")
+        self.assertGreater(records[0]["id"], second.id)
+        self.assertEqual(len(records), 4)
+
+    def test_command_resumes_interrupted_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "all.ndjson")
+            call_command("export_history", output=path, stderr=StringIO())
+            with open(path) as fh:
+                full = fh.read().splitlines()
+
+            #cut the file off in the middle of its fourth line
+            with open(path, "w") as fh:
+                fh.write("\n".join(full[:3]) + "\n" + full[3][:10])
+            call_command("export_history", output=path, resume=True, stderr=StringIO())
+            with open(path) as fh:
+                self.assertEqual(fh.read().splitlines(), full)
+        self.assertEqual(len(full), 12)
+
+
+# ── LIFETIME COUNTERS ─────────────────────────────────────────────────────────
+
+class LifetimeCounterTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="lifetime_user", password="pass")
+        UserProfile.objects.create(user=self.user)
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def profile(self):
+        return UserProfile.objects.get(user=self.user)
+
+    def test_write_paths_increment_counters(self):
+        habit = Habit.objects.create(user=self.user, habit_title="Read", habit_difficulty="easy",
+                                     habit_frequency="daily", xp_reward=2)
+        task = Task.objects.create(user=self.user, task_title="Task", task_difficulty="easy", xp_reward=2)
+        self.client.post("/api/focus-sessions/", {"duration_minutes": 20, "sessions_completed": 2})
+        self.client.post(f"/api/habits/{habit.id}/complete/")
+        self.client.post(f"/api/tasks/{task.id}/complete/")
+        drain()  # side effects are applied by the outbox drainer
+
+        profile = self.profile()
+        self.assertEqual(profile.lifetime_focus_minutes, 40)
+        self.assertEqual(profile.lifetime_focus_sessions, 2)
+        self.assertEqual(profile.lifetime_habits_completed, 1)
+        self.assertEqual(profile.lifetime_tasks_completed, 1)
+
+    def test_focus_achievement_reads_the_counter(self):
+        UserProfile.objects.filter(user=self.user).update(lifetime_focus_minutes=50)
+        self.client.post("/api/focus-sessions/", {"duration_minutes": 10})
+        drain()  # side effects are applied by the outbox drainer
+        unlocked = UserAchievement.objects.filter(user=self.user).values_list(
+            "achievement__achievement_name", flat=True)
+        self.assertIn("Focus Initiate", unlocked)
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        DailyMetrics.objects.create(user=self.user, metric_date=date.today(), total_study_minutes=30,
+                                    total_tasks_completed=2, habits_completed=3)
+        FocusSession.objects.create(user=self.user, duration_minutes=30, sessions_completed=1)
+
+        out = StringIO()
+        call_command("reconcile_lifetime_counters", check=True, stdout=out)
+        self.assertIn("1 of 1 profiles drifted", out.getvalue())
+        self.assertEqual(self.profile().lifetime_focus_minutes, 0)
+
+        call_command("reconcile_lifetime_counters", stdout=StringIO())
+        profile = self.profile()
+        self.assertEqual(
+            [getattr(profile, field) for field in UserProfile.LIFETIME_FIELDS], [30, 1, 2, 3])
+
+
+# ── REMINDER DISPATCH ─────────────────────────────────────────────────────────
+
+class RecordingBackend:
+    def __init__(self):
+        self.sent = []
+
+    def send_batch(self, reminders):
+        self.sent += [reminder["id"] for reminder in reminders]
+
+
+class ReminderDispatchTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reminder_user", password="pass")
+        UserProfile.objects.create(user=self.user)
+        self.habit = Habit.objects.create(user=self.user, habit_title="Read", habit_difficulty="easy",
+                                          habit_frequency="daily")
+        self.now = timezone.now()
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def reminder(self, scheduled_time, preset=""):
+        return Reminder.objects.create(user=self.user, habit=self.habit, reminder_type="preset",
+                                       preset=preset, scheduled_time=scheduled_time)
+
+    def test_due_reminders_fire_once_and_reschedule(self):
+        one_off = self.reminder(self.now - timedelta(minutes=5))
+        daily = self.reminder(self.now - timedelta(minutes=5), preset="daily_habit")
+        lagging = self.reminder(self.now - timedelta(days=2, minutes=5), preset="daily_habit")
+        future = self.reminder(self.now + timedelta(hours=1))
+
+        backend = RecordingBackend()
+        self.assertEqual(dispatch_due(backend=backend, batch_size=2), 3)
+        self.assertEqual(sorted(backend.sent), sorted([one_off.id, daily.id, lagging.id]))
+        self.assertEqual(dispatch_due(backend=backend), 0)
+
+        one_off.refresh_from_db()
+        self.assertFalse(one_off.reminders_enabled)
+        self.assertIsNotNone(one_off.last_sent_at)
+        daily.refresh_from_db()
+        self.assertEqual(daily.scheduled_time, self.now - timedelta(minutes=5) + timedelta(days=1))
+        lagging.refresh_from_db()
+        self.assertEqual(lagging.scheduled_time, self.now - timedelta(minutes=5) + timedelta(days=1))
+        self.assertIsNone(lagging.claim_token)
+        future.refresh_from_db()
+        self.assertIsNone(future.last_sent_at)
+
+    def test_claimed_rows_wait_for_their_lease(self):
+        self.reminder(self.now - timedelta(minutes=1))
+        _, first = claim_batch(10, timedelta(seconds=60), now=self.now)
+        _, second = claim_batch(10, timedelta(seconds=60), now=self.now)
+        self.assertEqual((len(first), len(second)), (1, 0))
+
+        #the first worker died without finishing, once the lease is over the row is due again
+        _, retried = claim_batch(10, timedelta(seconds=60), now=self.now + timedelta(minutes=2))
+        self.assertEqual([r["id"] for r in retried], [first[0]["id"]])
+
+    def test_deadline_preset_follows_the_task(self):
+        task = Task.objects.create(user=self.user, task_title="Essay", task_difficulty="hard",
+                                   deadline=self.now + timedelta(days=2))
+        response = self.client.post("/api/reminders/", {
+            "task": task.id, "reminder_type": "preset", "preset": "task_deadline", "lead_hours": 3,
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        reminder = Reminder.objects.get(pk=response.data["id"])
+        self.assertEqual(reminder.scheduled_time, task.deadline - timedelta(hours=3))
+
+        new_deadline = self.now + timedelta(days=5)
+        self.client.patch(f"/api/tasks/{task.id}/", {"deadline": new_deadline.isoformat()}, format="json")
+        reminder.refresh_from_db()
+        self.assertEqual(reminder.scheduled_time, new_deadline - timedelta(hours=3))
+
+    def test_file_backend_from_settings(self):
+        self.reminder(self.now - timedelta(minutes=1))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "reminders.ndjson")
+            with self.settings(REMINDERS={"BACKEND": "tracker.utils.reminders.FileBackend",
+                                          "OPTIONS": {"path": path}}):
+                call_command("dispatch_reminders", once=True, stdout=StringIO())
+            with open(path) as fh:
+                self.assertEqual(json.loads(fh.readline())["message"], "Reminder: Read")
+
+
+class ConcurrentReminderDispatchTest(TransactionTestCase):
+
+    def test_parallel_workers_never_deliver_twice(self):
+        user = User.objects.create_user(username="reminder_race", password="pass")
+        due = timezone.now() - timedelta(minutes=1)
+        Reminder.objects.bulk_create([
+            Reminder(user=user, reminder_type="custom", scheduled_time=due) for _ in range(600)
+        ])
+        backends = [RecordingBackend() for _ in range(4)]
+
+        def worker(backend):
+            try:
+                dispatch_due(backend=backend, batch_size=25)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(backend,)) for backend in backends]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        sent = [reminder_id for backend in backends for reminder_id in backend.sent]
+        self.assertEqual(len(sent), 600)
+        self.assertEqual(len(set(sent)), 600)
+
+
+# ── ASYNC READ VIEWS ──────────────────────────────────────────────────────────
+
+class AsyncReadViewTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="async_user", password="pass", first_name="Async")
+        UserProfile.objects.create(user=self.user, best_current_streak=4)
+        for i in range(5):
+            Habit.objects.create(user=self.user, habit_title=f"Habit {i}", habit_difficulty="easy",
+                                 habit_frequency="daily", xp_reward=10)
+            task = Task.objects.create(user=self.user, task_title=f"Task {i}", task_difficulty="easy", xp_reward=10)
+            task.subtasks.create(description="step")
+            DailyMetrics.objects.create(user=self.user, metric_date=date.today() - timedelta(days=i), xp_earned=5)
+        token = RefreshToken.for_user(self.user).access_token
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.async_client = AsyncClient()
+
+    async def get(self, path):
+        return await self.async_client.get(path, headers=self.headers)
+
+    async def test_matches_sync_views(self):
+        for sync_path, async_path in (
+            ("/api/dashboard/", "/api/async/dashboard/"),
+            ("/api/leaderboard/?type=streak", "/api/async/leaderboard/?type=streak"),
+            ("/api/progress/?days=30&granularity=week", "/api/async/progress/?days=30&granularity=week"),
+        ):
+            expected = await sync_to_async(self.client.get)(sync_path)
+            response = await self.get(async_path)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), json.loads(expected.content))
+
+    async def test_keyset_pages(self):
+        first = (await self.get("/api/async/habits/?page_size=3")).json()
+        self.assertEqual(len(first["results"]), 3)
+        rest = (await self.get(f"/api/async/habits/?page_size=3&after={first['next_after']}")).json()
+        self.assertEqual(len(rest["results"]), 2)
+        self.assertIsNone(rest["next_after"])
+
+        tasks = (await self.get("/api/async/tasks/")).json()["results"]
+        self.assertEqual(len(tasks), 5)
+        self.assertEqual(tasks[0]["subtasks"][0]["description"], "step")
+
+    async def test_rejects_bad_requests(self):
+        self.assertEqual((await self.async_client.get("/api/async/dashboard/")).status_code, 401)
+        self.assertEqual((await self.get("/api/async/leaderboard/?type=nope")).status_code, 400)
+        self.assertEqual((await self.get("/api/async/progress/?days=0")).status_code, 400)
+        self.assertEqual((await self.get("/api/async/habits/?after=x")).status_code, 400)
+
+    async def test_middleware_counts_async_queries(self):
+        query_stats.reset()
+        for path, name in (("/api/async/dashboard/", "GET async-dashboard"),
+                           ("/api/async/tasks/", "GET async-tasks")):
+            response = await self.get(path)
+            budget = settings.QUERY_BUDGET["BUDGETS"][name]
+            self.assertEqual(query_stats.snapshot()[name]["max_queries"], budget)
+            if "X-Query-Count" in response.headers:
+                self.assertEqual(int(response.headers["X-Query-Count"]), budget)
+
+
+# ── LIVE EVENTS ───────────────────────────────────────────────────────────────
+
+class LiveEventTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="live_user", password="pass", first_name="Live")
+        UserProfile.objects.create(user=self.user)
+        self.habit = Habit.objects.create(user=self.user, habit_title="Read", habit_difficulty="easy",
+                                          habit_frequency="daily", xp_reward=100)
+        token = RefreshToken.for_user(self.user).access_token
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.broker = get_broker()
+
+    def subscribe(self, *groups):
+        subscription = self.broker.subscribe(groups or [user_group(self.user.id)])
+        self.addCleanup(subscription.close)
+        return subscription
+
+    def drain(self, subscription):
+        events = []
+        while (event := subscription.get(0)) is not None:
+            events.append(event)
+        return events
+
+    def test_completion_publishes_after_commit(self):
+        subscription = self.subscribe()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.client.post(f"/api/habits/{self.habit.id}/complete/")
+        self.assertEqual(self.drain(subscription), [])  # nothing before the commit
+
+        with self.captureOnCommitCallbacks(execute=True):  # the inline drain unlocks the achievement
+            for callback in callbacks:
+                callback()
+        events = {event["event"]: event["data"] for event in self.drain(subscription)}
+        self.assertEqual(events["streak"]["current_streak"], 1)
+        self.assertEqual(events["xp_awarded"]["xp"], 150)  # studies theme bonus
+        self.assertEqual(events["level_up"]["level"], events["xp_awarded"]["level"])
+        self.assertEqual(events["achievement_unlocked"]["name"], "Novice Explorer")
+
+    def test_nothing_queued_without_subscribers(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(f"/api/habits/{self.habit.id}/complete/")
+        self.assertFalse([c for c in callbacks if c.__qualname__.startswith("publish")])
+
+    def test_slow_subscriber_is_told_to_resync(self):
+        subscription = self.broker.subscribe([user_group(self.user.id)])
+        subscription.events.maxsize = 2
+        self.addCleanup(subscription.close)
+        for i in range(5):
+            self.broker.publish(user_group(self.user.id), "xp_awarded", {"xp": i})
+        self.assertEqual(len(self.drain(subscription)), 2)
+        self.assertTrue(subscription.overflowed)
+
+    def test_leaderboard_diffs_only_changed_ranks(self):
+        subscription = self.subscribe(LEADERBOARD_GROUP)
+        other = User.objects.create_user(username="live_other", password="pass", first_name="Other")
+        UserProfile.objects.create(user=other)
+        update_daily_metrics(self.user, xp=50)
+        update_daily_metrics(other, xp=20)
+
+        notifier = LeaderboardNotifier(interval=0)
+        notifier.refresh()
+        first = {e["data"]["board"]: e["data"] for e in self.drain(subscription)}
+        self.assertEqual([c["name"] for c in first["xp"]["changes"]], ["Live", "Other"])
+
+        update_daily_metrics(other, xp=10)  # Other moves from 20 to 30, still second
+        notifier.refresh()
+        second = [e["data"] for e in self.drain(subscription)]
+        self.assertEqual(len(second), 1)
+        self.assertEqual(second[0]["board"], "xp")
+        self.assertEqual(second[0]["changes"], [{"name": "Other", "level": 1, "value": 30, "rank": 2}])
+
+    def test_wsgi_stream(self):
+        response = self.client.get("/api/events/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = iter(response.streaming_content)
+        self.assertEqual(next(chunks), b"retry: 5000\n\n")
+        self.broker.publish(user_group(self.user.id), "level_up", {"level": 2})
+        self.assertTrue(next(chunks).endswith(b'event: level_up\ndata: {"level": 2}\n\n'))
+        response.close()
+        self.assertFalse(self.broker.has_subscribers(user_group(self.user.id)))
+
+    async def test_asgi_stream(self):
+        self.assertEqual((await AsyncClient().get("/api/events/")).status_code, 401)
+        response = await AsyncClient().get("/api/events/", headers=self.headers)
+        received = []
+
+        async def consume():
+            async for chunk in response.streaming_content:
+                received.append(chunk)
+
+        async def wait_for(count):
+            while len(received) < count:
+                await asyncio.sleep(0.01)
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.wait_for(wait_for(1), 5)
+        self.assertEqual(received[0], b"retry: 5000\n\n")
+        self.broker.publish(LEADERBOARD_GROUP, "leaderboard", {"board": "xp", "size": 0, "changes": []})
+        await asyncio.wait_for(wait_for(2), 5)
+        self.assertIn(b"event: leaderboard", received[1])
+
+        #a client disconnect cancels the response task, which must drop the subscription
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        self.assertFalse(self.broker.has_subscribers(LEADERBOARD_GROUP))
+
+
+# ── COMPLETION OUTBOX ─────────────────────────────────────────────────────────
+
+class CompletionOutboxTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="outbox_user", password="pass")
+        UserProfile.objects.create(user=self.user, primary_theme="exercise")
+        self.tasks = [
+            Task.objects.create(user=self.user, task_title=f"Task {i}", task_difficulty="easy", xp_reward=100)
+            for i in range(3)
+        ]
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_side_effects_wait_for_the_drainer(self):
+        for task in self.tasks:
+            self.client.post(f"/api/tasks/{task.id}/complete/")
+        self.client.post("/api/focus-sessions/", {"duration_minutes": 25})
+
+        self.assertEqual(OutboxEvent.objects.filter(processed_at__isnull=True).count(), 4)
+        self.assertFalse(DailyMetrics.objects.filter(user=self.user).exists())
+        self.assertEqual(UserProfile.objects.get(user=self.user).total_xp, 325)  # XP itself is not deferred
+
+        self.assertEqual(drain(), 4)
+        metrics = DailyMetrics.objects.get(user=self.user)
+        self.assertEqual((metrics.xp_earned, metrics.total_tasks_completed, metrics.total_study_minutes),
+                         (325, 3, 25))
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.lifetime_tasks_completed, profile.lifetime_focus_sessions), (3, 1))
+        self.assertTrue(UserAchievement.objects.filter(user=self.user, achievement__achievement_name="Novice Explorer").exists())
+
+        self.assertEqual(drain(), 0)  # applied exactly once
+        self.assertEqual(DailyMetrics.objects.get(user=self.user).xp_earned, 325)
+
+    def test_completion_and_outbox_row_commit_together(self):
+        with mock.patch("tracker.views.outbox.enqueue", side_effect=RuntimeError("outbox down")):
+            with self.assertRaises(RuntimeError):
+                self.client.post(f"/api/tasks/{self.tasks[0].id}/complete/")
+        self.assertFalse(Task.objects.get(id=self.tasks[0].id).is_completed)
+        self.assertEqual(UserProfile.objects.get(user=self.user).total_xp, 0)
+
+    def test_failed_apply_is_retried_after_the_lease(self):
+        self.client.post(f"/api/tasks/{self.tasks[0].id}/complete/")
+        with mock.patch("tracker.utils.outbox.update_daily_metrics", side_effect=RuntimeError("db hiccup")), \
+                self.assertLogs("tracker.utils.outbox", "ERROR"):
+            self.assertEqual(drain(), 0)
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.attempts, event.last_error), (1, "db hiccup"))
+        self.assertEqual(drain(), 0)  # still leased
+
+        OutboxEvent.objects.update(claimed_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(drain(), 1)
+        self.assertEqual(DailyMetrics.objects.get(user=self.user).total_tasks_completed, 1)
+
+    @override_settings(OUTBOX={"MAX_ATTEMPTS": 2})
+    def test_poison_event_is_parked_and_spares_the_rest(self):
+        self.client.post(f"/api/tasks/{self.tasks[0].id}/complete/")
+        self.client.post(f"/api/tasks/{self.tasks[1].id}/complete/")
+        poison = OutboxEvent.objects.order_by("id").first()
+        OutboxEvent.objects.filter(id=poison.id).update(payload={**poison.payload, "date": "not a date"})
+
+        with self.assertLogs("tracker.utils.outbox", "ERROR"):
+            self.assertEqual(drain(), 1)  # the good event goes through on its own
+            OutboxEvent.objects.update(claimed_until=timezone.now() - timedelta(seconds=1))
+            self.assertEqual(drain(), 0)
+
+        poison.refresh_from_db()
+        self.assertEqual(poison.attempts, 2)
+        self.assertIsNotNone(poison.processed_at)
+        self.assertIn("not a date", poison.last_error)
+        self.assertEqual(drain(), 0)  # parked, never claimed again
+        self.assertEqual(DailyMetrics.objects.get(user=self.user).total_tasks_completed, 1)
+
+        OutboxEvent.objects.update(processed_at=timezone.now() - timedelta(days=30))
+        call_command("drain_outbox", "--once", "--prune", stdout=StringIO())
+        self.assertEqual(list(OutboxEvent.objects.values_list("id", flat=True)), [poison.id])
+
+    def test_inline_drain(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/tasks/{self.tasks[0].id}/complete/")
+        self.assertIsNotNone(OutboxEvent.objects.get().processed_at)
+        self.assertEqual(DailyMetrics.objects.get(user=self.user).total_tasks_completed, 1)
+
+    @override_settings(OUTBOX={"DRAIN_INLINE": False})
+    def test_drainer_refuses_process_local_backends(self):
+        self.client.post(f"/api/tasks/{self.tasks[0].id}/complete/")
+        #what a separate drain_outbox process has: its own broker and its own locmem cache
+        with mock.patch("tracker.utils.events._broker", InMemoryBroker()), \
+                override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                                                      "LOCATION": "drainer"}}):
+            with self.assertRaises(CommandError):
+                call_command("drain_outbox", "--once", stdout=StringIO())
+        self.assertIsNone(OutboxEvent.objects.get().processed_at)
+
+    def test_drainer_reaches_web_subscribers_through_shared_backends(self):
+        shared_cache = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                                    "LOCATION": tempfile.mkdtemp()}}
+        with mock.patch("tracker.utils.events._broker", SharedBroker()), \
+                override_settings(CACHES=shared_cache, OUTBOX={"DRAIN_INLINE": False}):
+            subscription = get_broker().subscribe([user_group(self.user.id)])
+            self.addCleanup(subscription.close)
+            self.client.post(f"/api/tasks/{self.tasks[0].id}/complete/")
+            self.client.get("/api/dashboard/snapshot/")  # cached before the drain, without the unlock
+            self.assertIsNotNone(get_snapshot(self.user.id))
+
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("drain_outbox", "--once", stdout=StringIO())
+            self.assertIsNone(get_snapshot(self.user.id))
+            events = []
+            while (event := subscription.get(0)) is not None:
+                events.append(event["event"])
+            self.assertIn("achievement_unlocked", events)
+
+
+class SharedBroker(InMemoryBroker):
+    #stands in for a broker every process shares, the drainer's events reach the web subscribers
+    process_local = False
+
+
+class InlineDrainAfterResponseTest(TransactionTestCase):
+
+    def setUp(self):
+        #TransactionTestCase flushes the achievements seeded by migration 0012
+        Achievement.objects.create(achievement_name="Novice Explorer", description="Reach Level 2", xp_reward=50)
+        self.user = User.objects.create_user(username="inline_user", password="pass")
+        UserProfile.objects.create(user=self.user)
+        self.task = Task.objects.create(user=self.user, task_title="Essay", task_difficulty="easy",
+                                        xp_reward=100, task_theme="sleep")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def test_drained_in_the_web_process_outside_the_budget(self):
+        subscription = get_broker().subscribe([user_group(self.user.id)])
+        self.addCleanup(subscription.close)
+        query_stats.reset()
+
+        self.client.post(f"/api/tasks/{self.task.id}/complete/")  # the test client closes the response
+
+        self.assertIsNotNone(OutboxEvent.objects.get().processed_at)
+        events = []
+        while (event := subscription.get(0)) is not None:
+            events.append(event["event"])
+        self.assertIn("achievement_unlocked", events)
+        self.assertLessEqual(query_stats.snapshot()["POST task-complete"]["max_queries"],
+                             budget_for("POST task-complete"))
+
+
+# ── XP LEDGER ─────────────────────────────────────────────────────────────────
+
+class XPLedgerTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="ledger_user", password="pass")
+        UserProfile.objects.create(user=self.user, primary_theme="exercise")
+        self.task = Task.objects.create(user=self.user, task_title="Run", task_difficulty="easy",
+                                        xp_reward=100, task_theme="exercise")
+        self.habit = Habit.objects.create(user=self.user, habit_title="Stretch", xp_reward=10)
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def complete_everything(self):
+        self.client.post(f"/api/tasks/{self.task.id}/complete/")
+        self.client.post(f"/api/habits/{self.habit.id}/complete/")
+        self.client.post("/api/focus-sessions/", {"duration_minutes": 25})
+        drain()  # level 2 unlocks Novice Explorer, whose reward is ledgered too
+
+    def test_every_award_is_ledgered(self):
+        self.complete_everything()
+        session = FocusSession.objects.get(user=self.user)
+        novice = Achievement.objects.get(achievement_name="Novice Explorer")
+        self.assertEqual(
+            set(XPEvent.objects.filter(user=self.user).values_list("source_type", "source_id", "base_xp", "theme_bonus")),
+            {("task", self.task.id, 100, 50), ("habit", self.habit.id, 10, 0),
+             ("focus_session", session.id, 25, 0), ("achievement", novice.id, 50, 0)},
+        )
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.total_xp, 235)
+        self.assertEqual(rebuild_from_ledger(check=True)["profiles_drifted"], 0)
+
+    def test_rebuild_repairs_drift(self):
+        self.complete_everything()
+        UserProfile.objects.filter(user=self.user).update(total_xp=9999, level=40)
+        DailyMetrics.objects.filter(user=self.user).update(xp_earned=1)
+        WeeklyRollup.objects.filter(user=self.user).delete()
+
+        out = StringIO()
+        call_command("rebuild_xp", "--check", stdout=out)
+        self.assertIn("1 of 1 profiles, 1 daily rows (+0 missing) and 0 weekly rows (+1 missing)", out.getvalue())
+        self.assertEqual(UserProfile.objects.get(user=self.user).total_xp, 9999)  # --check writes nothing
+
+        call_command("rebuild_xp", stdout=StringIO())
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.total_xp, profile.level), (235, *level_for_xp(235)[:1]))
+        self.assertEqual(DailyMetrics.objects.get(user=self.user).xp_earned, 185)  # the reward isn't daily XP
+        self.assertEqual(WeeklyRollup.objects.get(user=self.user).xp_earned, 185)
+        self.assertEqual(sum(rebuild_from_ledger(check=True).values()), 1)  # one profile folded, nothing drifted
+
+    def test_xp_disabled_earns_nothing_anywhere(self):
+        UserProfile.objects.filter(user=self.user).update(xp_enabled=False)
+        other = Habit.objects.create(user=self.user, habit_title="Walk", xp_reward=20)
+        self.client.post("/api/habits/complete/", {"habit_ids": [other.id]}, format="json")
+        self.complete_everything()
+
+        self.assertFalse(XPEvent.objects.exists())
+        self.assertFalse(OutboxEvent.objects.filter(payload__xp__gt=0).exists())
+        self.assertEqual(DailyMetrics.objects.get(user=self.user).xp_earned, 0)
+        self.assertEqual(sum(rebuild_from_ledger(check=True).values()), 1)  # one profile folded, nothing drifted
+
+    def test_backfill_matches_existing_totals(self):
+        #migration 0018 turns pre-ledger totals into opening balances that rebuild to the same numbers
+        from django.apps import apps
+        from importlib import import_module
+        backfill = import_module("tracker.migrations.0018_xp_ledger").backfill_opening_balances
+
+        today = timezone.now().date()
+        for days_ago, xp in ((0, 120), (9, 80)):
+            update_daily_metrics(self.user, xp=xp, completed_date=today - timedelta(days=days_ago))
+        UserProfile.objects.filter(user=self.user).update(
+            total_xp=250, **dict(zip(("level", "current_level_xp", "xp_for_next_level"), level_for_xp(250))),
+        )
+
+        backfill(apps, None)
+        self.assertEqual(XPEvent.objects.filter(source_type="legacy").count(), 2)
+        self.assertEqual(XPEvent.objects.get(source_type="legacy_balance").base_xp, 50)
+        self.assertEqual(sum(rebuild_from_ledger(check=True).values()), 1)  # one profile folded, nothing drifted
+
+
+# ── JWT PROFILE LOADING ───────────────────────────────────────────────────────
+
+class ProfileAuthenticationTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="auth_profile_user", password="pass", first_name="Ada")
+        UserProfile.objects.create(user=self.user)
+        self.task = Task.objects.create(user=self.user, task_title="Write", task_difficulty="easy", xp_reward=40)
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_user_and_profile_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/dashboard/")
+        self.assertEqual((response.json()["first_name"], response.json()["total_xp"]), ("Ada", 0))
+
+    def test_profile_writes_show_on_the_next_request(self):
+        self.client.post(f"/api/tasks/{self.task.id}/complete/")
+        self.assertEqual(self.client.get("/api/dashboard/").json()["total_xp"], 60)  # studies theme bonus
+
+        UserProfile.objects.filter(user=self.user).update(total_xp=500)
+        self.assertEqual(self.client.get("/api/dashboard/").json()["total_xp"], 500)
+
+    def test_user_changes_apply_to_every_token(self):
+        other = APIClient()
+        other.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        self.assertEqual(self.client.get("/api/dashboard/").status_code, 200)
+        self.assertEqual(other.get("/api/dashboard/").status_code, 200)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get("/api/dashboard/").status_code, 401)
+        self.assertEqual(other.get("/api/dashboard/").status_code, 401)
+
+    def test_missing_profile_is_not_queried_again(self):
+        UserProfile.objects.filter(user=self.user).delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/dashboard/").status_code, 404)
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from . import views
+from . import async_views, views
 from .views import (
     HabitViewSet, TaskViewSet, SubTaskViewSet,
     FocusSessionViewSet, DailyMetricsViewSet,
@@ -14,24 +14,37 @@ from .views import (
 router = DefaultRouter()
 router.register(r'habits', HabitViewSet, basename="habit")
 router.register(r"tasks", TaskViewSet, basename="task")
-router.register(r'subtasks', SubTaskViewSet)
+router.register(r'subtasks', SubTaskViewSet, basename="subtask")
 router.register(r'focus-sessions', FocusSessionViewSet)
-router.register(r'daily-metrics', DailyMetricsViewSet)
-router.register(r'reminders', ReminderViewSet)
+router.register(r'daily-metrics', DailyMetricsViewSet, basename="dailymetrics")
+router.register(r'reminders', ReminderViewSet, basename="reminder")
 router.register(r'achievements', AchievementViewSet)
-router.register(r'user-achievements', UserAchievementViewSet)
+router.register(r'user-achievements', UserAchievementViewSet, basename="userachievement")
 router.register(r'social-pods', SocialPodViewSet)
-router.register(r'user-pods', UserPodViewSet)
+router.register(r'user-pods', UserPodViewSet, basename="userpod")
 
 urlpatterns = [
-    path("dashboard/", dashboard_data),
+    path("dashboard/", dashboard_data, name="dashboard"),
+    path("dashboard/snapshot/", views.dashboard_snapshot, name="dashboard-snapshot"),
+    path("sync/", views.sync_changes, name="sync"),
+    path("export/", views.export_history, name="export"),
+    path("admin/tables/<str:table>/", views.admin_table, name="admin-table"),
+    # before the router so "complete" isn't read as a habit pk
+    path("habits/complete/", views.complete_habits, name="complete-habits"),
     path('', include(router.urls)),
     path('api/auth/', include('accounts.urls')),
     path("", include(router.urls)),
-    path("habits/<int:habit_id>/complete/", complete_habit),
-    path("habits/add/", add_habit),
+    path("habits/<int:habit_id>/complete/", complete_habit, name="complete-habit"),
+    path("habits/add/", add_habit, name="add-habit"),
     path('api/subtasks/<int:subtask_id>/toggle/', views.toggle_subtask, name='toggle-subtask'),
-    path("leaderboard/", leaderboard_view),
-    path("progress/", views.user_progress),
-    path("progress/achievements/", views.my_achievements),
+    path("leaderboard/", leaderboard_view, name="leaderboard"),
+    path("progress/", views.user_progress, name="progress"),
+    path("progress/achievements/", views.my_achievements, name="my-achievements"),
+    # async variants of the hot reads, only concurrent when served over ASGI
+    path("async/dashboard/", async_views.dashboard_data, name="async-dashboard"),
+    path("async/leaderboard/", async_views.leaderboard_view, name="async-leaderboard"),
+    path("async/progress/", async_views.user_progress, name="async-progress"),
+    path("async/habits/", async_views.habit_list, name="async-habits"),
+    path("async/tasks/", async_views.task_list, name="async-tasks"),
+    path("events/", async_views.event_stream, name="events"),
 ]
\ No newline at end of file
@@ -0,0 +1,59 @@
+from tracker.models import Achievement, UserAchievement
+from tracker.utils.events import publish_to_user
+from tracker.utils.ledger import record_xp
+
+#declarative achievement rules, a rule unlocks once metric >= threshold
+#metrics: level, total_xp, longest_streak, focus_minutes
+#seeded into the Achievement table by migration 0012, keep the two in step
+ACHIEVEMENT_RULES = [
+    {"name": "Novice Explorer", "desc": "Reach Level 2", "metric": "level", "threshold": 2, "xp": 50, "icon": "🌟"},
+    {"name": "Adept", "desc": "Reach Level 5", "metric": "level", "threshold": 5, "xp": 100, "icon": "⭐"},
+    {"name": "XP Hoarder", "desc": "Accumulate 1000 Total XP", "metric": "total_xp", "threshold": 1000, "xp": 200, "icon": "💰"},
+    {"name": "Streak Starter", "desc": "Achieve a 3-day habit streak", "metric": "longest_streak", "threshold": 3, "xp": 50, "icon": "🔥"},
+    {"name": "Consistency Key", "desc": "Achieve a 7-day habit streak", "metric": "longest_streak", "threshold": 7, "xp": 150, "icon": "📅"},
+    {"name": "Focus Initiate", "desc": "Log 60 minutes of focus time", "metric": "focus_minutes", "threshold": 60, "xp": 50, "icon": "🧠"},
+    {"name": "Deep Worker", "desc": "Log 300 minutes of focus time", "metric": "focus_minutes", "threshold": 300, "xp": 150, "icon": "🧘"},
+]
+
+def evaluate_achievements(user, profile, **metrics):
+    #called from the XP, streak and focus write paths with the metric values they just changed
+    #returns the names of achievements unlocked by this event
+    unlocked = []
+
+    while True:
+        passed = [
+            rule["name"] for rule in ACHIEVEMENT_RULES
+            if rule["metric"] in metrics and metrics[rule["metric"]] >= rule["threshold"]
+        ]
+        if not passed:
+            break
+
+        new = list(
+            Achievement.objects
+            .filter(achievement_name__in=passed)
+            .exclude(userachievement__user=user)
+        )
+        if not new:
+            break
+
+        UserAchievement.objects.bulk_create(
+            [UserAchievement(user=user, achievement=ach) for ach in new],
+            ignore_conflicts=True
+        )
+        unlocked += [ach.achievement_name for ach in new]
+        for ach in new:
+            publish_to_user(user.id, "achievement_unlocked", {
+                "name": ach.achievement_name,
+                "description": ach.description,
+                "xp_reward": ach.xp_reward,
+            })
+
+        #the reward XP can itself cross a level/XP rule, so go round again with the new totals
+        reward = sum(ach.xp_reward for ach in new)
+        if not reward or not profile.xp_enabled:
+            break
+        profile.add_xp(reward)
+        record_xp(user.id, [("achievement", ach.id, ach.xp_reward, 0) for ach in new if ach.xp_reward])
+        metrics = {"level": profile.level, "total_xp": profile.total_xp}
+
+    return unlocked
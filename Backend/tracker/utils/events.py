@@ -0,0 +1,252 @@
+import asyncio
+import itertools
+import json
+import queue
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+#settings.EVENTS keys:
+#  BACKEND               dotted path of the broker, anything with subscribe/unsubscribe/publish/has_subscribers
+#  OPTIONS               kwargs for the broker
+#  QUEUE_SIZE            events buffered per subscriber before it's told to resync
+#  HEARTBEAT_SECONDS     idle time before a keep-alive comment is sent down the stream
+#  LEADERBOARD_INTERVAL  seconds between leaderboard recomputes, 0 recomputes on every commit
+DEFAULTS = {
+    "BACKEND": "tracker.utils.events.InMemoryBroker",
+    "OPTIONS": {},
+    "QUEUE_SIZE": 100,
+    "HEARTBEAT_SECONDS": 15,
+    "LEADERBOARD_INTERVAL": 1.0,
+}
+
+LEADERBOARD_GROUP = "leaderboard"
+
+def events_config():
+    return {**DEFAULTS, **getattr(settings, "EVENTS", {})}
+
+def user_group(user_id):
+    return f"user:{user_id}"
+
+
+class Subscription:
+    #a subscriber's buffered events, read by a blocking thread (the WSGI stream)
+    def __init__(self, broker, groups, maxsize):
+        self.broker = broker
+        self.groups = tuple(groups)
+        self.overflowed = False
+        self.events = queue.Queue(maxsize)
+
+    def deliver(self, event):
+        #called from the publishing thread, never blocks it
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        #next event or None after timeout seconds
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    #same, read by a coroutine on the loop that subscribed (the ASGI stream)
+    def __init__(self, broker, groups, maxsize):
+        super().__init__(broker, groups, maxsize)
+        self.loop = asyncio.get_running_loop()
+        self.events = asyncio.Queue(maxsize)
+
+    def deliver(self, event):
+        #asyncio queues aren't thread safe, hand the put over to the subscriber's loop
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.events.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.events.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InMemoryBroker:
+    #process-local fan-out, no external broker needed. Each server process only sees the events
+    #published in it, so a multi-process deployment needs a shared backend behind EVENTS["BACKEND"]
+    process_local = True
+
+    def __init__(self, queue_size=None, **options):
+        self.queue_size = queue_size or events_config()["QUEUE_SIZE"]
+        self._lock = threading.Lock()
+        self._groups = defaultdict(set)
+        self._ids = itertools.count(1)
+
+    def subscribe(self, groups, asynchronous=False):
+        cls = AsyncSubscription if asynchronous else Subscription
+        subscription = cls(self, groups, self.queue_size)
+        with self._lock:
+            for group in subscription.groups:
+                self._groups[group].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for group in subscription.groups:
+                members = self._groups.get(group)
+                if members is not None:
+                    members.discard(subscription)
+                    if not members:
+                        del self._groups[group]
+
+    def has_subscribers(self, group):
+        return group in self._groups
+
+    def publish(self, group, event_type, data):
+        with self._lock:
+            subscribers = list(self._groups.get(group, ()))
+            event = {"id": next(self._ids), "event": event_type, "data": data}
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = events_config()
+                _broker = import_string(config["BACKEND"])(**config["OPTIONS"])
+    return _broker
+
+def publish(group, event_type, data):
+    #sent once the surrounding transaction commits, so a rolled back write never reaches a client
+    #nothing is queued at all while nobody is listening on the group
+    broker = get_broker()
+    if broker.has_subscribers(group):
+        transaction.on_commit(lambda: broker.publish(group, event_type, data))
+
+def publish_to_user(user_id, event_type, data):
+    publish(user_group(user_id), event_type, data)
+
+def publish_streak(habit):
+    publish_to_user(habit.user_id, "streak", {
+        "habit_id": habit.id,
+        "current_streak": habit.current_streak,
+        "longest_streak": habit.longest_streak,
+    })
+
+
+class LeaderboardNotifier:
+    #turns "some leaderboard input changed" into top 10 diffs. Bursts of changes are coalesced
+    #into one recompute per LEADERBOARD_INTERVAL, scheduled on the trailing edge so the last
+    #change is always picked up
+    def __init__(self, interval):
+        self.interval = interval
+        self.last = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._timer = None
+
+    def changed(self):
+        if not get_broker().has_subscribers(LEADERBOARD_GROUP):
+            return
+        transaction.on_commit(self.refresh if not self.interval else self._schedule)
+
+    def _schedule(self):
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.interval, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.refresh()
+        finally:
+            connection.close()
+
+    def refresh(self):
+        #imported here, the leaderboard queries need the models and models.py imports this module
+        from tracker.utils.leaderboard import LEADERBOARD_TYPES, leaderboard_data, leaderboard_rows
+
+        broker = get_broker()
+        with self._refresh_lock:
+            for board in LEADERBOARD_TYPES:
+                top = leaderboard_data(leaderboard_rows(board))
+                previous = self.last.get(board)
+                self.last[board] = top
+                changes = [
+                    dict(entry, rank=rank)
+                    for rank, entry in enumerate(top, 1)
+                    if previous is None or rank > len(previous) or previous[rank - 1] != entry
+                ]
+                if changes or previous is None or len(top) != len(previous):
+                    #size lets a client drop ranks that fell off the end of a shrinking board
+                    broker.publish(LEADERBOARD_GROUP, "leaderboard",
+                                   {"board": board, "size": len(top), "changes": changes})
+
+
+_notifier = None
+
+def leaderboard_changed():
+    global _notifier
+    if _notifier is None:
+        with _broker_lock:
+            if _notifier is None:
+                _notifier = LeaderboardNotifier(events_config()["LEADERBOARD_INTERVAL"])
+    _notifier.changed()
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+RESYNC = "event: resync\ndata: {}\n\n"  # events were dropped, the client should refetch
+HEARTBEAT = ": ping\n\n"
+
+def stream_events(groups):
+    #blocking generator for WSGI servers, holds a worker thread for as long as the client stays
+    heartbeat = events_config()["HEARTBEAT_SECONDS"]
+    subscription = get_broker().subscribe(groups)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            event = subscription.get(heartbeat)
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield RESYNC
+            yield format_event(event) if event else HEARTBEAT
+    finally:
+        subscription.close()
+
+async def astream_events(groups):
+    #the same stream for ASGI servers, an idle client costs a queue and nothing else
+    heartbeat = events_config()["HEARTBEAT_SECONDS"]
+    subscription = get_broker().subscribe(groups, asynchronous=True)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            event = await subscription.get(heartbeat)
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield RESYNC
+            yield format_event(event) if event else HEARTBEAT
+    finally:
+        subscription.close()
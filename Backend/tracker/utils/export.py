@@ -0,0 +1,84 @@
+import csv
+import json
+from datetime import date, datetime
+
+from tracker.models import DailyMetrics, FocusSession, Habit, Task
+
+#exported in this order, rows within a table in id order so (table, last id) is a resume point
+EXPORT_TABLES = {
+    "daily_metrics": DailyMetrics,
+    "focus_sessions": FocusSession,
+    "habits": Habit,
+    "tasks": Task,
+}
+EXPORT_FORMATS = ("ndjson", "csv")
+CHUNK_SIZE = 2000  # rows fetched per round trip, and rows per yielded text chunk
+
+def export_columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+def parse_checkpoint(value):
+    #"habits:123" → ("habits", 123), raises ValueError on anything else
+    table, _, last_id = (value or "").partition(":")
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"unknown table {table!r}")
+    return table, int(last_id)
+
+def _plain(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def _table_rows(table, user_ids=None, after_id=None):
+    model = EXPORT_TABLES[table]
+    queryset = model.objects.order_by("id")
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    if after_id is not None:
+        queryset = queryset.filter(id__gt=after_id)
+    #values_list + iterator: no model instances and no result cache, memory stays flat
+    return queryset.values_list(*export_columns(model)).iterator(chunk_size=CHUNK_SIZE)
+
+class _Echo:
+    #csv.writer target that hands the formatted line straight back
+    def write(self, value):
+        return value
+
+def export_stream(tables, fmt, user_ids=None, checkpoint=None):
+    #yields text chunks of CSV (single table) or NDJSON (one {"table": ..., ...} object per line)
+    #checkpoint=(table, last_id) skips everything up to and including that row
+    if fmt == "csv" and len(tables) != 1:
+        raise ValueError("csv exports one table at a time")
+
+    start_index = 0
+    if checkpoint:
+        start_index = tables.index(checkpoint[0])
+
+    writer = csv.writer(_Echo())
+    for index, table in enumerate(tables[start_index:], start_index):
+        columns = export_columns(EXPORT_TABLES[table])
+        after_id = checkpoint[1] if checkpoint and index == start_index else None
+
+        buffer = []
+        if fmt == "csv":
+            buffer.append(writer.writerow(columns))
+
+        for row in _table_rows(table, user_ids, after_id):
+            if fmt == "csv":
+                buffer.append(writer.writerow([_plain(value) for value in row]))
+            else:
+                record = {"table": table}
+                record.update(zip(columns, map(_plain, row)))
+                buffer.append(json.dumps(record) + "\n")
+            if len(buffer) >= CHUNK_SIZE:
+                yield "".join(buffer)
+                buffer = []
+
+        if buffer:
+            yield "".join(buffer)
+
+def checkpoint_from_line(line):
+    #resume point from the last complete NDJSON line already written
+    #(csv can't be resumed line by line, quoted fields may hold newlines)
+    record = json.loads(line)
+    return record["table"], record["id"]
@@ -0,0 +1,33 @@
+from django.db.models import F
+from django.utils import timezone
+
+from tracker.models import UserProfile, WeeklyRollup
+from tracker.utils.metrics import week_start_for
+
+LEADERBOARD_TYPES = ("xp", "focus", "streak")
+
+def leaderboard_rows(board_type):
+    #top 10 as values() rows with name/level/value keys, None for an unknown type
+    #shared by the sync and async views and the live leaderboard events, only evaluation differs
+    if board_type in ("xp", "focus"):
+        column = "xp_earned" if board_type == "xp" else "focus_minutes"
+        today = timezone.now().date()
+        return (
+            WeeklyRollup.objects
+            .filter(week_start=week_start_for(today))
+            .values(name=F("user__first_name"), player_level=F("user__userprofile__level"), value=F(column))
+            .order_by(f"-{column}")[:10]
+        )
+
+    if board_type == "streak":
+        #best_current_streak is kept in sync by Habit.update_streak and the reset logic
+        return (
+            UserProfile.objects
+            .values(name=F("user__first_name"), player_level=F("level"), value=F("best_current_streak"))
+            .order_by("-best_current_streak")[:10]
+        )
+
+    return None
+
+def leaderboard_data(rows):
+    return [{"name": r["name"], "level": r["player_level"], "value": r["value"]} for r in rows]
@@ -0,0 +1,154 @@
+from collections import Counter
+from datetime import timezone as dt_timezone
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.utils import timezone
+
+from tracker.models import DailyMetrics, UserProfile, WeeklyRollup, XPEvent
+from tracker.utils.levels import level_for_xp
+from tracker.utils.metrics import week_start_for
+
+#sources whose XP also counts towards DailyMetrics/WeeklyRollup, the rest (achievement rewards,
+#pre-ledger balances) only count towards the profile, same as the live write paths
+DAILY_SOURCES = frozenset(("task", "habit", "focus_session", "legacy"))
+CHUNK_SIZE = 10_000  # rows per round trip on every stream
+WRITE_BATCH = 1000
+COUNT_KEYS = ("profiles", "profiles_drifted", "daily_updated", "daily_created", "weekly_updated", "weekly_created")
+
+def record_xp(user_id, entries):
+    #appends (source_type, source_id, base_xp, theme_bonus) rows, call next to the profile XP write
+    XPEvent.objects.bulk_create([
+        XPEvent(user_id=user_id, source_type=source_type, source_id=source_id,
+                base_xp=base_xp, theme_bonus=theme_bonus)
+        for source_type, source_id, base_xp, theme_bonus in entries
+    ])
+
+def _fold_ledger(rows):
+    #(user_id, total_xp, {day: daily xp}) per user from rows sorted by user, one pass, O(days) memory
+    for user_id, events in groupby(rows, key=itemgetter(0)):
+        total = 0
+        days = Counter()
+        for _, source_type, base_xp, theme_bonus, created_at in events:
+            xp = base_xp + theme_bonus
+            total += xp
+            if source_type in DAILY_SOURCES:
+                days[created_at.astimezone(dt_timezone.utc).date()] += xp
+        yield user_id, total, days
+
+def _grouped(rows):
+    for user_id, group in groupby(rows, key=itemgetter(0)):
+        yield user_id, list(group)
+
+class _MergeStream:
+    #walks a stream of per-user items sorted by user id alongside the profile stream
+    def __init__(self, items):
+        self._items = iter(items)
+        self._head = next(self._items, None)
+
+    def take(self, user_id, default):
+        #the item for user_id, skipping users that have no profile, or default
+        while self._head is not None and self._head[0] < user_id:
+            self._head = next(self._items, None)
+        if self._head is not None and self._head[0] == user_id:
+            item, self._head = self._head, next(self._items, None)
+            return item
+        return default
+
+def _diff_rows(existing, wanted, model, key_field, user_id, now):
+    #existing: [(user_id, id, key, xp)], wanted: {key: xp}. Returns (updates, creates)
+    updates = []
+    seen = set()
+    for _, pk, key, xp in existing:
+        seen.add(key)
+        should = wanted.get(key, 0)
+        if xp != should:
+            row = model(id=pk, xp_earned=should)
+            if model is DailyMetrics:
+                row.updated_at = now  # bulk_update skips auto_now, delta sync needs it
+            updates.append(row)
+    creates = [
+        model(user_id=user_id, xp_earned=xp, **{key_field: key})
+        for key, xp in wanted.items() if xp and key not in seen
+    ]
+    return updates, creates
+
+def rebuild_from_ledger(user_ids=None, check=False, report=None):
+    #regenerates profile XP/level and the daily and weekly XP columns from XPEvent in a single pass:
+    #the ledger, profiles, DailyMetrics and WeeklyRollup are each streamed once in user order and
+    #merge-joined, and only rows that differ are written. Returns drift counts.
+    #Run it while completions are paused, an award landing mid-rebuild can be overwritten
+    def scoped(queryset):
+        return queryset.filter(user_id__in=user_ids) if user_ids is not None else queryset
+
+    ledger = _MergeStream(_fold_ledger(
+        scoped(XPEvent.objects).order_by("user_id", "id")
+        .values_list("user_id", "source_type", "base_xp", "theme_bonus", "created_at")
+        .iterator(chunk_size=CHUNK_SIZE)
+    ))
+    daily = _MergeStream(_grouped(
+        scoped(DailyMetrics.objects).order_by("user_id", "metric_date")
+        .values_list("user_id", "id", "metric_date", "xp_earned").iterator(chunk_size=CHUNK_SIZE)
+    ))
+    weekly = _MergeStream(_grouped(
+        scoped(WeeklyRollup.objects).order_by("user_id", "week_start")
+        .values_list("user_id", "id", "week_start", "xp_earned").iterator(chunk_size=CHUNK_SIZE)
+    ))
+    profiles = (
+        scoped(UserProfile.objects).order_by("user_id")
+        .values_list("user_id", "id", *UserProfile.XP_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+    )
+
+    counts = dict.fromkeys(COUNT_KEYS, 0)
+    pending = {"profiles": [], "daily_updates": [], "daily_creates": [], "weekly_updates": [], "weekly_creates": []}
+    now = timezone.now()
+
+    def flush(force=False):
+        if check:
+            for rows in pending.values():
+                rows.clear()
+            return
+        if not force and max(len(rows) for rows in pending.values()) < WRITE_BATCH:
+            return
+        with transaction.atomic():
+            UserProfile.objects.bulk_update(pending["profiles"], UserProfile.XP_FIELDS, batch_size=WRITE_BATCH)
+            DailyMetrics.objects.bulk_update(pending["daily_updates"], ["xp_earned", "updated_at"], batch_size=WRITE_BATCH)
+            DailyMetrics.objects.bulk_create(pending["daily_creates"], batch_size=WRITE_BATCH)
+            WeeklyRollup.objects.bulk_update(pending["weekly_updates"], ["xp_earned"], batch_size=WRITE_BATCH)
+            WeeklyRollup.objects.bulk_create(pending["weekly_creates"], batch_size=WRITE_BATCH)
+        for rows in pending.values():
+            rows.clear()
+
+    for user_id, profile_id, *xp_fields in profiles:
+        counts["profiles"] += 1
+        _, total, days = ledger.take(user_id, (user_id, 0, Counter()))
+
+        level, current_level_xp, xp_for_next_level = level_for_xp(total)
+        wanted = dict(zip(UserProfile.XP_FIELDS, (total, current_level_xp, level, xp_for_next_level)))
+        if dict(zip(UserProfile.XP_FIELDS, xp_fields)) != wanted:
+            counts["profiles_drifted"] += 1
+            pending["profiles"].append(UserProfile(id=profile_id, **wanted))
+
+        weeks = Counter()
+        for day, xp in days.items():
+            weeks[week_start_for(day)] += xp
+
+        updates, creates = _diff_rows(daily.take(user_id, (user_id, []))[1], days, DailyMetrics, "metric_date", user_id, now)
+        counts["daily_updated"] += len(updates)
+        counts["daily_created"] += len(creates)
+        pending["daily_updates"] += updates
+        pending["daily_creates"] += creates
+
+        updates, creates = _diff_rows(weekly.take(user_id, (user_id, []))[1], weeks, WeeklyRollup, "week_start", user_id, now)
+        counts["weekly_updated"] += len(updates)
+        counts["weekly_created"] += len(creates)
+        pending["weekly_updates"] += updates
+        pending["weekly_creates"] += creates
+
+        flush()
+        if report and counts["profiles"] % 10_000 == 0:
+            report(counts)
+
+    flush(force=True)
+    return counts
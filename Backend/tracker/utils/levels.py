@@ -0,0 +1,23 @@
+from bisect import bisect_right
+
+#level curve: 100 XP for level 1 → 2, each next level costs int(previous * 1.25)
+BASE_LEVEL_XP = 100
+LEVEL_GROWTH = 1.25
+MAX_TOTAL_XP = 2 ** 63 - 1  # BIGINT limit, the table stops once a level costs more than this
+
+def _build_level_table():
+    #LEVEL_THRESHOLDS[i] is the total XP at which level i + 1 starts
+    #LEVEL_COSTS[i] is the XP needed to go from level i + 1 to level i + 2
+    thresholds = [0]
+    costs = [BASE_LEVEL_XP]
+    while thresholds[-1] <= MAX_TOTAL_XP:
+        thresholds.append(thresholds[-1] + costs[-1])
+        costs.append(int(costs[-1] * LEVEL_GROWTH))
+    return thresholds, costs
+
+LEVEL_THRESHOLDS, LEVEL_COSTS = _build_level_table()
+
+def level_for_xp(total_xp):
+    #binary search over the cumulative table, returns (level, current_level_xp, xp_for_next_level)
+    index = bisect_right(LEVEL_THRESHOLDS, max(total_xp, 0)) - 1
+    return index + 1, total_xp - LEVEL_THRESHOLDS[index], LEVEL_COSTS[index]
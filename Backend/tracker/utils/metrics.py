@@ -1,15 +1,86 @@
+from django.db import connection, transaction
+from django.db.models import F
 from django.utils import timezone
-from datetime import date, timedelta
-from tracker.models import DailyMetrics
-
-def update_daily_metrics(user, xp=0, focus_minutes=0, completed_date=None):
-    #updates the user's daily metrics for today
-    completed_date = completed_date or date.today()
-    metrics, created = DailyMetrics.objects.get_or_create(user=user, date=completed_date)
-    metrics.weekly_xp += xp
-    metrics.weekly_focus_minutes += focus_minutes
-    metrics.save()
-    return metrics
+from datetime import timedelta
+from tracker.models import DailyMetrics, UserProfile, WeeklyRollup
+from tracker.utils.events import leaderboard_changed
+
+DAILY_COUNTERS = (
+    "total_study_minutes",
+    "total_tasks_completed",
+    "habits_completed",
+    "xp_earned",
+    "weekly_xp",
+    "weekly_focus_minutes",
+)
+
+def _upsert_increment(model, keys, counters, touch=()):
+    #INSERT ... ON CONFLICT (keys) DO UPDATE SET col = col + excluded.col
+    #one statement on both SQLite (3.24+) and PostgreSQL, so concurrent increments can't be lost
+    #counters must cover every NOT NULL counter column since the row may be new
+    #touch names auto_now fields, raw SQL skips them so they are set to now here
+    qn = connection.ops.quote_name
+    opts = model._meta
+    table = qn(opts.db_table)
+
+    key_columns = [qn(opts.get_field(name).column) for name in keys]
+    counter_columns = [qn(opts.get_field(name).column) for name in counters]
+    touch_columns = [qn(opts.get_field(name).column) for name in touch]
+    changed = [qn(opts.get_field(name).column) for name, value in counters.items() if value]
+
+    if changed:
+        conflict_action = "DO UPDATE SET " + ", ".join(
+            [f"{column} = {table}.{column} + excluded.{column}" for column in changed]
+            + [f"{column} = excluded.{column}" for column in touch_columns]
+        )
+    else:
+        conflict_action = "DO NOTHING"
+
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    columns = key_columns + counter_columns + touch_columns
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({', '.join(key_columns)}) {conflict_action}"
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, list(keys.values()) + list(counters.values()) + [now] * len(touch_columns))
+
+def update_daily_metrics(user, xp=0, focus_minutes=0, tasks_completed=0, habits_completed=0,
+                         focus_sessions=0, completed_date=None):
+    #the single write path for DailyMetrics, also keeps the weekly leaderboard rollup
+    #and the profile lifetime counters in step
+    completed_date = completed_date or timezone.now().date()
+    counters = dict.fromkeys(DAILY_COUNTERS, 0)
+    counters.update(
+        xp_earned=xp,
+        total_study_minutes=focus_minutes,
+        total_tasks_completed=tasks_completed,
+        habits_completed=habits_completed,
+    )
+
+    with transaction.atomic():
+        _upsert_increment(
+            DailyMetrics,
+            {"user": user.pk, "metric_date": connection.ops.adapt_datefield_value(completed_date)},
+            counters,
+            touch=("updated_at",),
+        )
+        update_weekly_rollup(user, xp=xp, focus_minutes=focus_minutes, completed_date=completed_date)
+        _increment_lifetime_counters(
+            user,
+            lifetime_focus_minutes=focus_minutes,
+            lifetime_focus_sessions=focus_sessions,
+            lifetime_tasks_completed=tasks_completed,
+            lifetime_habits_completed=habits_completed,
+        )
+
+def _increment_lifetime_counters(user, **deltas):
+    #F() increments so concurrent completions can't lose counts
+    changed = {field: F(field) + value for field, value in deltas.items() if value}
+    if changed:
+        UserProfile.objects.filter(user=user).update(**changed)
 
 def reset_weekly_leaderboards():
     today = timezone.now().date()
@@ -18,18 +89,26 @@ def reset_weekly_leaderboards():
     if today.weekday() == 0:
         DailyMetrics.objects.update(
             weekly_xp=0,
-            weekly_focus_minutes=0
+            weekly_focus_minutes=0,
+            updated_at=timezone.now(),
         )
 
 def update_daily_xp(user, xp=0, completed_date=None):
-    completed_date = completed_date or timezone.now().date()
+    update_daily_metrics(user, xp=xp, completed_date=completed_date)
 
-    metrics, _ = DailyMetrics.objects.get_or_create(
-        user=user,
-        metric_date=completed_date
-    )
+def week_start_for(day):
+    #monday of the ISO week containing day
+    return day - timedelta(days=day.weekday())
 
-    metrics.xp_earned += xp
-    metrics.save()
+def update_weekly_rollup(user, xp=0, focus_minutes=0, completed_date=None):
+    #call inside the same transaction as the DailyMetrics write so both stay in step
+    completed_date = completed_date or timezone.now().date()
+    week_start = connection.ops.adapt_datefield_value(week_start_for(completed_date))
 
-    return metrics
\ No newline at end of file
+    _upsert_increment(
+        WeeklyRollup,
+        {"user": user.pk, "week_start": week_start},
+        {"xp_earned": xp, "focus_minutes": focus_minutes},
+    )
+    if xp or focus_minutes:
+        leaderboard_changed()
@@ -0,0 +1,208 @@
+import logging
+import uuid
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from tracker.models import OutboxEvent, UserProfile
+from tracker.utils.achievements import evaluate_achievements
+from tracker.utils.events import get_broker
+from tracker.utils.metrics import update_daily_metrics
+from tracker.utils.snapshot import invalidate_snapshot
+
+logger = logging.getLogger(__name__)
+
+#settings.OUTBOX keys:
+#  BATCH_SIZE      events claimed per batch
+#  LEASE_SECONDS   how long a claim lasts, a batch whose apply failed is retried after it
+#  DRAIN_INLINE    apply a request's own events in the web process once its response has been sent,
+#                  drain_outbox is then only a backstop for events that didn't get applied
+#  RETENTION_DAYS  processed events kept for auditing before drain_outbox --prune deletes them
+#  MAX_ATTEMPTS    failed applies before an event is parked: marked processed with its last_error
+#                  kept, and never pruned, so it can be looked at and re-queued by hand
+DEFAULTS = {
+    "BATCH_SIZE": 500,
+    "LEASE_SECONDS": 60,
+    "DRAIN_INLINE": True,
+    "RETENTION_DAYS": 7,
+    "MAX_ATTEMPTS": 5,
+}
+
+#update_daily_metrics arguments an event can carry, summed per user and day when a batch is applied
+METRIC_KEYS = ("xp", "focus_minutes", "focus_sessions", "tasks_completed", "habits_completed")
+
+#ids of the events committed by the current request, set by OutboxMiddleware
+_request_events = ContextVar("outbox_request_events", default=None)
+
+def outbox_config():
+    return {**DEFAULTS, **getattr(settings, "OUTBOX", {})}
+
+def process_local_backends():
+    #the live event broker and the snapshot cache have to be shared for another process to apply
+    #events: achievement and leaderboard events and snapshot invalidations are sent from there
+    local = []
+    if getattr(get_broker(), "process_local", False):
+        local.append('EVENTS["BACKEND"]')
+    if isinstance(caches["default"], LocMemCache):
+        local.append('CACHES["default"]')
+    return local
+
+def enqueue(user, kind, completed_date=None, longest_streak=None, **metrics):
+    #call inside the transaction that writes the completion, so both commit or neither does
+    payload = {key: metrics.get(key, 0) for key in METRIC_KEYS}
+    payload["date"] = (completed_date or timezone.now().date()).isoformat()
+    if longest_streak is not None:
+        payload["longest_streak"] = longest_streak
+    return OutboxEvent.objects.create(user=user, kind=kind, payload=payload)
+
+def after_commit(event):
+    #views call this after the completion's transaction, the drain waits for any outer one too
+    if outbox_config()["DRAIN_INLINE"]:
+        transaction.on_commit(lambda: _drain_inline(event.id))
+
+def _drain_inline(event_id):
+    #inside a request the event waits for the response to go out, so it is neither counted
+    #against the endpoint's query budget nor holds the response up. Elsewhere it's applied now
+    pending = _request_events.get()
+    if pending is None:
+        drain(ids=[event_id])
+    else:
+        pending.append(event_id)
+
+def begin_request():
+    pending = []
+    return pending, _request_events.set(pending)
+
+def end_request(token):
+    _request_events.reset(token)
+
+def drain_after_response(pending):
+    #called once the response is closed. A failure leaves the events for drain_outbox
+    try:
+        drain(ids=pending)
+    except Exception:
+        logger.exception("inline outbox drain failed for events %s", pending)
+
+def pending_events(now):
+    return OutboxEvent.objects.filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lt=now),
+        processed_at__isnull=True,
+    )
+
+def claim_batch(batch_size, lease, now=None, ids=None):
+    #same claim as reminders.claim_batch: SKIP LOCKED candidates, then an UPDATE that repeats
+    #the pending filter so only one drainer wins a row. Returns (token, rows)
+    now = now or timezone.now()
+    token = uuid.uuid4()
+    candidates = pending_events(now)
+    if ids is not None:
+        candidates = candidates.filter(id__in=ids)
+    with transaction.atomic():
+        candidate_ids = list(
+            candidates.select_for_update(skip_locked=True)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not candidate_ids:
+            return token, []
+        pending_events(now).filter(id__in=candidate_ids).update(
+            claim_token=token, claimed_until=now + lease,
+        )
+    return token, list(OutboxEvent.objects.filter(claim_token=token).order_by("id").values("id", "user_id", "payload"))
+
+def apply_batch(token, events):
+    #one transaction per user: a metrics upsert per day touched, one achievement check and
+    #one snapshot invalidation however many of the user's events are in the batch.
+    #When a user's events fail together they are retried one by one, so only the event that
+    #raises is charged an attempt. It keeps the claim and is retried once the lease runs out
+    by_user = defaultdict(list)
+    for event in events:
+        by_user[event["user_id"]].append(event)
+
+    applied = 0
+    for user_id, user_events in by_user.items():
+        if len(user_events) == 1:
+            applied += _apply_claimed(token, user_id, user_events)
+        elif _apply_claimed(token, user_id, user_events, charge=False):
+            applied += len(user_events)
+        else:
+            applied += sum(_apply_claimed(token, user_id, [event]) for event in user_events)
+    return applied
+
+def _apply_claimed(token, user_id, events, charge=True):
+    #applies one user's claimed events in one transaction, returns whether it committed
+    ids = [event["id"] for event in events]
+    claimed = OutboxEvent.objects.filter(claim_token=token, id__in=ids)
+    try:
+        with transaction.atomic():
+            _apply_user_events(user_id, events)
+            claimed.update(processed_at=timezone.now(), claim_token=None, claimed_until=None)
+    except Exception as exc:
+        logger.exception("outbox apply failed for user %s", user_id)
+        if charge:
+            claimed.update(attempts=F("attempts") + 1, last_error=str(exc)[:1000])
+            max_attempts = outbox_config()["MAX_ATTEMPTS"]
+            parked = claimed.filter(attempts__gte=max_attempts).update(
+                processed_at=timezone.now(), claim_token=None, claimed_until=None,
+            )
+            if parked:
+                logger.error("parked outbox events %s after %s failed attempts", ids, max_attempts)
+        return False
+    return True
+
+def _apply_user_events(user_id, events):
+    per_day = defaultdict(Counter)
+    longest_streak = None
+    for event in events:
+        payload = event["payload"]
+        per_day[payload["date"]].update({key: payload.get(key, 0) for key in METRIC_KEYS})
+        if "longest_streak" in payload:
+            longest_streak = max(longest_streak or 0, payload["longest_streak"])
+
+    profile = UserProfile.objects.select_related("user").get(user_id=user_id)
+    for day, totals in sorted(per_day.items()):
+        if any(totals.values()):
+            update_daily_metrics(profile.user, completed_date=date.fromisoformat(day),
+                                 **{key: totals[key] for key in METRIC_KEYS})
+
+    #checked against the totals after the whole batch, which unlocks the same set as checking
+    #after every event since each rule is a threshold on a growing number
+    profile.refresh_from_db()
+    metrics = {"level": profile.level, "total_xp": profile.total_xp, "focus_minutes": profile.lifetime_focus_minutes}
+    if longest_streak is not None:
+        metrics["longest_streak"] = longest_streak
+    evaluate_achievements(profile.user, profile, **metrics)
+    invalidate_snapshot(user_id)
+
+def drain(batch_size=None, lease_seconds=None, max_batches=None, ids=None):
+    #applies pending events batch by batch, returns how many were applied
+    config = outbox_config()
+    batch_size = batch_size or config["BATCH_SIZE"]
+    lease = timedelta(seconds=lease_seconds or config["LEASE_SECONDS"])
+
+    applied = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        token, events = claim_batch(batch_size, lease, ids=ids)
+        if not events:
+            break
+        applied += apply_batch(token, events)
+        batches += 1
+    return applied
+
+def prune_processed(now=None):
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=outbox_config()["RETENTION_DAYS"])
+    deleted, _ = (
+        OutboxEvent.objects
+        .filter(processed_at__lt=cutoff, attempts__lt=outbox_config()["MAX_ATTEMPTS"])  # parked ones stay
+        .delete()
+    )
+    return deleted
@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+#settings.QUERY_BUDGET keys:
+#  HEADERS      add X-Query-Count / X-DB-Time-Ms / X-Wall-Time-Ms to responses
+#  REPORT_DIR   where each process dumps its stats for the query_report command (None = off)
+#  FLUSH_EVERY  dump after this many recorded requests
+#  BUDGETS      {"METHOD url-name": max queries per request}
+def budget_config():
+    return getattr(settings, "QUERY_BUDGET", {})
+
+def budget_for(endpoint):
+    return budget_config().get("BUDGETS", {}).get(endpoint)
+
+def endpoint_for(method, resolver_match):
+    #"GET habit-list", list routes serve both reads and creates so the method is part of the key
+    if resolver_match is None:
+        return None
+    return f"{method} {resolver_match.url_name or resolver_match.route}"
+
+class QueryCounter:
+    #connection.execute_wrapper hook, counts queries and the time spent in the database
+    def __init__(self):
+        self.count = 0
+        self.db_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.db_ms += (time.perf_counter() - started) * 1000
+
+class QueryStatsRegistry:
+    #in-process aggregate per endpoint, shared by every request thread
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._since_flush = 0
+
+    def record(self, endpoint, queries, db_ms, wall_ms):
+        budget = budget_for(endpoint)
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {
+                "requests": 0, "queries": 0, "max_queries": 0,
+                "db_ms": 0.0, "wall_ms": 0.0, "max_wall_ms": 0.0,
+                "over_budget": 0, "budget": budget,
+            })
+            stats["requests"] += 1
+            stats["queries"] += queries
+            stats["max_queries"] = max(stats["max_queries"], queries)
+            stats["db_ms"] += db_ms
+            stats["wall_ms"] += wall_ms
+            stats["max_wall_ms"] = max(stats["max_wall_ms"], wall_ms)
+            if budget is not None and queries > budget:
+                stats["over_budget"] += 1
+            self._since_flush += 1
+            flush = self._since_flush >= budget_config().get("FLUSH_EVERY", 100)
+        if flush:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._since_flush = 0
+
+    def flush(self):
+        report_dir = budget_config().get("REPORT_DIR")
+        with self._lock:
+            self._since_flush = 0
+        if not report_dir:
+            return
+        Path(report_dir).mkdir(parents=True, exist_ok=True)
+        path = Path(report_dir) / f"query_stats_{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()))
+        tmp.replace(path)
+
+query_stats = QueryStatsRegistry()
+
+def merge_reports(snapshots):
+    #combines per-process snapshots into one row per endpoint, slowest total DB time first
+    merged = {}
+    for snapshot in snapshots:
+        for name, stats in snapshot.items():
+            row = merged.setdefault(name, dict(stats, requests=0, queries=0, max_queries=0, db_ms=0.0,
+                                               wall_ms=0.0, max_wall_ms=0.0, over_budget=0))
+            for key in ("requests", "queries", "db_ms", "wall_ms", "over_budget"):
+                row[key] += stats[key]
+            row["max_queries"] = max(row["max_queries"], stats["max_queries"])
+            row["max_wall_ms"] = max(row["max_wall_ms"], stats["max_wall_ms"])
+    return sorted(merged.items(), key=lambda item: item[1]["db_ms"], reverse=True)
@@ -0,0 +1,165 @@
+import json
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from tracker.models import Reminder
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BACKEND": "tracker.utils.reminders.LogBackend",
+    "OPTIONS": {},
+    "BATCH_SIZE": 1000,
+    "LEASE_SECONDS": 60,
+}
+
+#columns a backend gets for each reminder, one joined read per claimed batch
+DELIVERY_FIELDS = (
+    "id", "user_id", "user__username", "preset", "reminder_type", "scheduled_time",
+    "habit_id", "habit__habit_title", "task_id", "task__task_title", "task__deadline",
+)
+
+def reminder_config():
+    return {**DEFAULTS, **getattr(settings, "REMINDERS", {})}
+
+
+class LogBackend:
+    #writes one log line per reminder, the default for local development
+    def __init__(self, **options):
+        self.level = options.get("level", logging.INFO)
+
+    def send_batch(self, reminders):
+        for reminder in reminders:
+            logger.log(self.level, "reminder %s for %s: %s",
+                       reminder["id"], reminder["user__username"], reminder_message(reminder))
+
+
+class FileBackend:
+    #appends one JSON line per reminder, a whole batch in a single write
+    def __init__(self, path, **options):
+        self.path = path
+
+    def send_batch(self, reminders):
+        lines = [
+            json.dumps({
+                "id": reminder["id"],
+                "user_id": reminder["user_id"],
+                "message": reminder_message(reminder),
+                "scheduled_time": reminder["scheduled_time"].isoformat(),
+            }) + "\n"
+            for reminder in reminders
+        ]
+        with open(self.path, "a") as fh:
+            fh.write("".join(lines))
+
+
+def get_backend():
+    config = reminder_config()
+    return import_string(config["BACKEND"])(**config["OPTIONS"])
+
+def reminder_message(reminder):
+    if reminder["preset"] == "daily_habit" and reminder["habit__habit_title"]:
+        return f"Time for {reminder['habit__habit_title']} today"
+    if reminder["preset"] == "task_deadline" and reminder["task__deadline"]:
+        return f"{reminder['task__task_title']} is due at {reminder['task__deadline'].isoformat()}"
+    target = reminder["habit__habit_title"] or reminder["task__task_title"]
+    return f"Reminder: {target}" if target else "Reminder"
+
+def deadline_fire_time(deadline, lead_hours):
+    return deadline - timedelta(hours=lead_hours)
+
+def due_reminders(now):
+    #(reminders_enabled, scheduled_time) index range, claimed rows drop out until their lease ends
+    return Reminder.objects.filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lt=now),
+        reminders_enabled=True,
+        scheduled_time__lte=now,
+    )
+
+def claim_batch(batch_size, lease, now=None):
+    #claims up to batch_size due reminders for this worker and returns (token, rows)
+    #SKIP LOCKED keeps PostgreSQL workers off each other's candidates; the UPDATE repeats
+    #the due filter so a row two workers both picked is only claimed by one of them
+    #(SQLite serialises the whole block through its IMMEDIATE write lock anyway)
+    now = now or timezone.now()
+    token = uuid.uuid4()
+    with transaction.atomic():
+        candidates = list(
+            due_reminders(now)
+            .select_for_update(skip_locked=True)
+            .order_by("scheduled_time")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not candidates:
+            return token, []
+        due_reminders(now).filter(id__in=candidates).update(
+            claim_token=token, claimed_until=now + lease,
+        )
+    return token, list(Reminder.objects.filter(claim_token=token).values(*DELIVERY_FIELDS))
+
+def finish_batch(token, reminders, now=None):
+    #releases the claim and moves each reminder to its next fire time in a few set-based UPDATEs:
+    #one for the one-shot reminders, one per distinct day skip for the daily ones
+    now = now or timezone.now()
+    one_shot = []
+    daily = defaultdict(list)
+    for reminder in reminders:
+        if reminder["preset"] == "daily_habit":
+            #skip days missed while no worker ran, a nudge for last Tuesday is noise
+            days = max(1, (now - reminder["scheduled_time"]) // timedelta(days=1) + 1)
+            daily[days].append(reminder["id"])
+        else:
+            one_shot.append(reminder["id"])
+
+    claimed = Reminder.objects.filter(claim_token=token)
+    with transaction.atomic():
+        if one_shot:
+            claimed.filter(id__in=one_shot).update(
+                reminders_enabled=False, claim_token=None, claimed_until=None, last_sent_at=now,
+            )
+        for days, ids in daily.items():
+            claimed.filter(id__in=ids).update(
+                scheduled_time=F("scheduled_time") + timedelta(days=days),
+                claim_token=None, claimed_until=None, last_sent_at=now,
+            )
+
+def dispatch_due(backend=None, batch_size=None, lease_seconds=None, max_batches=None):
+    #drains the due queue batch by batch, returns how many reminders were delivered
+    #a batch whose delivery raises keeps its claim and is retried once the lease runs out
+    config = reminder_config()
+    backend = backend or get_backend()
+    batch_size = batch_size or config["BATCH_SIZE"]
+    lease = timedelta(seconds=lease_seconds or config["LEASE_SECONDS"])
+
+    sent = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        token, reminders = claim_batch(batch_size, lease)
+        if not reminders:
+            break
+        backend.send_batch(reminders)
+        finish_batch(token, reminders)
+        sent += len(reminders)
+        batches += 1
+    return sent
+
+def rearm_deadline_reminders(task):
+    #called when a task's deadline changes, deadline reminders follow it in one bulk_update
+    if task.deadline is None:
+        return
+    reminders = list(Reminder.objects.filter(task=task, preset="task_deadline"))
+    now = timezone.now()
+    for reminder in reminders:
+        reminder.scheduled_time = deadline_fire_time(task.deadline, reminder.lead_hours)
+        if reminder.last_sent_at and reminder.scheduled_time > now:
+            reminder.reminders_enabled = True  # already fired for the old deadline, arm it again
+    if reminders:
+        Reminder.objects.bulk_update(reminders, ["scheduled_time", "reminders_enabled"])
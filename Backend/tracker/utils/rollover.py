@@ -0,0 +1,58 @@
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from tracker.models import Habit, UserProfile, sync_best_streak
+from tracker.utils.snapshot import invalidate_snapshots
+
+
+def run_daily_rollover(today=None):
+    #set-based replacement for the per-habit reset that used to run on every GET /habits/
+    #safe to run more than once a day, a second run just touches 0 rows
+    today = today or timezone.now().date()
+    yesterday = today - timedelta(days=1)
+    started = time.perf_counter()
+    now = timezone.now()  # queryset updates skip auto_now, delta sync needs updated_at moved
+
+    daily = Habit.objects.filter(habit_frequency="daily")
+
+    with transaction.atomic():
+        #owners of the habits the two updates below touch, their cached dashboards show the old day
+        touched_users = set(
+            daily
+            .filter(Q(last_completed_date__lt=yesterday, current_streak__gt=0)
+                    | Q(last_completed_date__lt=today, is_completed=True))
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+
+        #missed yesterday → streak lapsed
+        streaks_reset = (
+            daily
+            .filter(last_completed_date__lt=yesterday, current_streak__gt=0)
+            .update(current_streak=0, updated_at=now)
+        )
+
+        #completed before today → unticked for the new day
+        completions_cleared = (
+            daily
+            .filter(last_completed_date__lt=today, is_completed=True)
+            .update(is_completed=False, updated_at=now)
+        )
+
+        profiles_synced = 0
+        if streaks_reset:
+            profiles_synced = sync_best_streak(
+                UserProfile.objects.filter(best_current_streak__gt=0).values("user_id")
+            )
+        invalidate_snapshots(touched_users)
+
+    return {
+        "streaks_reset": streaks_reset,
+        "completions_cleared": completions_cleared,
+        "profiles_synced": profiles_synced,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
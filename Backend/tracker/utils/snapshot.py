@@ -0,0 +1,31 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+#per-user dashboard snapshot, the date in the key retires entries at the daily rollover
+SNAPSHOT_TIMEOUT = 60 * 60
+
+def snapshot_key(user_id, day=None):
+    day = day or timezone.now().date()
+    return f"dashboard_snapshot:{user_id}:{day.isoformat()}"
+
+def get_snapshot(user_id):
+    return cache.get(snapshot_key(user_id))
+
+def set_snapshot(user_id, payload):
+    cache.set(snapshot_key(user_id), payload, SNAPSHOT_TIMEOUT)
+
+def invalidate_snapshot(user_id):
+    #called from every write path that changes what the snapshot shows
+    #deleted again after commit so a concurrent read can't re-cache pre-commit data
+    key = snapshot_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+def invalidate_snapshots(user_ids):
+    #invalidate_snapshot for many users with one cache round trip each way
+    keys = [snapshot_key(user_id) for user_id in user_ids]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
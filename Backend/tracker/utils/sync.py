@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from tracker.models import Tombstone
+
+#rows are matched on updated_at >= since - SYNC_OVERLAP, so a write whose transaction
+#committed just after a sync read is still picked up by the next one
+#clients upsert by id, re-sending a few rows is harmless
+SYNC_OVERLAP = timedelta(seconds=5)
+
+#tombstones older than this are pruned, a client whose token is older must do a full resync
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+#a full resync sends at most this many of the newest focus sessions and metrics rows, which grow
+#without bound, older ones are paged from their cursor paginated list endpoints
+RESET_HISTORY_LIMIT = 500
+
+def record_deletions(user_id, kind, object_ids):
+    #call on every path that deletes habits, tasks, subtasks, focus sessions or metrics rows
+    now = timezone.now()
+    Tombstone.objects.bulk_create([
+        Tombstone(user_id=user_id, kind=kind, object_id=object_id, deleted_at=now)
+        for object_id in object_ids
+    ])
+
+def prune_tombstones(now=None):
+    now = now or timezone.now()
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=now - TOMBSTONE_RETENTION).delete()
+    return deleted
+
+def needs_full_resync(since, now=None):
+    now = now or timezone.now()
+    return since is None or since < now - TOMBSTONE_RETENTION
@@ -0,0 +1,103 @@
+import random
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+
+from tracker.models import (
+    DailyMetrics, FocusSession, Habit, SubTask, Task, UserProfile, sync_best_streak,
+)
+from tracker.utils.levels import level_for_xp
+
+THEMES = ["studies", "exercise", "sleep", "nutrition"]
+DIFFICULTIES = {"easy": 10, "medium": 25, "hard": 50}
+BATCH_SIZE = 2000
+
+
+def seed_population(users=100, habits_per_user=5, tasks_per_user=10, subtasks_per_task=3,
+                    days=365, sessions_per_user=50, seed=42, username_prefix="bench"):
+    #bulk inserts a synthetic population for benchmarks, returns the created users
+    rng = random.Random(seed)
+    today = timezone.now().date()
+    password = make_password("bench-pass")  # hashed once, hashing per user would dominate seeding
+
+    User.objects.bulk_create(
+        [User(username=f"{username_prefix}{i}", first_name=f"Bench {i}", password=password) for i in range(users)],
+        batch_size=BATCH_SIZE,
+    )
+    created = list(User.objects.filter(username__startswith=username_prefix).order_by("id"))
+
+    profiles = []
+    habits = []
+    tasks = []
+    metrics = []
+    sessions = []
+    for user in created:
+        total_xp = 0
+        lifetime = dict.fromkeys(UserProfile.LIFETIME_FIELDS, 0)
+
+        for h in range(habits_per_user):
+            difficulty = rng.choice(list(DIFFICULTIES))
+            streak = rng.randint(0, 30)
+            habits.append(Habit(
+                user=user, habit_title=f"Habit {h}", habit_theme=rng.choice(THEMES),
+                habit_difficulty=difficulty, habit_frequency="daily", xp_reward=DIFFICULTIES[difficulty],
+                current_streak=streak, longest_streak=streak + rng.randint(0, 10),
+                last_completed_date=today - timedelta(days=1) if streak else None,
+            ))
+
+        for t in range(tasks_per_user):
+            difficulty = rng.choice(list(DIFFICULTIES))
+            tasks.append(Task(
+                user=user, task_title=f"Task {t}", task_difficulty=difficulty,
+                xp_reward=DIFFICULTIES[difficulty], task_theme=rng.choice(THEMES),
+                due_date=today + timedelta(days=rng.randint(-5, 30)),
+            ))
+
+        for d in range(days):
+            minutes = rng.randint(0, 120)
+            xp = minutes + rng.randint(0, 100)
+            total_xp += xp
+            row = DailyMetrics(
+                user=user, metric_date=today - timedelta(days=d),
+                total_study_minutes=minutes, total_tasks_completed=rng.randint(0, 4),
+                habits_completed=rng.randint(0, habits_per_user), xp_earned=xp,
+            )
+            metrics.append(row)
+            lifetime["lifetime_focus_minutes"] += row.total_study_minutes
+            lifetime["lifetime_tasks_completed"] += row.total_tasks_completed
+            lifetime["lifetime_habits_completed"] += row.habits_completed
+        lifetime["lifetime_focus_sessions"] = sessions_per_user
+
+        level, current_level_xp, xp_for_next_level = level_for_xp(total_xp)
+        profiles.append(UserProfile(
+            user=user, primary_theme=rng.choice(THEMES), total_xp=total_xp, level=level,
+            current_level_xp=current_level_xp, xp_for_next_level=xp_for_next_level, **lifetime,
+        ))
+
+        for _ in range(sessions_per_user):
+            duration = rng.choice([15, 25, 50])
+            sessions.append(FocusSession(user=user, duration_minutes=duration, xp_earned=duration))
+
+    UserProfile.objects.bulk_create(profiles, batch_size=BATCH_SIZE)
+    Habit.objects.bulk_create(habits, batch_size=BATCH_SIZE)
+    Task.objects.bulk_create(tasks, batch_size=BATCH_SIZE)
+    DailyMetrics.objects.bulk_create(metrics, batch_size=BATCH_SIZE)
+    FocusSession.objects.bulk_create(sessions, batch_size=BATCH_SIZE)
+
+    task_ids = Task.objects.filter(user__in=created).values_list("id", flat=True)
+    SubTask.objects.bulk_create(
+        [SubTask(task_id=task_id, description=f"Step {s}") for task_id in task_ids for s in range(subtasks_per_task)],
+        batch_size=BATCH_SIZE,
+    )
+
+    #derived tables the endpoints read from
+    user_ids = [user.id for user in created]
+    for start in range(0, len(user_ids), 500):
+        sync_best_streak(user_ids[start:start + 500])
+    call_command("rebuild_weekly_rollup", stdout=StringIO())
+
+    return created
@@ -1,29 +1,52 @@
-from tracker.models import UserProfile
+from tracker.utils.achievements import evaluate_achievements
+from tracker.utils.events import publish_to_user
+from tracker.utils.ledger import record_xp
+from tracker.utils.levels import level_for_xp
 
 THEME_BONUS_MULTIPLIER = 1.5
 
-#returns level based on total XP | increasing difficulty per level.
+#returns level progress based on total XP | increasing difficulty per level.
 def xp_progress(total_xp: int):
-
-    level = 1
-    xp_needed = 100
-
-    while total_xp >= xp_needed:
-        total_xp -= xp_needed
-        level += 1
-        xp_needed = int(xp_needed * 1.25)
+    _, current_level_xp, xp_for_next_level = level_for_xp(total_xp)
 
     return {
-        "current_level_xp": total_xp,
-        "xp_for_next_level": xp_needed
+        "current_level_xp": current_level_xp,
+        "xp_for_next_level": xp_for_next_level
     }
 
-def award_xp(user, base_xp, obj_theme=None):
-    profile = UserProfile.objects.get(user=user)
-    xp_to_award = base_xp
-
+def xp_with_bonus(profile, base_xp, obj_theme=None):
+    #objects in the user's primary theme earn the theme bonus, nothing is earned with XP turned off
+    if not profile.xp_enabled:
+        return 0
     if obj_theme and profile.primary_theme == obj_theme:
-        xp_to_award = int(xp_to_award * THEME_BONUS_MULTIPLIER)
+        return int(base_xp * THEME_BONUS_MULTIPLIER)
+    return base_xp
+
+def award_xp(user, base_xp, obj_theme=None, check_achievements=True, source=("other", None)):
+    #the completion endpoints pass check_achievements=False, their outbox event checks them later
+    #source is the (source_type, source_id) the XPEvent ledger row is recorded under
+    #user.userprofile is already loaded when the user came from ProfileJWTAuthentication
+    profile = user.userprofile
+    xp_to_award = xp_with_bonus(profile, base_xp, obj_theme)
+    old_level = profile.level
 
     profile.add_xp(xp_to_award)
+    if profile.xp_enabled:
+        record_xp(user.id, [(*source, base_xp, xp_to_award - base_xp)])
+    if check_achievements:
+        evaluate_achievements(user, profile, level=profile.level, total_xp=profile.total_xp)
+
+    publish_xp(user.id, profile, xp_to_award, old_level)
     return xp_to_award, profile
+
+def publish_xp(user_id, profile, xp, old_level):
+    #live XP/level-up events for the user's open event streams, sent on commit
+    publish_to_user(user_id, "xp_awarded", {
+        "xp": xp,
+        "total_xp": profile.total_xp,
+        "level": profile.level,
+        "current_level_xp": profile.current_level_xp,
+        "xp_for_next_level": profile.xp_for_next_level,
+    })
+    if profile.level > old_level:
+        publish_to_user(user_id, "level_up", {"level": profile.level})
@@ -1,11 +1,13 @@
 from datetime import timedelta
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Max
-from django.http import JsonResponse
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.http import require_POST
 from rest_framework.decorators import api_view, permission_classes, action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
@@ -13,15 +15,25 @@ from .models import (
     Habit, Task, FocusSession, DailyMetrics,
     Reminder, Achievement, UserAchievement,
     SocialPod, UserPod, SubTask, UserProfile,
+    Tombstone, sync_best_streak,
 )
 from .serializers import (
     HabitSerializer, TaskSerializer, FocusSessionSerializer,
     DailyMetricsSerializer, ReminderSerializer,
     AchievementSerializer, UserAchievementSerializer,
-    SocialPodSerializer, UserPodSerializer, SubTaskSerializer
+    SocialPodSerializer, UserPodSerializer, SubTaskSerializer,
+    SyncSubTaskSerializer,
 )
-from .utils.metrics import update_daily_xp
-from .utils.xp import award_xp
+from .pagination import TrackerCursorPagination
+from .utils.leaderboard import leaderboard_data, leaderboard_rows
+from .utils.ledger import record_xp
+from .utils.xp import award_xp, publish_xp, xp_with_bonus
+from .utils.snapshot import get_snapshot, set_snapshot, invalidate_snapshot
+from .utils.sync import RESET_HISTORY_LIMIT, SYNC_OVERLAP, needs_full_resync, record_deletions
+from .utils.events import publish_streak
+from .utils import outbox
+from .utils.reminders import rearm_deadline_reminders
+from .utils.export import EXPORT_FORMATS, EXPORT_TABLES, export_stream, parse_checkpoint
 
 DIFFICULTY_XP = {
     "easy": 10,
@@ -31,32 +43,29 @@ DIFFICULTY_XP = {
 
 THEME_BONUS_MULTIPLIER = 1.5
 
+def request_profile(request):
+    #the profile ProfileJWTAuthentication loaded with the user, fetched for any other
+    #authentication path. Raises UserProfile.DoesNotExist like the query it replaces
+    if not hasattr(request, "profile"):
+        return UserProfile.objects.select_related("user").get(user=request.user)
+    if request.profile is None:
+        raise UserProfile.DoesNotExist("the user has no profile")
+    return request.profile
+
 class HabitViewSet(ModelViewSet):
     serializer_class = HabitSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ("id",)
 
     def get_queryset(self):
-        habits = Habit.objects.filter(user=self.request.user)
-
-        today = timezone.now().date()
-
-        for habit in habits:
-            if habit.should_reset():
-                #if user missed yesterday → reset streak
-                yesterday = today - timezone.timedelta(days=1)
-
-                if habit.last_completed_date and habit.last_completed_date < yesterday:
-                    habit.current_streak = 0
-
-                habit.is_completed = False
-                habit.save()
-
-        return habits
+        #pure read, daily resets are done in bulk by the rollover_habits command
+        return Habit.objects.filter(user=self.request.user)
 
     def perform_create(self, serializer):
         difficulty = serializer.validated_data["habit_difficulty"]
         xp = DIFFICULTY_XP.get(difficulty, 10)
         serializer.save(user=self.request.user, xp_reward=xp)
+        invalidate_snapshot(self.request.user.id)
 
     def perform_update(self, serializer):
         difficulty = serializer.validated_data.get("habit_difficulty")
@@ -64,23 +73,50 @@ class HabitViewSet(ModelViewSet):
             serializer.save(xp_reward=DIFFICULTY_XP.get(difficulty, 10))
         else:
             serializer.save()
+        invalidate_snapshot(self.request.user.id)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            record_deletions(instance.user_id, "habit", [instance.id])
+            instance.delete()
+            sync_best_streak([instance.user_id])  # the deleted habit may have held the best streak
+        invalidate_snapshot(self.request.user.id)
 
 class TaskViewSet(ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ("created_at", "id")
 
     def get_queryset(self):
-        return Task.objects.filter(user=self.request.user)
+        tasks = Task.objects.filter(user=self.request.user)
+        if self.action == "complete":
+            return tasks  # completing updates the subtasks in one UPDATE, it never reads them
+        return tasks.prefetch_related("subtasks")
 
     def perform_create(self, serializer):
         difficulty = serializer.validated_data["task_difficulty"]
         xp = DIFFICULTY_XP.get(difficulty, 10)
         serializer.save(user=self.request.user, xp_reward=xp)
+        invalidate_snapshot(self.request.user.id)
+
+    def perform_update(self, serializer):
+        task = serializer.save()
+        if "deadline" in serializer.validated_data:
+            rearm_deadline_reminders(task)
+        invalidate_snapshot(self.request.user.id)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            #the subtasks go with it through the cascade
+            record_deletions(instance.user_id, "subtask", [subtask.id for subtask in instance.subtasks.all()])
+            record_deletions(instance.user_id, "task", [instance.id])
+            instance.delete()
+        invalidate_snapshot(self.request.user.id)
 
     @action(detail=True, methods=["post"])
     def complete(self, request, pk=None):
         task = self.get_object()
-        profile = UserProfile.objects.get(user=request.user)
+        profile = request_profile(request)
 
         if task.is_completed:
             return Response({
@@ -90,25 +126,23 @@ class TaskViewSet(ModelViewSet):
                 "level": profile.level,
             })
 
-        task.is_completed = True
-        task.save()
-        task.subtasks.update(is_completed=True)
-
-        xp_awarded, profile = award_xp(
-            request.user,
-            base_xp=task.xp_reward,
-            obj_theme=task.task_theme
-        )
+        with transaction.atomic():
+            task.is_completed = True
+            task.save()
+            task.subtasks.update(is_completed=True, updated_at=timezone.now())
 
-        #update DailyMetrics
-        today = timezone.now().date()
-        daily_metric, _ = DailyMetrics.objects.get_or_create(
-            user=request.user,
-            metric_date=today
-        )
+            xp_awarded, profile = award_xp(
+                request.user,
+                base_xp=task.xp_reward,
+                obj_theme=task.task_theme,
+                check_achievements=False,
+                source=("task", task.id),
+            )
 
-        daily_metric.xp_earned += xp_awarded
-        daily_metric.save()
+            #DailyMetrics, the weekly rollup and achievements are applied by the outbox drainer
+            event = outbox.enqueue(request.user, "task_completed", xp=xp_awarded, tasks_completed=1)
+            invalidate_snapshot(request.user.id)
+        outbox.after_commit(event)
 
         return Response({
             "message": "Task completed",
@@ -119,29 +153,63 @@ class TaskViewSet(ModelViewSet):
 
 
 class SubTaskViewSet(ModelViewSet):
-    queryset = SubTask.objects.all()
     serializer_class = SubTaskSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ("id",)
+
+    def get_queryset(self):
+        return SubTask.objects.filter(task__user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save()
+        invalidate_snapshot(self.request.user.id)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        invalidate_snapshot(self.request.user.id)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            record_deletions(self.request.user.id, "subtask", [instance.id])
+            instance.delete()
+        invalidate_snapshot(self.request.user.id)
 
     @action(detail=True, methods=["post"])
     def toggle(self, request, pk=None):
         subtask = self.get_object()
         subtask.is_completed = not subtask.is_completed
         subtask.save()
+        invalidate_snapshot(request.user.id)
 
         return Response({
             "id": subtask.id,
             "is_completed": subtask.is_completed
         })
 
+#the per-user viewsets below only ever see the requesting user's rows,
+#operators read whole tables through admin_table instead
 class DailyMetricsViewSet(ModelViewSet):
-    queryset = DailyMetrics.objects.all()
     serializer_class = DailyMetricsSerializer
+    permission_classes = [IsAuthenticated]
+    cursor_ordering = ("-metric_date", "-id")
+    since_lookup = "metric_date__gte"  # today's row keeps changing, so re-send it
+
+    def get_queryset(self):
+        return DailyMetrics.objects.filter(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            record_deletions(instance.user_id, "metrics", [instance.id])
+            instance.delete()
+        invalidate_snapshot(self.request.user.id)
 
 
 class ReminderViewSet(ModelViewSet):
-    queryset = Reminder.objects.all()
     serializer_class = ReminderSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Reminder.objects.filter(user=self.request.user)
 
 
 class AchievementViewSet(ModelViewSet):
@@ -150,8 +218,11 @@ class AchievementViewSet(ModelViewSet):
 
 
 class UserAchievementViewSet(ModelViewSet):
-    queryset = UserAchievement.objects.all()
     serializer_class = UserAchievementSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return UserAchievement.objects.filter(user=self.request.user)
 
 
 class SocialPodViewSet(ModelViewSet):
@@ -160,8 +231,86 @@ class SocialPodViewSet(ModelViewSet):
 
 
 class UserPodViewSet(ModelViewSet):
-    queryset = UserPod.objects.all()
     serializer_class = UserPodSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return UserPod.objects.filter(user=self.request.user)
+
+
+EXPORT_CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_history(request):
+    #streams the user's full history, rows are read with iterator() while the response
+    #is sent so memory stays flat however long the history is
+    #?type=ndjson|csv, ?table= one table (required for csv), ?after=<table>:<id> resumes
+    fmt = request.GET.get("type", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return Response({"error": f"type must be one of {list(EXPORT_FORMATS)}"}, status=400)
+
+    table = request.GET.get("table")
+    if table is not None and table not in EXPORT_TABLES:
+        return Response({"error": f"table must be one of {list(EXPORT_TABLES)}"}, status=400)
+    tables = [table] if table else list(EXPORT_TABLES)
+    if fmt == "csv" and len(tables) != 1:
+        return Response({"error": "csv exports one table at a time, pass table"}, status=400)
+
+    checkpoint = None
+    if request.GET.get("after"):
+        try:
+            checkpoint = parse_checkpoint(request.GET["after"])
+        except ValueError:
+            return Response({"error": "after must look like <table>:<id>"}, status=400)
+        if checkpoint[0] not in tables:
+            return Response({"error": "after names a table that is not being exported"}, status=400)
+
+    response = StreamingHttpResponse(
+        export_stream(tables, fmt, user_ids=[request.user.id], checkpoint=checkpoint),
+        content_type=EXPORT_CONTENT_TYPES[fmt],
+    )
+    filename = f"{table or 'history'}.{fmt}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+ADMIN_TABLES = {
+    "daily-metrics": DailyMetrics,
+    "reminders": Reminder,
+    "user-achievements": UserAchievement,
+    "user-pods": UserPod,
+    "subtasks": SubTask,
+}
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def admin_table(request, table):
+    #whole-table read for operators, raw column values in id order one cursor page at a time,
+    #so no request holds the full table in memory. ?since=<id> resumes after that row
+    model = ADMIN_TABLES.get(table)
+    if model is None:
+        return Response({"error": f"Unknown table, expected one of {sorted(ADMIN_TABLES)}"}, status=404)
+
+    paginator = TrackerCursorPagination()
+    paginator.ordering = ("id",)
+    page = paginator.paginate_queryset(model.objects.values(), request)
+    return paginator.get_paginated_response(page)
+
+def _dashboard_payload(profile):
+    return {
+        "first_name": profile.user.first_name,
+        "last_name": profile.user.last_name,
+        "motivation": profile.motivation,
+        "level": profile.level,
+        "total_xp": profile.total_xp,
+        "current_level_xp": profile.current_level_xp,
+        "xp_for_next_level": profile.xp_for_next_level,
+        "lifetime_focus_minutes": profile.lifetime_focus_minutes,
+        "lifetime_focus_sessions": profile.lifetime_focus_sessions,
+        "lifetime_tasks_completed": profile.lifetime_tasks_completed,
+        "lifetime_habits_completed": profile.lifetime_habits_completed,
+    }
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
@@ -173,20 +322,93 @@ def dashboard_data(request):
         return JsonResponse({"error": "Unauthorized"}, status=401)
 
     try:
-        profile = UserProfile.objects.select_related("user").get(user=request.user)
-        data = {
-            "first_name": profile.user.first_name,
-            "last_name": profile.user.last_name,
-            "motivation": profile.motivation,
-            "level": profile.level,
-            "total_xp": profile.total_xp,
-            "current_level_xp": profile.current_level_xp,
-            "xp_for_next_level": profile.xp_for_next_level,
-        }
-        return JsonResponse(data)
+        return JsonResponse(_dashboard_payload(request_profile(request)))
     except UserProfile.DoesNotExist:
         return JsonResponse({"error": "Profile not found"}, status=404)
 
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def dashboard_snapshot(request):
+    #everything the dashboard needs on mount in one payload, cached per user
+    #and invalidated by the habit, task, focus and profile write paths
+    payload = get_snapshot(request.user.id)
+    if payload is not None:
+        return Response(payload)
+
+    try:
+        profile = request_profile(request)
+    except UserProfile.DoesNotExist:
+        return Response({"error": "Profile not found"}, status=404)
+
+    achievements, _ = _achievement_rows(request.user)
+    payload = {
+        "dashboard": _dashboard_payload(profile),
+        "habits": HabitSerializer(Habit.objects.filter(user=request.user), many=True).data,
+        "tasks": TaskSerializer(
+            Task.objects.filter(user=request.user).prefetch_related("subtasks"), many=True
+        ).data,
+        "progress": _progress_points(request.user),
+        "achievements": achievements,
+    }
+    set_snapshot(request.user.id, payload)
+    return Response(payload)
+
+def _sync_history(queryset, view, reset):
+    #newest first like the view's list endpoint, capped on a reset. Returns (rows, older rows left out)
+    queryset = queryset.order_by(*view.cursor_ordering)
+    if not reset:
+        return list(queryset), False
+    rows = list(queryset[:RESET_HISTORY_LIMIT + 1])
+    return rows[:RESET_HISTORY_LIMIT], len(rows) > RESET_HISTORY_LIMIT
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def sync_changes(request):
+    #delta sync: rows changed since the client's last token plus tombstones for deletions
+    #no token, or one older than the tombstone retention, gets everything with reset=true
+    token = timezone.now()
+    raw_since = request.GET.get("since")
+    try:
+        since = parse_datetime(raw_since) if raw_since else None
+    except ValueError:
+        since = None
+    if raw_since and since is None:
+        return Response({"error": "since must be the token of a previous sync"}, status=400)
+    if since and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+
+    user = request.user
+    reset = needs_full_resync(since, token)
+    changed = {} if reset else {"updated_at__gte": since - SYNC_OVERLAP}
+
+    deleted = {kind: [] for kind, _ in Tombstone.KIND_CHOICES}
+    if not reset:
+        tombstones = Tombstone.objects.filter(user=user, deleted_at__gte=since - SYNC_OVERLAP)
+        for kind, object_id in tombstones.values_list("kind", "object_id"):
+            deleted[kind].append(object_id)
+
+    focus_sessions, more_focus_sessions = _sync_history(
+        FocusSession.objects.filter(user=user, **changed), FocusSessionViewSet, reset
+    )
+    metrics, more_metrics = _sync_history(
+        DailyMetrics.objects.filter(user=user, **changed), DailyMetricsViewSet, reset
+    )
+
+    return Response({
+        "token": token.isoformat(),
+        "reset": reset,
+        "habits": HabitSerializer(Habit.objects.filter(user=user, **changed), many=True).data,
+        "tasks": TaskSerializer(
+            Task.objects.filter(user=user, **changed).prefetch_related("subtasks"), many=True
+        ).data,
+        "subtasks": SyncSubTaskSerializer(SubTask.objects.filter(task__user=user, **changed), many=True).data,
+        "focus_sessions": FocusSessionSerializer(focus_sessions, many=True).data,
+        "metrics": DailyMetricsSerializer(metrics, many=True).data,
+        #true when a reset left older rows out, fetch them from /focus-sessions/ and /daily-metrics/
+        "more_history": {"focus_sessions": more_focus_sessions, "metrics": more_metrics},
+        "deleted": deleted,
+    })
+
 @login_required
 @require_POST
 def add_xp(request):
@@ -195,6 +417,8 @@ def add_xp(request):
 
         # Award 25 XP
         profile.add_xp(25)
+        if profile.xp_enabled:
+            record_xp(request.user.id, [("other", None, 25, 0)])
 
         return JsonResponse({
             "total_xp": profile.total_xp,
@@ -230,14 +454,20 @@ def complete_habit(request, habit_id):
         xp_awarded = 0  #defaults if already completed today
 
         if habit.last_completed_date != today:
-            habit.is_completed = True
-            habit.update_streak()  #updates the streak in the DB
-            xp_awarded, profile = award_xp(
-                request.user,
-                base_xp=habit.xp_reward,
-                obj_theme=habit.habit_theme
-            )
-            update_daily_xp(user=request.user, xp=xp_awarded)
+            with transaction.atomic():
+                habit.is_completed = True
+                habit.update_streak()  #updates the streak in the DB
+                xp_awarded, profile = award_xp(
+                    request.user,
+                    base_xp=habit.xp_reward,
+                    obj_theme=habit.habit_theme,
+                    check_achievements=False,
+                    source=("habit", habit.id),
+                )
+                event = outbox.enqueue(request.user, "habit_completed", xp=xp_awarded, habits_completed=1,
+                                       longest_streak=habit.longest_streak)
+                invalidate_snapshot(request.user.id)
+            outbox.after_commit(event)
         else:
             # If already completed, needs profile for the response
             profile = request.user.userprofile
@@ -254,6 +484,86 @@ def complete_habit(request, habit_id):
     except Habit.DoesNotExist:
         return JsonResponse({"error": "Habit not found"}, status=404)
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def complete_habits(request):
+    #completes several habits in one transaction: one habits bulk_update, one profile
+    #XP write and one metrics upsert, however many ids are sent
+    habit_ids = request.data.get("habit_ids")
+    #type() rather than isinstance(), a JSON true would otherwise pass as habit id 1
+    if not isinstance(habit_ids, list) or not all(type(i) is int for i in habit_ids):
+        return Response({"error": "habit_ids must be a list of habit ids"}, status=400)
+
+    today = timezone.now().date()
+
+    with transaction.atomic():
+        habits = list(
+            Habit.objects.select_for_update()
+            .filter(user=request.user, id__in=habit_ids)
+            .order_by("id")
+        )
+        try:
+            profile = request_profile(request)
+        except UserProfile.DoesNotExist:
+            return Response({"error": "Profile not found"}, status=404)
+        old_level = profile.level
+
+        results = []
+        completed = []
+        ledger_entries = []
+        total_xp_awarded = 0
+        for habit in habits:
+            xp_awarded = 0
+            if habit.advance_streak(today):
+                habit.is_completed = True
+                xp_awarded = xp_with_bonus(profile, habit.xp_reward, habit.habit_theme)
+                total_xp_awarded += xp_awarded
+                completed.append(habit)
+                ledger_entries.append(("habit", habit.id, habit.xp_reward, xp_awarded - habit.xp_reward))
+            results.append({
+                "habit_id": habit.id,
+                "xp_awarded": xp_awarded,
+                "is_completed": habit.is_completed,
+                "current_streak": habit.current_streak,
+                "longest_streak": habit.longest_streak,
+            })
+
+        if completed:
+            now = timezone.now()
+            for habit in completed:
+                habit.updated_at = now  # bulk_update skips auto_now
+            Habit.objects.bulk_update(
+                completed, ["is_completed", "current_streak", "longest_streak", "last_completed_date", "updated_at"]
+            )
+            sync_best_streak([request.user.id])
+            profile.add_xp(total_xp_awarded)
+            if profile.xp_enabled:
+                record_xp(request.user.id, ledger_entries)
+            event = outbox.enqueue(
+                request.user,
+                "habit_completed",
+                xp=total_xp_awarded,
+                habits_completed=len(completed),
+                longest_streak=max(h.longest_streak for h in completed),
+            )
+            invalidate_snapshot(request.user.id)
+            publish_xp(request.user.id, profile, total_xp_awarded, old_level)
+            for habit in completed:
+                publish_streak(habit)
+
+    if completed:
+        outbox.after_commit(event)
+
+    found = {habit.id for habit in habits}
+    return Response({
+        "results": results,
+        "not_found": [i for i in habit_ids if i not in found],
+        "xp_awarded": total_xp_awarded,
+        "total_xp": profile.total_xp,
+        "level": profile.level,
+        "leveled_up": profile.level > old_level,
+    })
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def toggle_subtask(request, subtask_id):
@@ -265,6 +575,7 @@ def toggle_subtask(request, subtask_id):
 
         subtask.is_completed = not subtask.is_completed
         subtask.save()
+        invalidate_snapshot(request.user.id)
 
         return Response({
             "id": subtask.id,
@@ -278,6 +589,7 @@ class FocusSessionViewSet(ModelViewSet):
     queryset = FocusSession.objects.all()
     serializer_class = FocusSessionSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ("-created_at", "-id")
 
     def get_queryset(self):
         return FocusSession.objects.filter(user=self.request.user)
@@ -291,198 +603,192 @@ class FocusSessionViewSet(ModelViewSet):
 
         today = timezone.now().date()
 
-        xp_awarded, profile = award_xp(
-            self.request.user,
-            base_xp=xp_to_award,
-            obj_theme=None  # focus sessions don’t use themes
-        )
+        with transaction.atomic():
+            #saved first so the ledger row can point at it, focus sessions don’t use themes
+            #so the XP awarded is always xp_to_award
+            session = serializer.save(
+                user=self.request.user,
+                xp_earned=xp_to_award
+            )
 
-        daily_metric, _ = DailyMetrics.objects.get_or_create(
-            user=self.request.user,
-            metric_date=today
-        )
+            xp_awarded, profile = award_xp(
+                self.request.user,
+                base_xp=xp_to_award,
+                check_achievements=False,
+                source=("focus_session", session.id),
+            )
 
-        daily_metric.total_study_minutes += total_minutes
-        daily_metric.xp_earned += xp_awarded
-        daily_metric.save()
+            event = outbox.enqueue(
+                self.request.user,
+                "focus_logged",
+                xp=xp_awarded,
+                focus_minutes=total_minutes,
+                focus_sessions=sessions,
+                completed_date=today
+            )
+            invalidate_snapshot(self.request.user.id)
+        outbox.after_commit(event)
 
-        serializer.save(
-            user=self.request.user,
-            xp_earned=xp_awarded
-        )
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            record_deletions(instance.user_id, "focus_session", [instance.id])
+            instance.delete()
+        invalidate_snapshot(self.request.user.id)
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def leaderboard_view(request):
-    board_type = request.GET.get("type", "xp")
-    today = timezone.now().date()
-    start_week = today - timedelta(days=6)
-
-    if board_type == "xp":
-        results = (
-            DailyMetrics.objects
-            .filter(metric_date__gte=start_week)
-            .values("user__first_name", "user__userprofile__level")
-            .annotate(total=Sum("xp_earned"))
-            .order_by("-total")[:10]
-        )
+    rows = leaderboard_rows(request.GET.get("type", "xp"))
+    if rows is None:
+        return Response({"error": "Invalid leaderboard type"}, status=400)
+    return Response(leaderboard_data(rows))
 
-        data = [
-            {
-                "name": r["user__first_name"],
-                "level": r["user__userprofile__level"],
-                "value": r["total"] or 0
-            }
-            for r in results
-        ]
-
-    elif board_type == "focus":
-        results = (
-            DailyMetrics.objects
-            .filter(metric_date__gte=start_week)
-            .values("user__first_name", "user__userprofile__level")
-            .annotate(total=Sum("total_study_minutes"))
-            .order_by("-total")[:10]
-        )
+PROGRESS_MAX_DAYS = 365
+PROGRESS_GRANULARITIES = ("day", "week", "month")
 
-        data = [
-            {
-                "name": r["user__first_name"],
-                "level": r["user__userprofile__level"], # Added this
-                "value": r["total"] or 0
-            }
-            for r in results
-        ]
-
-    elif board_type == "streak":
-        profiles = UserProfile.objects.select_related("user")
-        profiles = sorted(
-            profiles,
-            key=lambda p: max([h.current_streak for h in p.user.habits.all()] or [0]),
-            reverse=True
-        )[:10]
-
-        data = [
-            {
-                "name": p.user.first_name,
-                "level": p.level, # Added this (p is a UserProfile object)
-                "value": max([h.current_streak for h in p.user.habits.all()] or [0])
-            }
-            for p in profiles
-        ]
-
-    else:
-        return Response({"error": "Invalid leaderboard type"}, status=400)
+def _progress_bucket(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
 
-    return Response(data)
+def _progress_window(days):
+    today = timezone.now().date()
+    start_date = today - timedelta(days=days - 1)
+    window_start = start_date - timedelta(days=6)  # extra 6 days so the first weekly_xp is complete
+    return today, start_date, window_start
+
+def _progress_rows(user, days):
+    #single fetch, the rolling weekly sum comes from an in-memory prefix sum
+    today, _, window_start = _progress_window(days)
+    return (
+        DailyMetrics.objects
+        .filter(user=user, metric_date__gte=window_start, metric_date__lte=today)
+        .order_by("metric_date")
+        .values("metric_date", "xp_earned", "total_study_minutes", "habits_completed")
+    )
+
+def _progress_points(user, days=7, granularity="day"):
+    return _progress_from_rows(_progress_rows(user, days), days, granularity)
+
+def _progress_from_rows(rows, days, granularity):
+    today, start_date, window_start = _progress_window(days)
+    by_date = {row["metric_date"]: row for row in rows}
+
+    prefix = [0]
+    for offset in range((today - window_start).days + 1):
+        row = by_date.get(window_start + timedelta(days=offset))
+        prefix.append(prefix[-1] + (row["xp_earned"] if row else 0))
+
+    def weekly_xp(day):
+        i = (day - window_start).days + 1
+        return prefix[i] - prefix[i - 7]
+
+    buckets = {}
+    for day, row in by_date.items():
+        if day < start_date:
+            continue
+        key = _progress_bucket(day, granularity)
+        bucket = buckets.setdefault(key, {"last_day": day, "daily_xp": 0, "focus_minutes": 0, "streak": 0})
+        bucket["last_day"] = max(bucket["last_day"], day)
+        bucket["daily_xp"] += row["xp_earned"]
+        bucket["focus_minutes"] += row["total_study_minutes"]
+        bucket["streak"] += row["habits_completed"]
+
+    #with week/month granularity the per-day keys hold bucket totals, so the chart code stays the same
+    label_format = "%b %Y" if granularity == "month" else "%d %b"
+    data = [
+        {
+            "date": key.strftime(label_format),
+            "weekly_xp": weekly_xp(bucket["last_day"]), ##keeps the weekly sum in case you want it elsewhere
+            "daily_xp": bucket["daily_xp"],
+            "focus_minutes": bucket["focus_minutes"],
+            "streak": bucket["streak"],
+        }
+        for key, bucket in sorted(buckets.items())
+    ]
+
+    return data
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def user_progress(request):
-    today = timezone.now().date()
-    start_date = today - timedelta(days=6)
+    days, granularity, error = _progress_params(request.GET)
+    if error:
+        return Response({"error": error}, status=400)
+    return Response(_progress_points(request.user, days, granularity))
 
-    metrics = (
-        DailyMetrics.objects
-        .filter(user=request.user, metric_date__gte=start_date)
-        .order_by("metric_date")
+def _progress_params(params):
+    #returns (days, granularity, error message or None)
+    try:
+        days = int(params.get("days", 7))
+    except ValueError:
+        return None, None, "days must be a number"
+    if not 1 <= days <= PROGRESS_MAX_DAYS:
+        return None, None, f"days must be between 1 and {PROGRESS_MAX_DAYS}"
+
+    granularity = params.get("granularity", "day")
+    if granularity not in PROGRESS_GRANULARITIES:
+        return None, None, "Invalid granularity"
+    return days, granularity, None
+
+def _achievement_rows(user, since=None):
+    #one join of every achievement with this user's unlock row, returns (rows, names unlocked after since)
+    achievements = (
+        Achievement.objects
+        .annotate(mine=FilteredRelation("userachievement", condition=Q(userachievement__user=user)))
+        .values("id", "achievement_name", "description", "icon_url", "xp_reward", "mine__date_achieved")
+        .order_by("id")
     )
 
     data = []
-
-    for metric in metrics:
-        week_start = metric.metric_date - timedelta(days=6)
-
-        weekly_xp = (
-            DailyMetrics.objects
-            .filter(user=request.user,
-                    metric_date__gte=week_start,
-                    metric_date__lte=metric.metric_date)
-            .aggregate(total=Sum("xp_earned"))["total"] or 0
-        )
+    newly_unlocked = []
+    for ach in achievements:
+        date_achieved = ach["mine__date_achieved"]
+        if since and date_achieved and date_achieved > since:
+            newly_unlocked.append(ach["achievement_name"])
 
         data.append({
-            "date": metric.metric_date.strftime("%d %b"),
-            "weekly_xp": weekly_xp, ##keeps the weekly sum in case you want it elsewhere
-            "daily_xp": metric.xp_earned,
-            "focus_minutes": metric.total_study_minutes,
-            "streak": metric.habits_completed,
+            "id": ach["id"],
+            "name": ach["achievement_name"],
+            "description": ach["description"],
+            "icon": ach["icon_url"],
+            "xp_reward": ach["xp_reward"],
+            "unlocked": date_achieved is not None
         })
 
-    return Response(data)
+    return data, newly_unlocked
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def my_achievements(request):
+    #read-only, unlocks are written by evaluate_achievements on the XP/streak/focus write paths
     user = request.user
 
+    #clients pass the checked_at of their previous call to learn what unlocked since then
+    raw_since = request.GET.get("since")
     try:
-        profile = UserProfile.objects.get(user=user)
+        since = parse_datetime(raw_since) if raw_since else None
+    except ValueError:
+        since = None
+    if raw_since and since is None:
+        return Response({"error": "since must be the checked_at of a previous call"}, status=400)
+    if since and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+
+    try:
+        profile = request_profile(request)
     except UserProfile.DoesNotExist:
         return Response({"error": "Profile not found"}, status=404)
 
-    # 1. Define Standard Achievements
-    standard_achievements = [
-        {"name": "Novice Explorer", "desc": "Reach Level 2", "xp": 50, "icon": "🌟"},
-        {"name": "Adept", "desc": "Reach Level 5", "xp": 100, "icon": "⭐"},
-        {"name": "XP Hoarder", "desc": "Accumulate 1000 Total XP", "xp": 200, "icon": "💰"},
-        {"name": "Streak Starter", "desc": "Achieve a 3-day habit streak", "xp": 50, "icon": "🔥"},
-        {"name": "Consistency Key", "desc": "Achieve a 7-day habit streak", "xp": 150, "icon": "📅"},
-        {"name": "Focus Initiate", "desc": "Log 60 minutes of focus time", "xp": 50, "icon": "🧠"},
-        {"name": "Deep Worker", "desc": "Log 300 minutes of focus time", "xp": 150, "icon": "🧘"},
-    ]
-
-    # Create them in the DB if they don't exist
-    for ach_data in standard_achievements:
-        Achievement.objects.get_or_create(
-            achievement_name=ach_data["name"],
-            defaults={
-                "description": ach_data["desc"],
-                "xp_reward": ach_data["xp"],
-                "icon_url": ach_data["icon"]
-            }
-        )
-
-    max_streak_dict = Habit.objects.filter(user=user).aggregate(Max('longest_streak'))
-    max_streak = max_streak_dict['longest_streak__max'] or 0
-    total_focus_dict = DailyMetrics.objects.filter(user=user).aggregate(Sum('total_study_minutes'))
-    total_focus = total_focus_dict['total_study_minutes__sum'] or 0
-    all_achievements = Achievement.objects.all()
-    unlocked_ids = set(UserAchievement.objects.filter(user=user).values_list('achievement_id', flat=True))
-
-    newly_unlocked = []
-
-    for ach in all_achievements:
-        if ach.id in unlocked_ids:
-            continue  #already unlocked
-        earned = False #checks achievement unlock
-        if ach.achievement_name == "Novice Explorer" and profile.level >= 2:
-            earned = True
-        elif ach.achievement_name == "Adept" and profile.level >= 5:
-            earned = True
-        elif ach.achievement_name == "XP Hoarder" and profile.total_xp >= 1000:
-            earned = True
-        if earned:
-            UserAchievement.objects.create(user=user, achievement=ach)
-            profile.add_xp(ach.xp_reward)  # Award XP for the achievement!
-            unlocked_ids.add(ach.id)
-            newly_unlocked.append(ach.achievement_name)
-
-    # 4. Format Data for React
-    data = []
-    for ach in all_achievements:
-        data.append({
-            "id": ach.id,
-            "name": ach.achievement_name,
-            "description": ach.description,
-            "icon": ach.icon_url,
-            "xp_reward": ach.xp_reward,
-            "unlocked": ach.id in unlocked_ids
-        })
+    checked_at = timezone.now()
+    data, newly_unlocked = _achievement_rows(user, since)
 
     return Response({
         "achievements": data,
         "newly_unlocked": newly_unlocked,
+        "checked_at": checked_at.isoformat(),
         "total_xp": profile.total_xp,
         "level": profile.level
-    })
\ No newline at end of file
+    })
@@ -56,10 +56,27 @@ export const fetchDashboardData = async () => {
   return res.data;
 };
 
+// Dashboard, habits, tasks, progress and achievements in one cached payload
+export const fetchDashboardSnapshot = async () => {
+  const res = await privateApi.get("dashboard/snapshot/");
+  return res.data;
+};
+
+// List endpoints are cursor paginated, follow the next links to get every row
+const fetchAllPages = async (url) => {
+  let results = [];
+  let next = url;
+  while (next) {
+    const res = await privateApi.get(next);
+    results = results.concat(res.data.results);
+    next = res.data.next;
+  }
+  return results;
+};
+
 // Habits
 export const fetchHabits = async () => {
-  const res = await privateApi.get("habits/");
-  return res.data;
+  return fetchAllPages("habits/?page_size=500");
 };
 
 // api.jsx
@@ -73,6 +90,12 @@ export const completeHabit = async (habitId) => {
   return res.data;
 };
 
+// Completes several habits in one request, returns per-habit streak/XP results
+export const completeHabits = async (habitIds) => {
+  const res = await privateApi.post("habits/complete/", { habit_ids: habitIds });
+  return res.data;
+};
+
 export const deleteHabit = async (habitId) => {
   const res = await privateApi.delete(`habits/${habitId}/`);
   return res.data;
@@ -86,7 +109,14 @@ export const createTask = async (taskData) => {
 };
 
 export const fetchTasks = async () => {
-  const res = await privateApi.get("tasks/");
+  return fetchAllPages("tasks/?page_size=500");
+};
+
+// Delta sync: rows changed since the token of the previous sync, plus deleted ids.
+// Without a token (or with a very old one) everything comes back with reset: true
+// (focus sessions and metrics only the newest 500, more_history says when older ones are left out)
+export const fetchSync = async (since) => {
+  const res = await privateApi.get("sync/", { params: since ? { since } : {} });
   return res.data;
 };
 
@@ -115,12 +145,65 @@ export const fetchLeaderboard = async (type = "xp") => {
   return res.data;
 };
 
+// Live XP, level-up, streak, achievement and leaderboard events (server-sent events).
+// EventSource can't send the Authorization header, so the stream is read with fetch.
+// Reconnects after a dropped connection; call the returned function to stop.
+export const subscribeEvents = (onEvent) => {
+  let controller = null;
+  let stopped = false;
+
+  const connect = async () => {
+    while (!stopped) {
+      controller = new AbortController();
+      try {
+        const res = await fetch(`${privateApi.defaults.baseURL}events/`, {
+          headers: { Authorization: `Bearer ${localStorage.getItem("accessToken")}` },
+          signal: controller.signal,
+        });
+        if (res.status === 401) return;
+        const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = "";
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += value;
+          const blocks = buffer.split("\n\n");
+          buffer = blocks.pop();
+          for (const block of blocks) {
+            let type = "message";
+            let data = null;
+            for (const line of block.split("\n")) {
+              if (line.startsWith("event: ")) type = line.slice(7);
+              else if (line.startsWith("data: ")) data = JSON.parse(line.slice(6));
+            }
+            if (data !== null) onEvent(type, data);
+          }
+        }
+      } catch {
+        if (stopped) return;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 5000));
+    }
+  };
+
+  connect();
+  return () => {
+    stopped = true;
+    if (controller) controller.abort();
+  };
+};
+
 export const fetchProgressData = async () => {
   const res = await privateApi.get("progress/");
   return res.data;
 };
 
 export const fetchAchievements = async () => {
-  const res = await privateApi.get("progress/achievements/");
+  // "since" lets the backend report what unlocked after our previous check
+  const since = localStorage.getItem("achievementsCheckedAt");
+  const res = await privateApi.get("progress/achievements/", {
+    params: since ? { since } : {},
+  });
+  localStorage.setItem("achievementsCheckedAt", res.data.checked_at);
   return res.data;
 };
\ No newline at end of file
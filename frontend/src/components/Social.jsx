@@ -1,5 +1,5 @@
 import { useEffect, useState, useCallback } from "react";
-import { fetchLeaderboard } from "../api/api";
+import { fetchLeaderboard, subscribeEvents } from "../api/api";
 import "./Social.css";
 
 export default function Social() {
@@ -19,6 +19,22 @@ export default function Social() {
     loadLeaderboard();
   }, [loadLeaderboard]);
 
+  // Live top 10 diffs for the selected board instead of refetching
+  useEffect(() => {
+    return subscribeEvents((event, data) => {
+      if (event === "resync") {
+        loadLeaderboard();
+        return;
+      }
+      if (event !== "leaderboard" || data.board !== type) return;
+      setLeaders((prev) => {
+        const next = prev.slice(0, data.size);
+        for (const { rank, ...entry } of data.changes) next[rank - 1] = entry;
+        return next;
+      });
+    });
+  }, [type, loadLeaderboard]);
+
   const getBackgroundColor = (index) => {
     switch (index) {case 0: return "#FFD700";case 1: return "#C0C0C0";case 2: return "#CD7F32";default: return "#E0E0E0";}};
 
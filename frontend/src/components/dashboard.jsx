@@ -1,11 +1,12 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import {
   LineChart, Line, ResponsiveContainer, XAxis, YAxis, Tooltip, CartesianGrid
 } from 'recharts';
 import {
   fetchDashboardData,
-  fetchHabits,
-  fetchTasks,
+  fetchDashboardSnapshot,
+  fetchSync,
+  subscribeEvents,
   completeHabit,
   deleteHabit,
   deleteTask,
@@ -56,6 +57,14 @@ function MiniProgress({ refreshKey }) {
   );
 }
 
+// Replaces changed rows by id and drops deleted ones, keeping the existing order
+const mergeById = (rows, changed, deletedIds) => {
+  const byId = new Map(rows.map((row) => [row.id, row]));
+  deletedIds.forEach((id) => byId.delete(id));
+  changed.forEach((row) => byId.set(row.id, row));
+  return [...byId.values()];
+};
+
 function Dashboard() {
   const [dashboard, setDashboard] = useState(null);
   const [habits, setHabits] = useState([]);
@@ -69,6 +78,7 @@ function Dashboard() {
   const [mascotSrc, setMascotSrc] = useState(null);
   const [mascotMessage, setMascotMessage] = useState("");
   const [graphKey, setGraphKey] = useState(0);
+  const syncToken = useRef(null);
 
   const loadDashboard = async () => {
     try {
@@ -81,10 +91,31 @@ function Dashboard() {
     }
   };
 
+  // Pulls only the habits/tasks/subtasks changed since the last sync instead of
+  // refetching both lists after every mutation
+  const syncLists = async () => {
+    const data = await fetchSync(syncToken.current);
+    syncToken.current = data.token;
+
+    if (data.reset) {
+      setHabits(data.habits);
+      setTasks(data.tasks);
+      return;
+    }
+
+    setHabits((prev) => mergeById(prev, data.habits, data.deleted.habit));
+    setTasks((prev) =>
+      mergeById(prev, data.tasks, data.deleted.task).map((task) => {
+        const changed = data.subtasks.filter((s) => s.task === task.id);
+        if (!changed.length && !data.deleted.subtask.length) return task;
+        return { ...task, subtasks: mergeById(task.subtasks || [], changed, data.deleted.subtask) };
+      })
+    );
+  };
+
   const loadHabits = async () => {
     try {
-      const habitData = await fetchHabits();
-      setHabits(habitData);
+      await syncLists();
     } catch {
       setError("Failed to load habits");
     }
@@ -92,8 +123,7 @@ function Dashboard() {
 
   const loadTasks = async () => {
     try {
-      const data = await fetchTasks();
-      setTasks(data);
+      await syncLists();
     } catch {
       setError("Failed to load tasks");
     }
@@ -102,16 +132,15 @@ function Dashboard() {
   useEffect(() => {
     const initLoad = async () => {
       try {
-        const [dash, habitsData, tasksData, achData] = await Promise.all([
-          fetchDashboardData(),
-          fetchHabits(),
-          fetchTasks(),
+        // one cached payload for the profile, habits and tasks
+        const [snapshot, achData] = await Promise.all([
+          fetchDashboardSnapshot(),
           fetchAchievements()
         ]);
 
-        setDashboard(dash);
-        setHabits(habitsData);
-        setTasks(tasksData);
+        setDashboard(snapshot.dashboard);
+        setHabits(snapshot.habits);
+        setTasks(snapshot.tasks);
 
         //Achievement Notifications
         if (achData.newly_unlocked && achData.newly_unlocked.length > 0) {
@@ -133,6 +162,26 @@ function Dashboard() {
     initLoad();
   }, []);
 
+  // XP and achievements pushed by the server, covers completions made on other devices too
+  useEffect(() => {
+    return subscribeEvents((event, data) => {
+      if (event === "xp_awarded") {
+        setDashboard((prev) => prev && {
+          ...prev,
+          total_xp: data.total_xp,
+          level: data.level,
+          current_level_xp: data.current_level_xp,
+          xp_for_next_level: data.xp_for_next_level,
+        });
+      } else if (event === "achievement_unlocked") {
+        setMascotSrc(CheeringMascot);
+        setMascotMessage(`🏆 ACHIEVEMENT UNLOCKED: ${data.name}!\n${data.description} (+${data.xp_reward} XP)`);
+      } else if (event === "resync") {
+        loadDashboard();
+      }
+    });
+  }, []);
+
   const handleCompleteHabit = async (habitId, habitTheme) => {
     try {
       const oldLevel = dashboard.level;